@@ -5,9 +5,21 @@ type ConsoleProps = {
   logs?: string[];
 };
 
+type Incident = {
+  id: string;
+  kind: "exception" | "lag";
+  count: number;
+  type?: string;
+  message?: string;
+  source?: string;
+  maxMsBehind?: number;
+};
+
 export default function ConsolePanel({ logs: initialLogs = [] }: ConsoleProps) {
   const [logs, setLogs] = useState<string[]>(initialLogs);
   const [autoScroll, setAutoScroll] = useState(true);
+  const [level, setLevel] = useState("");
+  const [incidents, setIncidents] = useState<Record<string, Incident>>({});
 
   const containerRef = useRef<HTMLDivElement>(null);
   const endRef = useRef<HTMLDivElement>(null);
@@ -35,15 +47,54 @@ export default function ConsolePanel({ logs: initialLogs = [] }: ConsoleProps) {
       });
     };
 
+    const onLogBatch = (data: { lines?: string[]; skipped?: number; replay?: boolean }) => {
+      const lines = data.lines || [];
+      // Sent after a filter change: the recent matching lines replace the view
+      if (data.replay) {
+        setLogs(lines);
+        return;
+      }
+      if (data.skipped) {
+        lines.unshift(`... ${data.skipped} lines skipped`);
+      }
+      if (lines.length === 0) return;
+
+      setLogs(prev => [...prev, ...lines].slice(-1000));
+    };
+
+    // Repeated stack traces arrive as incident counters instead of lines
+    const mergeIncidents = (list: Incident[]) =>
+      setIncidents(prev => {
+        const next = { ...prev };
+        list.forEach(incident => { next[incident.id] = incident; });
+        return next;
+      });
+    const onIncidents = (data: { incidents?: Incident[] }) => mergeIncidents(data.incidents || []);
+
+    ApiClient.getIncidents(10)
+      .then((data) => {
+        if (data.success && data.incidents) mergeIncidents(data.incidents);
+      })
+      .catch((err) => console.error("Error loading incidents:", err));
+
     // Subscribe
     ApiClient.on("log", onLog);
+    ApiClient.on("log_batch", onLogBatch);
+    ApiClient.on("incidents", onIncidents);
 
     // Cleanup
     return () => {
       ApiClient.off("log", onLog);
+      ApiClient.off("log_batch", onLogBatch);
+      ApiClient.off("incidents", onIncidents);
     };
   }, []);
 
+  const onLevelChange = (value: string) => {
+    setLevel(value);
+    ApiClient.setLogFilter(value ? { level: value } : null);
+  };
+
   // --------------------------------------------------------------------
   // AUTO SCROLL TO BOTTOM (when new logs arrive)
   // --------------------------------------------------------------------
@@ -124,17 +175,47 @@ export default function ConsolePanel({ logs: initialLogs = [] }: ConsoleProps) {
           <div style={{ color: "#0f0", fontWeight: "bold", fontSize: 16 }}>
             Live Console
           </div>
-          <label style={{ display: "flex", alignItems: "center", gap: 8, cursor: "pointer", color: "#888", fontSize: 12 }}>
-            <input
-              type="checkbox"
-              checked={autoScroll}
-              onChange={(e) => setAutoScroll(e.target.checked)}
-              style={{ accentColor: "#0f0" }}
-            />
-            Auto-scroll
-          </label>
+          <div style={{ display: "flex", alignItems: "center", gap: 16 }}>
+            <select
+              value={level}
+              onChange={(e) => onLevelChange(e.target.value)}
+              style={{ background: "#0a0a0a", color: "#888", border: "1px solid #222", borderRadius: 6, fontSize: 12 }}
+            >
+              <option value="">All levels</option>
+              <option value="WARN">Warnings and errors</option>
+              <option value="ERROR">Errors only</option>
+            </select>
+            <label style={{ display: "flex", alignItems: "center", gap: 8, cursor: "pointer", color: "#888", fontSize: 12 }}>
+              <input
+                type="checkbox"
+                checked={autoScroll}
+                onChange={(e) => setAutoScroll(e.target.checked)}
+                style={{ accentColor: "#0f0" }}
+              />
+              Auto-scroll
+            </label>
+          </div>
         </div>
 
+        {/* Collapsed incidents */}
+        {Object.values(incidents).length > 0 && (
+          <div style={{ padding: "6px 16px", background: "#140a0a", borderBottom: "1px solid #222", fontSize: 12 }}>
+            {Object.values(incidents)
+              .sort((a, b) => b.count - a.count)
+              .slice(0, 5)
+              .map(incident => (
+                <div key={incident.id} style={{ color: incident.kind === "lag" ? "#ffaa00" : "#ff3b3b", display: "flex", gap: 8 }}>
+                  <span style={{ background: "#222", borderRadius: 4, padding: "0 6px" }}>×{incident.count}</span>
+                  <span>
+                    {incident.kind === "lag"
+                      ? `Can't keep up! (worst ${incident.maxMsBehind}ms behind)`
+                      : `${incident.type}${incident.source ? ` [${incident.source}]` : ""}${incident.message ? `: ${incident.message}` : ""}`}
+                  </span>
+                </div>
+              ))}
+          </div>
+        )}
+
         {/* Console Log Area */}
         <div
           ref={containerRef}
@@ -150,10 +150,26 @@ const [choicejson, setchoice] = useState<string | null>(null)
     }
   };
   const backupworld = async (worldName: string) => {
-        
-
+    // The API takes world directory names relative to SERVER_PATH
+    const name = worldName.split(/[\\/]/).filter(Boolean).pop() || worldName;
+    try {
+      const data = await ApiClient.createBackup([name]);
+      if (data.success) {
+        setSuccessMsg(`Backup of "${name}" started`);
+        setTimeout(() => setSuccessMsg(null), 2500);
+      } else {
+        alert("Failed to start backup: " + data.message);
+      }
+    } catch (err) {
+      alert("Error starting backup");
+      console.error(err);
+    }
   }
 const cmdWorld = async (worldName: string, choice: number) => {
+  if (choice === 1) {
+    backupworld(worldName);
+    return;
+  }
   console.log("Deleting world: " + worldName);
   
   setConfirmWorld(worldName); // show confirmation popup first
@@ -48,8 +48,25 @@ export default function PlayersPanel() {
 
   useEffect(() => {
     loadPlayers();
-    const interval = setInterval(loadPlayers, 60000); // Refresh every 5 seconds
-    return () => clearInterval(interval);
+    const interval = setInterval(loadPlayers, 60000); // Full refresh every 60 seconds
+
+    // Joins and leaves are pushed by the backend in between
+    const onPlayerDelta = (data: { event?: string; player?: Player }) => {
+      const player = data.player;
+      if (!player) return;
+
+      if (data.event === "join") {
+        setOnlinePlayers(prev => [...prev.filter(p => p.name !== player.name), player]);
+      } else if (data.event === "leave") {
+        setOnlinePlayers(prev => prev.filter(p => p.name !== player.name));
+      }
+    };
+    ApiClient.on("player_delta", onPlayerDelta);
+
+    return () => {
+      clearInterval(interval);
+      ApiClient.off("player_delta", onPlayerDelta);
+    };
   }, []);
 
   const loadPlayers = async () => {
@@ -96,6 +96,18 @@ export class ApiClient {
     this.connect();
   }
 
+  // Send a Socket.IO event (42["event", data])
+  static emit(event: string, data?: any) {
+    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+      this.ws.send('42' + JSON.stringify([event, data ?? {}]));
+    }
+  }
+
+  // Only receive console lines matching a filter, e.g. { level: 'WARN' }; null clears it
+  static setLogFilter(filter: { level?: string; source?: string | string[]; thread?: string; contains?: string; records?: boolean } | null) {
+    this.emit('log_filter', filter || {});
+  }
+
   static off(type: string, callback: (data: any) => void) {
     const listeners = this.listeners.get(type);
     if (listeners) {
@@ -114,6 +126,11 @@ export class ApiClient {
     return response.json();
   }
 
+  // Everything the dashboard shows on load; the browser revalidates it with its ETag
+  static async getSnapshot(logs?: number) {
+    return this.request(`/api/snapshot${logs !== undefined ? `?logs=${logs}` : ''}`);
+  }
+
   // Server control
   static async startServer() {
     return this.request('/api/server/start', { method: 'POST' });
@@ -131,6 +148,12 @@ export class ApiClient {
     return this.request('/api/server/status');
   }
 
+  // Startup phase timings of recent boots, with per-plugin enable times
+  static async getBoots(limit?: number) {
+    const query = limit ? `?limit=${limit}` : '';
+    return this.request(`/api/server/boots${query}`);
+  }
+
   // Command execution
   static async executeCommand(command: string) {
     return this.request('/api/server/command', {
@@ -139,6 +162,56 @@ export class ApiClient {
     });
   }
 
+  // Run several commands as one job, e.g. bulk whitelisting
+  static async executeCommands(commands: string[]) {
+    return this.request('/api/server/commands', {
+      method: 'POST',
+      body: JSON.stringify({ commands }),
+    });
+  }
+
+  static async getCommandHistory(limit?: number) {
+    const query = limit ? `?limit=${limit}` : '';
+    return this.request(`/api/commands/history${query}`);
+  }
+
+  // Scheduled tasks, e.g. { cron: '0 4 * * *', action: 'restart', commands: ['save-all'], countdown: [300, 60] }
+  static async getSchedules() {
+    return this.request('/api/schedules');
+  }
+
+  static async createSchedule(schedule: Record<string, any>) {
+    return this.request('/api/schedules', {
+      method: 'POST',
+      body: JSON.stringify(schedule),
+    });
+  }
+
+  static async updateSchedule(id: string, changes: Record<string, any>) {
+    return this.request(`/api/schedules/${encodeURIComponent(id)}`, {
+      method: 'PUT',
+      body: JSON.stringify(changes),
+    });
+  }
+
+  static async deleteSchedule(id: string) {
+    return this.request(`/api/schedules/${encodeURIComponent(id)}`, { method: 'DELETE' });
+  }
+
+  static async runSchedule(id: string) {
+    return this.request(`/api/schedules/${encodeURIComponent(id)}/run`, { method: 'POST' });
+  }
+
+  // Java installations and the one used to start the server
+  static async getJava(refresh?: boolean) {
+    return this.request(`/api/java${refresh ? '?refresh=1' : ''}`);
+  }
+
+  // World
+  static async getWorldStats(heatmap?: boolean) {
+    return this.request(`/api/world/stats${heatmap ? '?heatmap=1' : ''}`);
+  }
+
   // Server properties
   static async getServerProperties() {
     return this.request('/api/server/properties');
@@ -195,6 +268,18 @@ return this.request('/api/players/tp', {
     return this.request(`/api/player/${name}`);
   }
 
+  static async getPlayerStats(player: string) {
+    return this.request(`/api/players/${encodeURIComponent(player)}/stats`);
+  }
+
+  static async getLeaderboards(metric?: string, limit?: number) {
+    const params = new URLSearchParams();
+    if (metric) params.set('metric', metric);
+    if (limit) params.set('limit', String(limit));
+    const query = params.toString();
+    return this.request(`/api/leaderboards${query ? `?${query}` : ''}`);
+  }
+
   // Banned Players
   static async getBannedPlayers() {
     return this.request('/api/banned-players');
@@ -226,6 +311,12 @@ return this.request('/api/players/tp', {
   static async getTPS() {
     return this.request('/api/tps');
   }
+
+  // Process metrics (CPU, memory, GC) of the server
+  static async getMetrics(range?: string) {
+    const query = range ? `?range=${range}` : '';
+    return this.request(`/api/metrics${query}`);
+  }
   //remove item from player inventory
   static async removeItem(player: string,item : string, amount: string ){
     
@@ -240,5 +331,35 @@ return this.request('/api/players/tp', {
     const query = lines ? `?lines=${lines}` : '';
     return this.request(`/api/logs${query}`);
   }
+
+  // Incidents (stack trace fingerprints and lag warnings)
+  static async getIncidents(limit?: number) {
+    const query = limit ? `?limit=${limit}` : '';
+    return this.request(`/api/incidents${query}`);
+  }
+
+  static async clearIncidents() {
+    return this.request('/api/incidents', { method: 'DELETE' });
+  }
+
+  // Backups
+  static async getBackups() {
+    return this.request('/api/backups');
+  }
+
+  static async createBackup(worlds?: string[]) {
+    return this.request('/api/backups', {
+      method: 'POST',
+      body: JSON.stringify({ worlds }),
+    });
+  }
+
+  static async restoreBackup(id: string) {
+    return this.request(`/api/backups/${encodeURIComponent(id)}/restore`, { method: 'POST' });
+  }
+
+  static async deleteBackup(id: string) {
+    return this.request(`/api/backups/${encodeURIComponent(id)}`, { method: 'DELETE' });
+  }
 }
 
@@ -0,0 +1,123 @@
+import asyncio
+
+from ingest import READ_CHUNK, LineBuffer
+from instances import InstanceManager, ServerInstance
+
+# How long a caller off the loop waits for a stdin write to drain
+WRITE_TIMEOUT = 10
+
+
+class AsyncServerInstance(ServerInstance):
+    """ServerInstance whose process runs under asyncio.create_subprocess_exec
+
+    Start, stop and restart only schedule work on the manager's loop and
+    return at once; output is read by one coroutine per pipe.
+    """
+
+    def _launch(self, command, cwd, java_executable):
+        self.manager.submit(self._run(command, cwd, java_executable))
+        return {'success': True, 'message': 'Server starting'}
+
+    async def _run(self, command, cwd, java_executable):
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                cwd=cwd,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            self._java_missing(java_executable)
+            return
+        except Exception as error:
+            self.log(f'ERROR: Failed to start server: {error}')
+            self._set_status('stopped')
+            return
+
+        self._attach(process)
+        await asyncio.gather(self._pump(process.stdout, 'stdout'), self._pump(process.stderr, 'stderr'))
+        await process.wait()
+        self._exited(process)
+
+    async def _pump(self, stream, label):
+        buffer = LineBuffer()
+        while True:
+            chunk = await stream.read(READ_CHUNK)
+            if not chunk:
+                break
+            self.bytes_in += len(chunk)
+            lines = buffer.feed(chunk)
+            if lines:
+                self._ingest(label, lines)
+        tail = buffer.flush()
+        if tail:
+            self._ingest(label, tail)
+
+    @staticmethod
+    def _alive(process):
+        return process.returncode is None
+
+    @staticmethod
+    async def _drain(process, data):
+        process.stdin.write(data)
+        await process.stdin.drain()
+
+    def _write(self, process, data):
+        # StreamWriter is not thread-safe, so the write runs on the loop. Callers on other
+        # threads wait for it to drain and get its error; on the loop it can only be logged
+        future = self.manager.submit(self._drain(process, data))
+        if not self.manager._in_loop():
+            future.result(WRITE_TIMEOUT)
+            return
+        future.add_done_callback(self._written)
+
+    def _written(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            self.log(f'ERROR: Cannot write to server stdin: {task.exception()}')
+
+
+class AsyncInstanceManager(InstanceManager):
+    """InstanceManager driven by a running asyncio loop instead of its own thread
+
+    It can be created before the loop exists (app.py builds it at import);
+    timers set until `bind(loop)` are scheduled then.
+    """
+
+    instance_class = AsyncServerInstance
+
+    def __init__(self, find_java, on_status=None, on_entries=None, config_path=None, on_boot=None,
+                 restart_policy=None, start_guard=None, loop=None):
+        super().__init__(find_java, on_status, on_entries, config_path, on_boot, restart_policy, start_guard)
+        self.loop = loop
+        self._unbound = []
+
+    def bind(self, loop):
+        """Run on `loop` from now on"""
+        with self._lock:
+            self.loop = loop
+            pending, self._unbound = self._unbound, []
+        for delay, callback in pending:
+            self.call_later(delay, callback)
+
+    def _in_loop(self):
+        try:
+            return self.loop is not None and asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def call_later(self, delay, callback):
+        if self._in_loop():
+            self.loop.call_later(delay, callback)
+            return
+        with self._lock:
+            if self.loop is None:
+                self._unbound.append((delay, callback))
+                return
+        self.loop.call_soon_threadsafe(self.loop.call_later, delay, callback)
+
+    def submit(self, coro):
+        """Run a coroutine on the loop from any thread"""
+        if self._in_loop():
+            return self.loop.create_task(coro)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
@@ -1,17 +1,29 @@
 import os
-import sys
-import subprocess
 import threading
 import time
 import json
 import re
-from datetime import datetime
-from pathlib import Path
-from flask import Flask, request, jsonify
+from types import SimpleNamespace
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit, send
+from flask_socketio import SocketIO, emit, join_room, leave_room, send
 from dotenv import load_dotenv
 
+from commands import CommandDispatcher, CommandError
+from httpcache import VersionedJSON
+from instances import TRANSITIONS, InstanceManager
+from javafind import JavaFinder
+from logbroadcast import LogBroadcaster
+from logparse import LogFilter
+from logstore import LogRing
+from logtail import LogTail
+from players import PlayerTracker
+from plugincatalog import PluginCatalog
+from properties import PropertiesService
+from rcon import RconError, RconPool
+from supervisor import BootLog, RestartPolicy
+from tpsmonitor import COLOR_RE, RANGES as TPS_RANGES, TPSSampler
+
 load_dotenv()
 
 app = Flask(__name__)
@@ -43,11 +55,408 @@ SERVER_JAR = os.getenv('SERVER_JAR', 'paper-1.21.4-232.jar')
 JAVA_PATH = os.getenv('JAVA_PATH', 'java')
 SERVER_PORT = 25565
 API_PORT = int(os.getenv('PORT', 3001))
+LOG_BATCH_WINDOW_MS = int(os.getenv('LOG_BATCH_WINDOW_MS', 50))
+LOG_BATCH_MAX_LINES = int(os.getenv('LOG_BATCH_MAX_LINES', 256))
+DATA_PATH = os.getenv('DATA_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+LOG_INDEX_INTERVAL = int(os.getenv('LOG_INDEX_INTERVAL', 60))
+TPS_SAMPLE_INTERVAL = float(os.getenv('TPS_SAMPLE_INTERVAL', 5))
+# Without RCON, tps/mspt are written to the console (and their replies shown) at most this often
+TPS_STDIN_INTERVAL = float(os.getenv('TPS_STDIN_INTERVAL', 60))
+METRICS_SAMPLE_INTERVAL = float(os.getenv('METRICS_SAMPLE_INTERVAL', 2))
+# Heap of the default instance. JAVA_GC_LOG=1 adds -Xlog:gc, putting GC pauses on the console
+# for the metrics sampler; off by default as Java 8 refuses the flag and every pause becomes a line
+JAVA_XMX = os.getenv('JAVA_XMX', '8G')
+JAVA_XMS = os.getenv('JAVA_XMS', JAVA_XMX)
+JAVA_GC_LOG = os.getenv('JAVA_GC_LOG', '0') == '1'
+# RCON falls back to enable-rcon/rcon.port/rcon.password from server.properties
+RCON_HOST = os.getenv('RCON_HOST', '127.0.0.1')
+RCON_PORT = os.getenv('RCON_PORT')
+RCON_PASSWORD = os.getenv('RCON_PASSWORD')
+RCON_POOL_SIZE = int(os.getenv('RCON_POOL_SIZE', 2))
+RCON_TIMEOUT = float(os.getenv('RCON_TIMEOUT', 5))
+BACKUP_PATH = os.getenv('BACKUP_PATH', os.path.join(SERVER_PATH, 'backups'))
+BACKUP_WORKERS = int(os.getenv('BACKUP_WORKERS', os.cpu_count() or 2))
+BACKUP_SAVE_TIMEOUT = float(os.getenv('BACKUP_SAVE_TIMEOUT', 60))
+# Commands: queued jobs, how long console lines after a stdin command count as its output
+# and how long a request waits for its command before getting the job id back
+COMMAND_QUEUE_SIZE = int(os.getenv('COMMAND_QUEUE_SIZE', 256))
+COMMAND_CAPTURE_MS = int(os.getenv('COMMAND_CAPTURE_MS', 250))
+COMMAND_TIMEOUT = float(os.getenv('COMMAND_TIMEOUT', 30))
+# A stack trace seen again within this many seconds is collapsed into its incident counter
+INCIDENT_COLLAPSE_SECONDS = float(os.getenv('INCIDENT_COLLAPSE_SECONDS', 60))
+# How long a scheduled stop or restart waits for the server process to exit
+SCHEDULE_STOP_TIMEOUT = float(os.getenv('SCHEDULE_STOP_TIMEOUT', 60))
+# Unexpected exits are restarted after RESTART_BACKOFF_BASE seconds, doubling up to
+# RESTART_BACKOFF_MAX; CRASH_LOOP_COUNT crashes within CRASH_LOOP_WINDOW seconds stop that
+AUTO_RESTART = os.getenv('AUTO_RESTART', '1') == '1'
+RESTART_BACKOFF_BASE = float(os.getenv('RESTART_BACKOFF_BASE', 5))
+RESTART_BACKOFF_MAX = float(os.getenv('RESTART_BACKOFF_MAX', 300))
+CRASH_LOOP_COUNT = int(os.getenv('CRASH_LOOP_COUNT', 5))
+CRASH_LOOP_WINDOW = float(os.getenv('CRASH_LOOP_WINDOW', 600))
+# World stats: processes reading region headers, and regions generated once and untouched
+# for PRUNE_MIN_AGE_DAYS (all chunks saved within PRUNE_REVISIT_WINDOW seconds) are prune candidates
+REGION_WORKERS = int(os.getenv('REGION_WORKERS', os.cpu_count() or 2))
+PRUNE_MIN_AGE_DAYS = float(os.getenv('PRUNE_MIN_AGE_DAYS', 30))
+PRUNE_REVISIT_WINDOW = float(os.getenv('PRUNE_REVISIT_WINDOW', 3600))
+# Player stats files are checked for changes at most this often (seconds)
+PLAYER_STATS_INTERVAL = float(os.getenv('PLAYER_STATS_INTERVAL', 30))
+# /api/snapshot bodies at least this large are sent gzip (or brotli) compressed
+SNAPSHOT_COMPRESS_MIN = int(os.getenv('SNAPSHOT_COMPRESS_MIN', 1024))
+# The server at SERVER_PATH, also served by the /api/server/... endpoints
+DEFAULT_INSTANCE = 'default'
+# Set by app_async.py before it imports this module: server processes then run on its asyncio loop
+ASYNCIO_RUNTIME = os.getenv('DASHBOARD_RUNTIME') == 'asyncio'
+
+# Optional subsystems are created, and their modules imported, by get_...() on first use,
+# so importing this module only costs what the API needs to answer
+subsystems_lock = threading.RLock()
+
+
+def lazy(create):
+    """Getter returning what `create()` returns, calling it once on the first call"""
+    created = []
+
+    def get():
+        if not created:
+            with subsystems_lock:
+                if not created:
+                    created.append(create())
+        return created[0]
+    return get
+
 
-server_process = None
-server_status = 'stopped'  # stopped, starting, running, stopping
-logs = []
 max_logs = 1000
+log_ring = LogRing(max_logs)
+log_tail = LogTail()
+
+
+def new_log_indexer():
+    from logsearch import LogIndexer
+    return LogIndexer(
+        os.path.join(SERVER_PATH, 'logs'),
+        os.path.join(DATA_PATH, 'logindex.sqlite'),
+        interval=LOG_INDEX_INTERVAL
+    )
+
+
+get_log_indexer = lazy(new_log_indexer)
+log_broadcaster = LogBroadcaster(
+    socketio,
+    window=LOG_BATCH_WINDOW_MS / 1000,
+    max_lines=LOG_BATCH_MAX_LINES,
+    on_frame=lambda seconds, lines: get_prometheus().frame_latency.observe(seconds)
+)
+
+properties_service = PropertiesService(
+    os.path.join(SERVER_PATH, 'server.properties'),
+    on_change=lambda properties: broadcast({'type': 'properties_changed', 'properties': properties})
+)
+plugin_catalog = PluginCatalog(
+    os.path.join(SERVER_PATH, 'plugins'),
+    os.path.join(DATA_PATH, 'plugins.json')
+)
+
+
+def new_incident_detector():
+    """Repeated stack traces are collapsed before the default console reaches clients"""
+    from incidents import IncidentDetector
+    return IncidentDetector(
+        lambda entries: submit_logs(entries),
+        on_change=lambda incidents: broadcast({'type': 'incidents', 'incidents': incidents}),
+        call_later=lambda delay, callback: instance_manager.call_later(delay, callback),
+        collapse=INCIDENT_COLLAPSE_SECONDS
+    )
+
+
+get_incident_detector = lazy(new_incident_detector)
+# Java installations, probed once and cached by binary mtime
+java_finder = JavaFinder(JAVA_PATH, os.path.join(DATA_PATH, 'java.json'))
+
+
+def new_region_analyzer():
+    """Region header summaries, cached by file size and mtime"""
+    from region import RegionAnalyzer
+    return RegionAnalyzer(
+        SERVER_PATH,
+        os.path.join(DATA_PATH, 'regions.json'),
+        workers=REGION_WORKERS,
+        min_age_days=PRUNE_MIN_AGE_DAYS,
+        revisit_window=PRUNE_REVISIT_WINDOW
+    )
+
+
+get_region_analyzer = lazy(new_region_analyzer)
+# /api/snapshot, built once per state version
+snapshot_cache = VersionedJSON(SNAPSHOT_COMPRESS_MIN)
+# Startup phase timings of every boot, per instance
+boot_log = BootLog(os.path.join(DATA_PATH, 'boots.log'))
+# Called with the text of every line the server prints
+console_listeners = []
+rcon_pool = None
+
+
+def default_java_args():
+    """JVM options of the default instance"""
+    args = [f'-Xmx{JAVA_XMX}', f'-Xms{JAVA_XMS}']
+    if JAVA_GC_LOG:
+        args.append('-Xlog:gc')
+    return args
+
+
+def new_restart_policy():
+    return RestartPolicy(RESTART_BACKOFF_BASE, RESTART_BACKOFF_MAX, CRASH_LOOP_COUNT, CRASH_LOOP_WINDOW)
+
+
+def setup_instances():
+    """Create the instance manager and the default instance"""
+    global instance_manager, default_instance
+    if ASYNCIO_RUNTIME:
+        # Its loop is bound once the runtime has one
+        from aioinstances import AsyncInstanceManager as manager_class
+    else:
+        manager_class = InstanceManager
+    instance_manager = manager_class(
+        lambda: find_java_executable(),
+        on_status=lambda instance: instance_status_changed(instance),
+        on_entries=lambda instance, entries: instance_log(instance, entries),
+        config_path=os.path.join(DATA_PATH, 'instances.json'),
+        on_boot=lambda instance, boot: instance_booted(instance, boot),
+        restart_policy=new_restart_policy if AUTO_RESTART else None,
+        start_guard=lambda instance: start_refusal(instance)
+    )
+    default_instance = instance_manager.add(
+        DEFAULT_INSTANCE, SERVER_PATH, SERVER_JAR, java_args=default_java_args(),
+        log_ring=log_ring, listeners=console_listeners
+    )
+    instance_manager.load(skip=(DEFAULT_INSTANCE,))
+
+
+def use_socket_server(server):
+    """Emit through another Socket.IO server, e.g. the asyncio runtime's"""
+    global socketio
+    socketio = server
+    log_broadcaster.socketio = server
+
+
+setup_instances()
+
+tps_sampler = TPSSampler(
+    lambda command: rcon_command(command),
+    lambda: default_instance.status == 'running',
+    interval=TPS_SAMPLE_INTERVAL,
+    send_stdin=lambda command: run_commands([command], quiet=True, source='tps', wait=False),
+    stdin_interval=TPS_STDIN_INTERVAL
+)
+console_listeners.append(tps_sampler.feed_line)
+
+
+
+def new_process_sampler():
+    from procmetrics import ProcessSampler
+    sampler = ProcessSampler(
+        lambda: default_instance.process.pid if default_instance.process else None,
+        interval=METRICS_SAMPLE_INTERVAL,
+        on_sample=lambda latest: broadcast(dict(latest, type='metrics'))
+    )
+    console_listeners.append(sampler.feed_line)
+    return sampler
+
+
+get_process_sampler = lazy(new_process_sampler)
+
+command_dispatcher = CommandDispatcher(
+    lambda: default_instance,
+    get_rcon=lambda: get_rcon(),
+    audit_path=os.path.join(DATA_PATH, 'commands.log'),
+    max_queue=COMMAND_QUEUE_SIZE,
+    capture_window=COMMAND_CAPTURE_MS / 1000
+)
+console_listeners.append(command_dispatcher.feed_line)
+# Dispatchers of the other instances, created on their first command
+instance_dispatchers = {}
+instance_dispatchers_lock = threading.Lock()
+
+player_tracker = PlayerTracker(on_delta=lambda delta: broadcast(dict(delta, type='player_delta')))
+console_listeners.append(player_tracker.feed_line)
+
+
+def new_player_stats():
+    """world/stats/<uuid>.json laid out as leaderboard columns"""
+    from playerstats import PlayerStatsIndex
+    return PlayerStatsIndex(
+        SERVER_PATH,
+        level=lambda: get_server_properties()['properties'].get('level-name', 'world'),
+        interval=PLAYER_STATS_INTERVAL
+    )
+
+
+get_player_stats_index = lazy(new_player_stats)
+
+# Notified on every status change of the default instance
+status_changed = threading.Condition()
+
+
+
+def new_scheduler():
+    from scheduler import Scheduler
+    scheduler = Scheduler(
+        lambda schedule: run_schedule(schedule),
+        announce=lambda schedule, text: run_commands([f'say {text}'], quiet=True, source='scheduler', wait=False),
+        path=os.path.join(DATA_PATH, 'schedules.json'),
+        on_run=lambda schedule: broadcast({'type': 'schedule_run', 'schedule': schedule})
+    )
+    scheduler.load()
+    return scheduler
+
+
+get_scheduler = lazy(new_scheduler)
+
+# Set when the server reports that a save-all finished
+world_saved = threading.Event()
+console_listeners.append(lambda text: world_saved.set() if 'Saved the game' in text else None)
+
+
+
+def new_backup_engine():
+    from backup import BackupEngine
+    return BackupEngine(
+        SERVER_PATH,
+        BACKUP_PATH,
+        before_snapshot=lambda: pause_saving(),
+        after_snapshot=lambda: resume_saving(),
+        on_progress=lambda progress: broadcast(dict(progress, type='backup_progress')),
+        workers=BACKUP_WORKERS
+    )
+
+
+get_backup_engine = lazy(new_backup_engine)
+
+
+def per_instance(read):
+    """{(instance id,): read(instance)} for every instance"""
+    return {(i.id,): read(i) for i in list(instance_manager.instances.values())}
+
+
+def new_prometheus():
+    """Prometheus metrics served by /metrics; counters kept elsewhere are read when scraped"""
+    from exporter import Registry
+    from incidents import LAG_ID
+    process_sampler, scheduler, incident_detector = get_process_sampler(), get_scheduler(), get_incident_detector()
+    registry = Registry()
+    status_transitions = registry.counter(
+        'papermc_status_transitions', 'Instance status changes by new status', ('instance', 'status')
+    )
+    registry.gauge(
+        'papermc_status', 'Current instance status (1 for the active one)',
+        lambda: {(i.id, status): int(i.status == status)
+                 for i in list(instance_manager.instances.values()) for status in TRANSITIONS},
+        ('instance', 'status')
+    )
+    registry.gauge(
+        'papermc_uptime_seconds', 'Seconds since the instance reached running',
+        lambda: per_instance(lambda i: time.time() - i.status_since if i.status == 'running' else 0),
+        ('instance',)
+    )
+    registry.counter_func(
+        'papermc_restarts', 'Restarts requested per instance',
+        lambda: per_instance(lambda i: i.restarts), ('instance',)
+    )
+    registry.gauge(
+        'papermc_boot_seconds', 'Seconds from spawn to the Done line in the last boot',
+        lambda: per_instance(lambda i: i.last_boot['totalMs'] / 1000 if i.last_boot else None), ('instance',)
+    )
+    registry.counter_func(
+        'papermc_crashes', 'Unexpected exits per instance',
+        lambda: per_instance(lambda i: i.policy.crashes_total if i.policy else None), ('instance',)
+    )
+    registry.gauge(
+        'papermc_crash_loop', 'Whether automatic restarts gave up on a crash loop',
+        lambda: per_instance(lambda i: int(i.policy.state == 'crash-loop') if i.policy else None), ('instance',)
+    )
+    registry.counter_func(
+        'papermc_console_lines', 'Console lines read since the instance started',
+        lambda: per_instance(lambda i: i.ingest_stats()['linesIn']), ('instance',)
+    )
+    registry.counter_func(
+        'papermc_console_bytes', 'Console bytes read since the instance started',
+        lambda: per_instance(lambda i: i.ingest_stats()['bytesIn']), ('instance',)
+    )
+    registry.gauge(
+        'papermc_ingest_queue_depth', 'Console batches waiting to be ingested',
+        lambda: per_instance(lambda i: i.ingest_stats()['queueDepth']), ('instance',)
+    )
+    registry.gauge('papermc_tps', 'Ticks per second over the last minute',
+                   lambda: tps_sampler.latest['tps1m'] if tps_sampler.latest and default_instance.status == 'running' else None)
+    registry.gauge('papermc_mspt', 'Milliseconds per tick',
+                   lambda: tps_sampler.latest['mspt'] if tps_sampler.latest and default_instance.status == 'running' else None)
+    for field, name, help in (
+        ('cpuPercent', 'papermc_process_cpu_percent', 'CPU used by the server process, percent of one core'),
+        ('rssMB', 'papermc_process_resident_memory_megabytes', 'Resident memory of the server process'),
+        ('threads', 'papermc_process_threads', 'Threads of the server process'),
+        ('fds', 'papermc_process_open_fds', 'Open file descriptors of the server process'),
+        ('heapUsedMB', 'papermc_jvm_heap_used_megabytes', 'Heap in use after the last GC'),
+    ):
+        registry.gauge(name, help, lambda field=field: (process_sampler.latest or {}).get(field)
+                       if default_instance.process else None)
+    registry.counter_func('papermc_gc_pauses', 'GC pauses seen in the console',
+                          lambda: process_sampler.latest['gc']['count'] if process_sampler.latest else None)
+    registry.counter_func('papermc_gc_pause_milliseconds', 'Total GC pause time seen in the console',
+                          lambda: process_sampler.latest['gc']['pauseMsTotal'] if process_sampler.latest else None)
+    registry.counter_func('dashboard_commands', 'Console commands run', lambda: command_dispatcher.commands_run)
+    registry.gauge('dashboard_command_queue_depth', 'Command jobs waiting for the writer',
+                   lambda: command_dispatcher.queue_depth())
+    registry.gauge('dashboard_schedules', 'Enabled schedules', lambda: sum(s.enabled for s in list(scheduler.schedules.values())))
+    registry.counter_func('dashboard_schedule_runs', 'Scheduled actions run',
+                          lambda: sum(s.runs for s in list(scheduler.schedules.values())))
+    registry.counter_func('dashboard_snapshot_builds', '/api/snapshot bodies built', lambda: snapshot_cache.builds)
+    registry.counter_func('dashboard_snapshot_not_modified', '/api/snapshot requests answered with 304',
+                          lambda: snapshot_cache.hits)
+    registry.counter_func('papermc_exceptions', 'Stack traces seen in the console', lambda: incident_detector.exceptions)
+    registry.counter_func(
+        'papermc_lag_warnings', "Can't keep up! warnings seen in the console",
+        lambda: (incident_detector.get(LAG_ID) or {}).get('count', 0)
+    )
+    registry.gauge('papermc_incident_fingerprints', 'Distinct stack trace fingerprints tracked',
+                   lambda: len(incident_detector.incidents))
+    frame_latency = registry.histogram(
+        'dashboard_broadcast_frame_latency_seconds', 'From a console line being queued to its log_batch frame being sent'
+    )
+    registry.counter_func('dashboard_broadcast_frames', 'log_batch frames sent', lambda: log_broadcaster.frames_sent)
+    registry.counter_func('dashboard_broadcast_lines', 'Console lines sent to clients', lambda: log_broadcaster.lines_sent)
+    registry.counter_func('dashboard_broadcast_lines_dropped', 'Lines dropped from a full broadcast queue',
+                          lambda: log_broadcaster.lines_dropped)
+    registry.gauge('dashboard_broadcast_queue_depth', 'Lines waiting for the next frame',
+                   lambda: log_broadcaster.stats()['queueDepth'])
+    registry.gauge('dashboard_socket_clients', 'Connected Socket.IO clients', lambda: log_broadcaster.stats()['clients'])
+    registry.gauge('dashboard_slow_socket_clients', 'Clients currently skipped for a deep send queue',
+                   lambda: log_broadcaster.stats()['slowClients'])
+    http_requests = registry.counter(
+        'dashboard_http_requests', 'HTTP requests by route and status code', ('method', 'route', 'code')
+    )
+    http_latency = registry.histogram(
+        'dashboard_http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route')
+    )
+    return SimpleNamespace(registry=registry, status_transitions=status_transitions, frame_latency=frame_latency,
+                           http_requests=http_requests, http_latency=http_latency)
+
+
+get_prometheus = lazy(new_prometheus)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        prometheus = get_prometheus()
+        prometheus.http_latency.observe(time.perf_counter() - started, (request.method, route))
+        prometheus.http_requests.inc(labels=(request.method, route, str(response.status_code)))
+    return response
 
 
 def broadcast(data):
@@ -57,381 +466,213 @@ def broadcast(data):
 
 def add_log(message):
     """Add log entry and broadcast"""
-    timestamp = datetime.now().isoformat()
-    log_entry = f"[{timestamp}] {message}"
-    logs.append(log_entry)
-    if len(logs) > max_logs:
-        logs.pop(0)
-    broadcast({'type': 'log', 'message': log_entry})
+    return default_instance.log(message)
+
+
+def submit_logs(entries):
+    """Queue default console entries for the log_batch frames"""
+    for entry in entries:
+        log_broadcaster.submit(entry)
+
+
+def instance_log(instance, entries):
+    """Push new log entries to the clients following an instance"""
+    if instance is default_instance:
+        get_incident_detector().feed(entries)
+        return
+    socketio.emit('message', {
+        'type': 'instance_log',
+        'instance': instance.id,
+        'lines': [entry.format() for entry in entries],
+        'firstSeq': entries[0].seq,
+        'lastSeq': entries[-1].seq
+    }, to=f'instance:{instance.id}', namespace='/')
+
+
+def instance_status_changed(instance):
+    """Broadcast an instance's new status"""
+    if instance is default_instance:
+        broadcast({'type': 'status', 'status': instance.status})
+        if instance.status == 'stopped':
+            player_tracker.reset()
+        with status_changed:
+            status_changed.notify_all()
+    broadcast({'type': 'instance_status', 'instance': instance.to_dict()})
+    get_prometheus().status_transitions.inc(labels=(instance.id, instance.status))
+
+
+def instance_booted(instance, boot):
+    """Record a boot's startup timings once the server printed Done"""
+    boot_log.record(instance.id, boot)
+    broadcast({'type': 'boot', 'instance': instance.id, 'boot': boot})
+
+
+def get_boots(instance_id, limit=20):
+    return {
+        'success': True,
+        'boots': boot_log.history(instance_id, limit),
+        'comparison': boot_log.compare(instance_id)
+    }
 
 
 def find_java_executable():
-    """Find Java executable"""
-    # If explicitly set and is absolute path, verify it exists
-    if os.path.isabs(JAVA_PATH):
-        if os.path.exists(JAVA_PATH):
-            return JAVA_PATH
+    """Java to start the server with, discovered once and cached"""
+    if os.path.isabs(JAVA_PATH) and not os.path.exists(JAVA_PATH) and java_finder.selected is None:
         add_log(f'WARNING: Java not found at {JAVA_PATH}, searching...')
-    
-    # If JAVA_PATH is 'java', try to find it
-    if JAVA_PATH == 'java':
-        # On Windows, use 'where' command
-        if sys.platform == 'win32':
-            try:
-                result = subprocess.run(['where', 'java'], capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    java_path = result.stdout.strip().split('\n')[0].strip()
-                    print(java_path)
-                    if java_path and os.path.exists(java_path):
-                        return java_path
-            except Exception as e:
-                pass
-            
-            # Try common Java locations on Windows
-            common_paths = [
-                'C:\\Program Files\\Java\\jdk-21\\bin\\java.exe',
-                'C:\\Program Files\\Java\\jdk-20\\bin\\java.exe',
-                'C:\\Program Files\\jdk-17\\bin\\java.exe',
-                'C:\\Program Files\\Java\\jdk-11\\bin\\java.exe',
-                'C:\\Program Files\\Java\\jre1.8.0_51\\bin\\java.exe',
-                'C:\\Program Files\\Java\\jre-21\\bin\\java.exe',
-                'C:\\Program Files\\Java\\jre-17\\bin\\java.exe',
-                'C:\\Program Files\\Java\\jre-11\\bin\\java.exe',
-            ]
-            
-            java_home = os.getenv('JAVA_HOME')
-            if java_home:
-                common_paths.insert(0, os.path.join(java_home, 'bin', 'java.exe'))
-            
-            for java_path in common_paths:
-                if os.path.exists(java_path):
-                    return java_path
-    
-    # Fallback to whatever JAVA_PATH is set to
-    return JAVA_PATH
+    return java_finder.find()
 
 
-def read_process_output(process):
-    """Read server stdout & stderr and broadcast logs through socket.io"""
-    def stream_output(stream, label):
-        while True:
-            line = stream.readline()
-            if not line:
-                break
+def warm_up():
+    """Start the slower subsystems in the background so the API answers at once"""
+    def run():
+        get_process_sampler().start()
+        get_scheduler().start()
+        get_log_indexer().start()
+        properties_service.watch()
+        try:
+            java_finder.find()
+        except Exception as e:
+            print(f'Error discovering Java: {e}')
+        try:
+            get_player_stats_index().refresh()
+        except OSError as e:
+            print(f'Error loading player stats: {e}')
 
-            try:
-                text = line.decode("utf-8", errors="replace").rstrip()
-            except:
-                text = str(line)
-
-            # Save in internal log buffer
-            add_log(text)
-
-            # Send through WebSocket
-            broadcast({
-                "type": "log",
-                "source": label,
-                "line": text
-            })
-
-    # Read both stdout & stderr in background threads
-    threading.Thread(target=stream_output, args=(process.stdout, "stdout"), daemon=True).start()
-    threading.Thread(target=stream_output, args=(process.stderr, "stderr"), daemon=True).start()
-    """Read stdout and stderr from process"""
-    def read_stdout():
-        if process.stdout:
-            buffer = b''
-            while True:
-                if process.poll() is not None:
-                    # Process has ended, read remaining data
-                    remaining = process.stdout.read()
-                    if remaining:
-                        buffer += remaining
-                        lines = buffer.decode('utf-8', errors='replace').split('\n')
-                        buffer = lines[-1].encode('utf-8') if lines else b''
-                        for line in lines[:-1]:
-                            if line.strip():
-                                add_log(line.strip())
-                    break
-                
-                try:
-                    chunk = process.stdout.read(4096)
-                    if not chunk:
-                        time.sleep(0.1)
-                        continue
-                    
-                    buffer += chunk
-                    # Split by newlines
-                    while b'\n' in buffer:
-                        line, buffer = buffer.split(b'\n', 1)
-                        line_str = line.decode('utf-8', errors='replace').strip()
-                        if line_str:
-                            add_log(line_str)
-                except Exception as e:
-                    add_log(f'[ERROR] Error reading stdout: {str(e)}')
-                    break
-    
-    def read_stderr():
-        if process.stderr:
-            buffer = b''
-            while True:
-                if process.poll() is not None:
-                    # Process has ended, read remaining data
-                    remaining = process.stderr.read()
-                    if remaining:
-                        buffer += remaining
-                        lines = buffer.decode('utf-8', errors='replace').split('\n')
-                        buffer = lines[-1].encode('utf-8') if lines else b''
-                        for line in lines[:-1]:
-                            if line.strip():
-                                add_log(f'[STDERR] {line.strip()}')
-                    break
-                
-                try:
-                    chunk = process.stderr.read(4096)
-                    if not chunk:
-                        time.sleep(0.1)
-                        continue
-                    
-                    buffer += chunk
-                    # Split by newlines
-                    while b'\n' in buffer:
-                        line, buffer = buffer.split(b'\n', 1)
-                        line_str = line.decode('utf-8', errors='replace').strip()
-                        if line_str:
-                            add_log(f'[STDERR] {line_str}')
-                except Exception as e:
-                    add_log(f'[ERROR] Error reading stderr: {str(e)}')
-                    break
-    
-    threading.Thread(target=read_stdout, daemon=True).start()
-    threading.Thread(target=read_stderr, daemon=True).start()
+    threading.Thread(target=run, daemon=True).start()
+
+
+def start_refusal(instance):
+    """Why `instance` must not start now, checked by the instance manager on every start"""
+    if instance is default_instance and get_backup_engine().restoring:
+        return 'A backup is being restored'
+    return None
 
 
 def start_server():
     """Start PaperMC server"""
-    global server_process, server_status
-    
-    if server_process or server_status != 'stopped':
-        return {'success': False, 'message': 'Server is already running or starting'}
-    
-    try:
-        server_status = 'starting'
-        broadcast({'type': 'status', 'status': server_status})
-        add_log('Starting PaperMC server...')
-        
-        # Find Java executable
-        java_executable = find_java_executable()
-        add_log(f'Using Java: {java_executable}')
-        print(java_executable)
-        
-        # Normalize and validate server directory
-        server_dir = os.path.abspath(os.path.expanduser(SERVER_PATH))
-        add_log(f'Server directory: {server_dir}')
-        
-        # Check if SERVER_JAR is an absolute path
-        if os.path.isabs(SERVER_JAR):
-            jar_path = SERVER_JAR
-        else:
-            jar_path = os.path.join(server_dir, SERVER_JAR)
-        
-        # Check if server jar exists
-        if not os.path.exists(jar_path):
-            add_log(f'ERROR: Server jar not found at {jar_path}')
-            server_status = 'stopped'
-            broadcast({'type': 'status', 'status': server_status})
-            return {'success': False, 'message': 'Server jar not found'}
-        
-        # Determine working directory - use JAR's directory if server_dir doesn't exist
-        if not os.path.exists(server_dir):
-            add_log(f'WARNING: Server directory does not exist: {server_dir}')
-            # Try to create it
-            try:
-                os.makedirs(server_dir, exist_ok=True)
-                add_log(f'Created server directory: {server_dir}')
-            except Exception as e:
-                # If we can't create it, use JAR's directory as fallback
-                if os.path.isabs(SERVER_JAR):
-                    server_dir = os.path.dirname(SERVER_JAR)
-                    add_log(f'Using JAR directory as working directory: {server_dir}')
-                else:
-                    error_msg = f'Server directory does not exist and cannot be created: {server_dir}'
-                    add_log(f'ERROR: {error_msg}')
-                    server_status = 'stopped'
-                    broadcast({'type': 'status', 'status': server_status})
-                    return {'success': False, 'message': error_msg}
-        
-        # Verify server_dir is actually a directory
-        if not os.path.isdir(server_dir):
-            error_msg = f'Server path is not a directory: {server_dir}'
-            add_log(f'ERROR: {error_msg}')
-            server_status = 'stopped'
-            broadcast({'type': 'status', 'status': server_status})
-            return {'success': False, 'message': error_msg}
-        
-        # Normalize paths for Windows
-        server_dir = os.path.normpath(server_dir)
-        jar_path = os.path.normpath(jar_path)
-        
-        add_log(f'Working directory: {server_dir}')
-        
-        # Start server process
-        java_args = [
-            '-Xmx8G',
-            '-Xms8G',
-            '-jar',
-            jar_path
-        ]
-        
-        add_log(f'Starting with command: {java_executable} {" ".join(java_args)}')
-        
-        try:
-            # Use the hardcoded path if it exists, otherwise use found java
-            java_to_use = "C:\\ProgramData\\Oracle\\Java\\javapath\\java.exe"
-            if not os.path.exists(java_to_use):
-                java_to_use = java_executable
-            
-            java_to_use = os.path.normpath(java_to_use)
-            
-            server_process = subprocess.Popen(
-                [java_to_use] + java_args,
-                cwd=server_dir,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                bufsize=0,  # Unbuffered for binary mode
-                universal_newlines=False
-            )
-            
-            # Read output in background threads
-            read_process_output(server_process)
-            
-            # Monitor process exit
-            def monitor_process():
-                global server_process, server_status
-                server_process.wait()
-                server_status = 'stopped'
-                broadcast({'type': 'status', 'status': server_status})
-                add_log(f'Server stopped with code {server_process.returncode}')
-                server_process = None
-            
-            threading.Thread(target=monitor_process, daemon=True).start()
-            
-            # Wait a bit to see if server starts successfully
-            def check_started():
-                global server_process, server_status
-                time.sleep(2)
-                if server_process and server_process.poll() is None:
-                    server_status = 'running'
-                    broadcast({'type': 'status', 'status': server_status})
-                    add_log('Server started successfully!')
-            
-            threading.Thread(target=check_started, daemon=True).start()
-            
-            return {'success': True, 'message': 'Server starting'}
-            
-        except FileNotFoundError as e:
-            error_msg = f'Java executable not found at "{java_executable}". Please install Java or set JAVA_PATH environment variable to the full path'
-            add_log(f'ERROR: {error_msg}')
-            server_status = 'stopped'
-            broadcast({'type': 'status', 'status': server_status})
-            return {'success': False, 'message': error_msg}
-        except Exception as e:
-            error_msg = f'Failed to start server: {str(e)}'
-            add_log(f'ERROR: {error_msg}')
-            server_status = 'stopped'
-            broadcast({'type': 'status', 'status': server_status})
-            return {'success': False, 'message': error_msg}
-            
-    except Exception as error:
-        server_status = 'stopped'
-        broadcast({'type': 'status', 'status': server_status})
-        add_log(f'ERROR: {str(error)}')
-        return {'success': False, 'message': str(error)}
+    return default_instance.start()
 
 
 def stop_server():
     """Stop server"""
-    global server_process, server_status
-    
-    if not server_process or server_status == 'stopped':
-        return {'success': False, 'message': 'Server is not running'}
-    
-    try:
-        server_status = 'stopping'
-        broadcast({'type': 'status', 'status': server_status})
-        add_log('Stopping server...')
-        
-        # Send stop command to server
-        if server_process.stdin:
-            try:
-                server_process.stdin.write('stop\n'.encode())
-                server_process.stdin.flush()
-            except:
-                pass
-        
-        # Force kill after 10 seconds if still running
-        def force_kill():
-            time.sleep(10)
-            if server_process and server_process.poll() is None:
-                server_process.terminate()
-                time.sleep(2)
-                if server_process.poll() is None:
-                    server_process.kill()
-        
-        threading.Thread(target=force_kill, daemon=True).start()
-        
-        return {'success': True, 'message': 'Server stopping'}
-    except Exception as error:
-        add_log(f'ERROR: {str(error)}')
-        return {'success': False, 'message': str(error)}
+    return default_instance.stop()
 
 
 def restart_server():
-    """Restart server"""
-    result = stop_server()
-    if result['success']:
-        time.sleep(3)
+    """Restart server once the running process has exited"""
+    return default_instance.restart()
+
+
+def wait_for_exit(process, timeout):
+    """Wait until `process` is no longer the default instance's process"""
+    with status_changed:
+        return status_changed.wait_for(lambda: default_instance.process is not process, timeout)
+
+
+def run_schedule(schedule):
+    """Run a schedule's action on the scheduler thread"""
+    action = schedule.action
+    if action == 'command':
+        return run_commands(schedule.commands, source='scheduler')
+    if action == 'broadcast':
+        return run_commands([f'say {schedule.message}'], source='scheduler')
+    if action == 'backup':
+        return create_backup()
+    if action == 'start':
         return start_server()
-    return result
-
 
-def execute_command(command):
+    # stop/restart: maintenance commands such as save-all first, then a graceful stop
+    if schedule.commands and default_instance.status == 'running':
+        result = run_commands(schedule.commands, source='scheduler')
+        if not result['success']:
+            add_log(f'WARNING: Scheduled commands before {action} failed: {result["message"]}')
+    process = default_instance.process
+    result = restart_server() if action == 'restart' else stop_server()
+    if not result['success'] or process is None:
+        return result
+    started = time.monotonic()
+    if not wait_for_exit(process, SCHEDULE_STOP_TIMEOUT):
+        return {'success': False, 'message': f'Server did not exit within {SCHEDULE_STOP_TIMEOUT:g}s'}
+    seconds = time.monotonic() - started
+    return {'success': True, 'message': f'Server exited after {seconds:.1f}s' + (', starting' if action == 'restart' else '')}
+
+
+def execute_command(command, quiet=False, source='api', wait=True):
     """Execute command on server"""
-    global server_process, server_status
-    
-    if not server_process or server_status != 'running':
-        return {'success': False, 'message': 'Server is not running'}
-    
+    return run_commands([command], quiet, source, wait)
+
+
+def run_commands(commands, quiet=False, source='api', wait=True, dispatcher=None):
+    """Queue commands as one job; with `wait`, return once they ran with their output
+
+    The result has `pending` set while the job has not finished, i.e. without
+    `wait` or when it took longer than COMMAND_TIMEOUT.
+    """
     try:
-        if server_process.stdin:
-            server_process.stdin.write(f'{command}\n'.encode())
-            server_process.stdin.flush()
-            add_log(f'[COMMAND] {command}')
-            return {'success': True, 'message': 'Command executed'}
-        return {'success': False, 'message': 'Cannot write to server stdin'}
-    except Exception as error:
+        job = (dispatcher or command_dispatcher).submit(commands, source, quiet, capture=wait)
+    except CommandError as error:
         return {'success': False, 'message': str(error)}
+    if not wait:
+        return job.to_dict()
+    return job.wait(COMMAND_TIMEOUT)
+
+
+def instance_dispatcher(instance):
+    """Command dispatcher of a non-default instance, writing to its stdin"""
+    with instance_dispatchers_lock:
+        dispatcher = instance_dispatchers.get(instance.id)
+        if dispatcher is None or dispatcher.get_instance() is not instance:
+            dispatcher = CommandDispatcher(
+                lambda: instance,
+                audit_path=os.path.join(DATA_PATH, 'commands', f'{instance.id}.log'),
+                max_queue=COMMAND_QUEUE_SIZE,
+                capture_window=COMMAND_CAPTURE_MS / 1000
+            )
+            instance.listeners.append(dispatcher.feed_line)
+            instance_dispatchers[instance.id] = dispatcher
+        return dispatcher
+
+
+def command_response(result):
+    """JSON response for a command result, 202 while the job is still pending"""
+    return jsonify(result), 202 if result.get('pending') else 200
+
+
+def get_rcon():
+    """Return the shared RCON pool, or None when RCON is not configured"""
+    global rcon_pool
+    if rcon_pool is not None:
+        return rcon_pool
+
+    port, password = RCON_PORT, RCON_PASSWORD
+    if password is None:
+        properties = get_server_properties().get('properties', {})
+        if properties.get('enable-rcon') != 'true':
+            return None
+        password = properties.get('rcon.password')
+        port = port or properties.get('rcon.port')
+    if not password:
+        return None
+
+    rcon_pool = RconPool(RCON_HOST, int(port or 25575), password, size=RCON_POOL_SIZE, timeout=RCON_TIMEOUT)
+    return rcon_pool
+
+
+def rcon_command(command):
+    """Reply to a background command over RCON, None when RCON is unavailable"""
+    rcon = get_rcon()
+    if rcon is not None:
+        try:
+            return rcon.command(command)
+        except RconError:
+            pass
+    return None
 
 
 def get_server_properties():
     """Read server.properties"""
     try:
-        props_path = os.path.join(SERVER_PATH, 'server.properties')
-        with open(props_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        properties = {}
-        for line in content.split('\n'):
-            line = line.strip()
-            if line and not line.startswith('#'):
-                parts = line.split('=', 1)
-                if len(parts) == 2:
-                    key = parts[0].strip()
-                    value = parts[1].strip()
-                    properties[key] = value
-        
-        return {'success': True, 'properties': properties}
+        return {'success': True, 'properties': properties_service.read()}
     except Exception as error:
         return {'success': False, 'message': str(error), 'properties': {}}
 
@@ -439,114 +680,299 @@ def get_server_properties():
 def update_server_properties(updates):
     """Update server.properties"""
     try:
-        props_path = os.path.join(SERVER_PATH, 'server.properties')
-        
-        # Read existing content
-        with open(props_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # Track which properties exist
-        existing_keys = set()
-        updated_lines = []
-        
-        for line in lines:
-            line_stripped = line.strip()
-            if line_stripped and not line_stripped.startswith('#'):
-                parts = line_stripped.split('=', 1)
-                if len(parts) == 2:
-                    key = parts[0].strip()
-                    existing_keys.add(key)
-                    if key in updates:
-                        updated_lines.append(f'{key}={updates[key]}\n')
-                        continue
-            updated_lines.append(line)
-        
-        # Add new properties
-        for key, value in updates.items():
-            if key not in existing_keys:
-                updated_lines.append(f'{key}={value}\n')
-        
-        # Write back
-        with open(props_path, 'w', encoding='utf-8') as f:
-            f.writelines(updated_lines)
-        
+        properties_service.update({key: str(value) for key, value in updates.items()})
         return {'success': True, 'message': 'Properties updated'}
     except Exception as error:
         return {'success': False, 'message': str(error)}
 
 
+def pause_saving():
+    """Turn autosave off and flush the world so region files stop changing"""
+    if default_instance.status != 'running':
+        return
+    execute_command('save-off', quiet=True, source='backup', wait=False)
+    world_saved.clear()
+    result = execute_command('save-all flush', quiet=True, source='backup')
+    if 'Saved the game' in result.get('response', ''):
+        return
+    if not world_saved.wait(BACKUP_SAVE_TIMEOUT):
+        add_log('WARNING: save-all flush was not confirmed, backing up anyway')
+
+
+def resume_saving():
+    """Turn autosave back on after a snapshot"""
+    if default_instance.status == 'running':
+        execute_command('save-on', quiet=True, source='backup', wait=False)
+
+
+def default_worlds():
+    """The level folder plus its nether and end dimensions when present"""
+    level = get_server_properties()['properties'].get('level-name', 'world')
+    worlds = [level, f'{level}_nether', f'{level}_the_end']
+    return [world for world in worlds if os.path.isdir(os.path.join(SERVER_PATH, world))]
+
+
+def create_backup(worlds=None):
+    """Start a backup in the background"""
+    from backup import BackupError
+    try:
+        backup_id = get_backup_engine().start(worlds or default_worlds())
+        return {'success': True, 'message': 'Backup started', 'id': backup_id}
+    except BackupError as error:
+        return {'success': False, 'message': str(error)}
+
+
+def restore_backup(backup_id):
+    """Start restoring a backup, the server must be stopped"""
+    if default_instance.status != 'stopped':
+        return {'success': False, 'message': 'Stop the server before restoring a backup'}
+    from backup import BackupError
+    try:
+        get_backup_engine().start_restore(backup_id)
+        # A crashed server waiting out its backoff would start on the restored files half way
+        if default_instance.policy is not None and default_instance.policy.cancel():
+            default_instance.log('Automatic restart cancelled for the restore')
+        return {'success': True, 'message': 'Restore started', 'id': backup_id}
+    except BackupError as error:
+        return {'success': False, 'message': str(error)}
+
+
 def get_plugins():
-    """Get plugins list"""
+    """Get plugins list with jar metadata"""
     try:
-        plugins_dir = os.path.join(SERVER_PATH, 'plugins')
-        if not os.path.exists(plugins_dir):
-            return {'success': True, 'plugins': []}
-        
-        files = os.listdir(plugins_dir)
-        plugins = []
-        for file in files:
-            if file.endswith('.jar'):
-                plugins.append({
-                    'name': file.replace('.jar', ''),
-                    'file': file,
-                    'enabled': True
-                })
-        
-        return {'success': True, 'plugins': plugins}
+        return {'success': True, 'plugins': plugin_catalog.scan()}
     except Exception as error:
-        return {'success': True, 'plugins': []}
+        return {'success': False, 'plugins': [], 'message': str(error)}
 
 
-def get_players():
-    """Get players list"""
-    if server_status != 'running':
+def get_players(refresh=False):
+    """Get players list from the console-driven player index"""
+    if default_instance.status != 'running':
         return {'success': False, 'players': [], 'message': 'Server is not running'}
-    
-    # In a real implementation, you'd use RCON or a plugin to query players
-    return {'success': True, 'players': [], 'message': 'RCON not configured. Install a plugin for player list.'}
 
+    # Optionally reconcile the index with the server's own list over RCON
+    if refresh:
+        rcon = get_rcon()
+        if rcon is not None:
+            try:
+                for line in COLOR_RE.sub('', rcon.command('list')).splitlines():
+                    player_tracker.feed_line(line)
+            except RconError as error:
+                add_log(f'WARNING: Could not refresh player list: {error}')
+
+    players = player_tracker.online()
+    max_players = player_tracker.max_players
+    if max_players is None:
+        max_players = get_server_properties()['properties'].get('max-players')
+    return {
+        'success': True,
+        'players': players,
+        'online': len(players),
+        'max': int(max_players) if max_players else None
+    }
+
+
+def get_player(key):
+    """Get one player's presence by UUID or name"""
+    player = player_tracker.get(key)
+    if player is None:
+        return {'success': False, 'message': 'Player not found'}
+    return {'success': True, 'player': player}
+
+
+def get_player_stats(key):
+    """Get one player's statistics and leaderboard ranks by UUID or name"""
+    from playerstats import PlayerStatsError
+    try:
+        return {'success': True, 'player': get_player_stats_index().player(key)}
+    except PlayerStatsError as error:
+        return {'success': False, 'message': str(error)}
+
+
+def get_leaderboards(metric=None, limit=None):
+    """Top players by one metric, or the top few of every metric"""
+    from playerstats import PlayerStatsError
+    player_stats = get_player_stats_index()
+    try:
+        if metric:
+            return {'success': True, 'metric': metric, 'players': player_stats.top(metric, limit or 50)}
+        return {'success': True, 'leaderboards': player_stats.leaderboards(limit or 10)}
+    except PlayerStatsError as error:
+        return {'success': False, 'message': str(error)}
+
+
+def get_tps(range_name=None):
+    """Get TPS (Ticks Per Second) from the background sampler"""
+    if range_name is not None:
+        if range_name not in TPS_RANGES:
+            return {'success': False, 'message': f'Unknown range, use one of: {", ".join(TPS_RANGES)}'}
+        return {'success': True, 'history': tps_sampler.history(range_name)}
 
-def get_tps():
-    """Get TPS (Ticks Per Second)"""
-    if server_status != 'running':
+    if default_instance.status != 'running':
         return {'success': False, 'tps': 0, 'message': 'Server is not running'}
-    
-    # TPS monitoring requires a plugin like spark or via RCON
-    return {'success': True, 'tps': 20.0, 'message': 'Install spark plugin for accurate TPS monitoring'}
 
+    latest = tps_sampler.latest
+    if latest is None:
+        return {'success': False, 'tps': 0, 'message': 'No TPS sample yet'}
+    return {'success': True, 'tps': latest['tps1m'], 'data': latest}
 
-def get_logs(lines=100):
-    """Read latest.log"""
+
+def get_metrics(range_name=None):
+    """Get CPU, memory, thread, fd, I/O and GC samples of the server process"""
+    process_sampler = get_process_sampler()
+    if not process_sampler.supported:
+        return {'success': False, 'message': 'Process metrics need /proc (Linux)'}
+    if range_name is not None:
+        if range_name not in TPS_RANGES:
+            return {'success': False, 'message': f'Unknown range, use one of: {", ".join(TPS_RANGES)}'}
+        return {'success': True, 'history': process_sampler.history(range_name), 'sampler': process_sampler.stats()}
+
+    if default_instance.status == 'stopped':
+        return {'success': False, 'message': 'Server is not running'}
+    latest = process_sampler.latest
+    if latest is None:
+        return {'success': False, 'message': 'No metrics sample yet'}
+    return {'success': True, 'data': latest, 'sampler': process_sampler.stats()}
+
+
+def get_logs(lines=100, after_offset=None):
+    """Read the end of latest.log, or the lines appended after a byte offset"""
     try:
         logs_path = os.path.join(SERVER_PATH, 'logs', 'latest.log')
-        with open(logs_path, 'r', encoding='utf-8', errors='replace') as f:
-            log_lines = [line.strip() for line in f.readlines() if line.strip()]
-        
+        if after_offset is not None:
+            log_lines, total, offset, reset = log_tail.read_after(logs_path, after_offset, lines)
+        else:
+            log_lines, total, offset = log_tail.tail(logs_path, lines)
+            reset = False
+
         return {
             'success': True,
-            'logs': log_lines[-lines:] if len(log_lines) > lines else log_lines,
-            'totalLines': len(log_lines)
+            'logs': log_lines,
+            'totalLines': total,
+            'offset': offset,
+            'reset': reset
         }
     except Exception as error:
         return {'success': False, 'logs': [], 'message': str(error)}
 
+
+def get_buffered_logs(after=0, limit=None, ring=None, log_filter=None, records=False):
+    """Read console lines from an in-memory ring after a sequence number"""
+    ring = log_ring if ring is None else ring
+    if log_filter is not None:
+        # Filter the whole ring, then keep the first (after) or last (tail) matches
+        entries = ring.since(after) if after is not None else ring.tail(ring.capacity)
+        entries = [entry for entry in entries if log_filter.match(entry)]
+        if limit is not None:
+            entries = entries[:limit] if after is not None else entries[-limit:]
+    else:
+        entries = ring.since(after, limit=limit) if after is not None else ring.tail(limit)
+    return {
+        'success': True,
+        'logs': [entry.to_record() if records else entry.format() for entry in entries],
+        'firstSeq': entries[0].seq if entries else None,
+        'lastSeq': ring.last_seq,
+        'oldestSeq': ring.first_seq
+    }
+
+def connect_replay(auth):
+    """Console lines for a newly connected socket as one log_batch, None when there is nothing to send
+
+    A client resuming with `{"after": seq}` gets the lines it missed appended;
+    a fresh one gets the last 50 as a replay that replaces its view.
+    """
+    after = auth.get('after') if isinstance(auth, dict) else None
+    resume = isinstance(after, int)
+    entries = log_ring.since(after, limit=max_logs) if resume else log_ring.tail(50)
+    if resume and not entries:
+        return None
+    return {
+        'type': 'log_batch',
+        'replay': not resume,
+        'firstSeq': entries[0].seq if entries else None,
+        'lastSeq': log_ring.last_seq,
+        'lines': [entry.format() for entry in entries]
+    }
+
+
+def snapshot_version(lines):
+    """Cheap stand-in for everything in the snapshot: changes whenever any part of it does"""
+    try:
+        properties_version = properties_service.version()
+    except OSError:
+        properties_version = None
+    return (
+        default_instance.status,
+        properties_version,
+        plugin_catalog.version(),
+        player_tracker.version,
+        (tps_sampler.latest or {}).get('sampledAt'),
+        log_ring.last_seq if lines else None,
+        lines
+    )
+
+
+def get_snapshot(lines=100, version=None):
+    """Everything the dashboard shows on load, in one document"""
+    players = get_players()
+    tps = get_tps()
+    logs = get_buffered_logs(None, lines) if lines else None
+    return {
+        'success': True,
+        'version': version,
+        'status': default_instance.status,
+        'properties': get_server_properties()['properties'],
+        'plugins': get_plugins()['plugins'],
+        'players': {key: players.get(key) for key in ('players', 'online', 'max')},
+        'tps': {key: value for key, value in tps.items() if key != 'success'} if tps['success'] else None,
+        'logs': {key: logs[key] for key in ('logs', 'firstSeq', 'lastSeq')} if logs else None
+    }
+
+
+def log_filter_from_args(args):
+    """LogFilter from ?level=&source=&thread=&contains= query arguments"""
+    spec = {key: args.getlist(key) if key in ('source', 'thread') else args.get(key)
+            for key in ('level', 'source', 'thread', 'contains') if key in args}
+    return LogFilter.from_spec(spec)
+
+
+def set_log_filter(sid, data):
+    """Apply a client's console filter; returns the messages to send it back"""
+    data = data if isinstance(data, dict) else {}
+    try:
+        log_filter = LogFilter.from_spec({key: data.get(key) for key in ('level', 'source', 'thread', 'contains')})
+    except ValueError as e:
+        return [{'type': 'log_filter', 'success': False, 'message': str(e)}]
+    records = bool(data.get('records'))
+    if not log_broadcaster.set_filter(sid, log_filter, records):
+        return [{'type': 'log_filter', 'success': False, 'message': 'Not connected'}]
+
+    # Replay the recent matches so the client can start from a filtered view
+    replay = get_buffered_logs(None, 50, log_ring, log_filter, records)
+    return [
+        {'type': 'log_filter', 'success': True, 'filter': log_filter.to_dict() if log_filter else None,
+         'records': records},
+        {'type': 'log_batch', 'replay': True, 'firstSeq': replay['firstSeq'], 'lastSeq': replay['lastSeq'],
+         'records' if records else 'lines': replay['logs']}
+    ]
+
+
 @socketio.on('connect')
 def handle_connect(auth=None):
     """Handle WebSocket connection"""
     try:
+        log_broadcaster.add_client(request.sid)
         add_log('Client connected to WebSocket')
 
         # Send server status
         emit('status', {
-            'status': server_status
+            'status': default_instance.status
         })
 
-        # Send last logs
-        recent_logs = logs[-50:]
-        for log in recent_logs:
-            emit('log', {
-                'line': log
-            })
+        # Last logs, or everything after the client's last seen seq, in one frame
+        replay = connect_replay(auth)
+        if replay is not None:
+            emit('message', replay)
 
     except Exception as e:
         print("Error in handle_connect:", e)
@@ -556,11 +982,42 @@ def handle_connect(auth=None):
 def handle_disconnect():
     """Handle WebSocket disconnect"""
     try:
+        log_broadcaster.remove_client(request.sid)
         add_log('Client disconnected from WebSocket')
     except Exception as e:
         print(f'Error in handle_disconnect: {e}')
 
 
+@socketio.on('log_filter')
+def handle_log_filter(data=None):
+    """Only receive console lines matching a filter, e.g. {"level": "WARN", "source": "LuckPerms"}"""
+    for message in set_log_filter(request.sid, data):
+        emit('message', message)
+
+
+@socketio.on('subscribe_instance')
+def handle_subscribe_instance(data):
+    """Follow another instance's console, replaying its recent lines"""
+    instance = instance_manager.get((data or {}).get('instance'))
+    if instance is None or instance is default_instance:
+        return
+    join_room(f'instance:{instance.id}')
+    entries = instance.log_ring.since(data['after']) if data.get('after') else instance.log_ring.tail(50)
+    if entries:
+        emit('message', {
+            'type': 'instance_log',
+            'instance': instance.id,
+            'lines': [entry.format() for entry in entries],
+            'firstSeq': entries[0].seq,
+            'lastSeq': entries[-1].seq
+        })
+
+
+@socketio.on('unsubscribe_instance')
+def handle_unsubscribe_instance(data):
+    leave_room(f'instance:{(data or {}).get("instance")}')
+
+
 # API Routes
 
 # Server control
@@ -584,7 +1041,12 @@ def api_restart_server():
 
 @app.route('/api/server/status', methods=['GET'])
 def api_get_status():
-    return jsonify({'status': server_status})
+    return jsonify({'status': default_instance.status})
+
+
+@app.route('/api/server/boots', methods=['GET'])
+def api_get_boots():
+    return jsonify(get_boots(DEFAULT_INSTANCE, min(request.args.get('limit', 20, type=int), 50)))
 
 
 # Command execution
@@ -594,8 +1056,101 @@ def api_execute_command():
     if not data or 'command' not in data:
         return jsonify({'success': False, 'message': 'Command is required'}), 400
     
-    result = execute_command(data['command'])
-    return jsonify(result)
+    result = execute_command(data['command'], wait=data.get('wait', True) is not False)
+    return command_response(result)
+
+
+@app.route('/api/server/commands', methods=['POST'])
+def api_execute_commands():
+    data = request.get_json(silent=True)
+    commands = data.get('commands') if isinstance(data, dict) else None
+    if not isinstance(commands, list) or not commands:
+        return jsonify({'success': False, 'message': 'commands must be a non-empty list'}), 400
+    result = run_commands(commands, source='api-batch', wait=data.get('wait', True) is not False)
+    return command_response(result)
+
+
+@app.route('/api/commands/history', methods=['GET'])
+def api_command_history():
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    return jsonify({'success': True, 'history': command_dispatcher.history(limit)})
+
+
+@app.route('/api/commands/<job_id>', methods=['GET'])
+def api_get_command(job_id):
+    with instance_dispatchers_lock:
+        dispatchers = [command_dispatcher, *instance_dispatchers.values()]
+    for dispatcher in dispatchers:
+        job = dispatcher.get(job_id)
+        if job is not None:
+            return command_response(job.to_dict())
+    return jsonify({'success': False, 'message': 'Command not found'}), 404
+
+
+# Schedules
+@app.route('/api/schedules', methods=['GET'])
+def api_get_schedules():
+    return jsonify({'success': True, 'schedules': get_scheduler().list()})
+
+
+@app.route('/api/schedules', methods=['POST'])
+def api_create_schedule():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Schedule is required'}), 400
+    from scheduler import ScheduleError
+    scheduler = get_scheduler()
+    try:
+        schedule = scheduler.add(data)
+    except ScheduleError as error:
+        return jsonify({'success': False, 'message': str(error)}), 400
+    scheduler.save()
+    return jsonify({'success': True, 'schedule': schedule.to_dict()}), 201
+
+
+@app.route('/api/schedules/<schedule_id>', methods=['GET'])
+def api_get_schedule(schedule_id):
+    schedule = get_scheduler().get(schedule_id)
+    if schedule is None:
+        return jsonify({'success': False, 'message': 'Schedule not found'}), 404
+    return jsonify({'success': True, 'schedule': schedule})
+
+
+@app.route('/api/schedules/<schedule_id>', methods=['PUT'])
+def api_update_schedule(schedule_id):
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Schedule is required'}), 400
+    from scheduler import ScheduleError
+    scheduler = get_scheduler()
+    try:
+        schedule = scheduler.update(schedule_id, data)
+    except KeyError:
+        return jsonify({'success': False, 'message': 'Schedule not found'}), 404
+    except ScheduleError as error:
+        return jsonify({'success': False, 'message': str(error)}), 400
+    scheduler.save()
+    return jsonify({'success': True, 'schedule': schedule.to_dict()})
+
+
+@app.route('/api/schedules/<schedule_id>', methods=['DELETE'])
+def api_delete_schedule(schedule_id):
+    scheduler = get_scheduler()
+    try:
+        scheduler.remove(schedule_id)
+    except KeyError:
+        return jsonify({'success': False, 'message': 'Schedule not found'}), 404
+    scheduler.save()
+    return jsonify({'success': True, 'message': 'Schedule removed'})
+
+
+@app.route('/api/schedules/<schedule_id>/run', methods=['POST'])
+def api_run_schedule(schedule_id):
+    try:
+        get_scheduler().run_now(schedule_id)
+    except KeyError:
+        return jsonify({'success': False, 'message': 'Schedule not found'}), 404
+    return jsonify({'success': True, 'message': 'Schedule queued'})
 
 
 # Server properties
@@ -622,17 +1177,122 @@ def api_get_plugins():
     return jsonify(result)
 
 
+# Backups
+@app.route('/api/backups', methods=['GET'])
+def api_get_backups():
+    backup_engine = get_backup_engine()
+    return jsonify({'success': True, 'backups': backup_engine.list(), 'current': backup_engine.current})
+
+
+@app.route('/api/backups', methods=['POST'])
+def api_create_backup():
+    data = request.get_json(silent=True) or {}
+    result = create_backup(data.get('worlds'))
+    return jsonify(result), 202 if result['success'] else 409
+
+
+@app.route('/api/backups/<backup_id>', methods=['GET'])
+def api_get_backup(backup_id):
+    from backup import BackupError
+    try:
+        backup = get_backup_engine().summary(backup_id)
+    except BackupError as error:
+        return jsonify({'success': False, 'message': str(error)}), 404
+    return jsonify({'success': True, 'backup': backup})
+
+
+@app.route('/api/backups/<backup_id>', methods=['DELETE'])
+def api_delete_backup(backup_id):
+    from backup import BackupError
+    backup_engine = get_backup_engine()
+    try:
+        backup_engine.summary(backup_id)
+    except BackupError as error:
+        return jsonify({'success': False, 'message': str(error)}), 404
+    try:
+        result = backup_engine.delete(backup_id)
+    except BackupError as error:
+        # A backup, restore or another delete is running
+        return jsonify({'success': False, 'message': str(error)}), 409
+    return jsonify(dict(result, success=True, message='Backup deleted'))
+
+
+@app.route('/api/backups/<backup_id>/restore', methods=['POST'])
+def api_restore_backup(backup_id):
+    result = restore_backup(backup_id)
+    return jsonify(result), 202 if result['success'] else 409
+
+
 # Players
 @app.route('/api/players', methods=['GET'])
 def api_get_players():
-    result = get_players()
+    result = get_players(request.args.get('refresh') == '1')
     return jsonify(result)
 
 
+@app.route('/api/players/all', methods=['GET'])
+def api_get_all_players():
+    return jsonify({'success': True, 'players': player_tracker.all_players()})
+
+
+@app.route('/api/players/<key>', methods=['GET'])
+def api_get_player(key):
+    result = get_player(key)
+    return jsonify(result), 200 if result['success'] else 404
+
+
+@app.route('/api/players/<key>/stats', methods=['GET'])
+def api_get_player_stats(key):
+    result = get_player_stats(key)
+    return jsonify(result), 200 if result['success'] else 404
+
+
+@app.route('/api/leaderboards', methods=['GET'])
+def api_get_leaderboards():
+    result = get_leaderboards(request.args.get('metric'), request.args.get('limit', type=int))
+    return jsonify(result), 200 if result['success'] else 400
+
+
 # TPS
 @app.route('/api/tps', methods=['GET'])
 def api_get_tps():
-    result = get_tps()
+    result = get_tps(request.args.get('range'))
+    return jsonify(result)
+
+
+# Incidents
+@app.route('/api/incidents', methods=['GET'])
+def api_get_incidents():
+    sort = request.args.get('sort', 'count')
+    if sort not in ('count', 'recent'):
+        return jsonify({'success': False, 'message': 'sort must be count or recent'}), 400
+    incident_detector = get_incident_detector()
+    limit = min(request.args.get('limit', 20, type=int), incident_detector.capacity)
+    return jsonify({
+        'success': True,
+        'incidents': incident_detector.list(limit, sort),
+        'exceptions': incident_detector.exceptions
+    })
+
+
+@app.route('/api/incidents/<incident_id>', methods=['GET'])
+def api_get_incident(incident_id):
+    incident = get_incident_detector().get(incident_id)
+    if incident is None:
+        return jsonify({'success': False, 'message': 'Incident not found'}), 404
+    return jsonify({'success': True, 'incident': incident})
+
+
+@app.route('/api/incidents', methods=['DELETE'])
+def api_clear_incidents():
+    get_incident_detector().clear()
+    return jsonify({'success': True, 'message': 'Incidents cleared'})
+
+
+# Process metrics
+@app.route('/api/metrics', methods=['GET'])
+def api_get_metrics():
+    result = get_metrics(request.args.get('range'))
     return jsonify(result)
 
 
@@ -640,20 +1300,226 @@ def api_get_tps():
 @app.route('/api/logs', methods=['GET'])
 def api_get_logs():
     lines = request.args.get('lines', 100, type=int)
-    result = get_logs(lines)
+    after = request.args.get('after', type=int)
+    after_offset = request.args.get('after_offset', type=int)
+    try:
+        log_filter = log_filter_from_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    records = request.args.get('format') == 'records'
+    if after is not None or log_filter is not None or records:
+        result = get_buffered_logs(after, lines, log_filter=log_filter, records=records)
+    else:
+        result = get_logs(lines, after_offset)
+    return jsonify(result)
+
+
+@app.route('/api/logs/search', methods=['GET'])
+def api_search_logs():
+    query = request.args.get('q', '')
+    log_indexer = get_log_indexer()
+    log_indexer.start()
+    try:
+        results = log_indexer.search(
+            query,
+            limit=min(request.args.get('limit', 100, type=int), 1000),
+            cursor=request.args.get('cursor'),
+            level=request.args.get('level', type=str.upper),
+            since=request.args.get('since'),
+            until=request.args.get('until')
+        )
+        first = next(results)
+    except ValueError as error:
+        return jsonify({'success': False, 'message': str(error)}), 400
+
+    def generate():
+        yield json.dumps(first) + '\n'
+        for item in results:
+            yield json.dumps(item) + '\n'
+
+    # One JSON object per line, the last one carries nextCursor
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/logs/files', methods=['GET'])
+def api_get_log_files():
+    log_indexer = get_log_indexer()
+    log_indexer.start()
+    return jsonify({
+        'success': True,
+        'files': log_indexer.files(),
+        'indexing': log_indexer.indexing,
+        'lastScan': log_indexer.last_scan
+    })
+
+
+@app.route('/api/logs/stats', methods=['GET'])
+def api_get_log_stats():
+    return jsonify({
+        'ingest': default_instance.ingest_stats() if default_instance.started_at else None,
+        'broadcast': log_broadcaster.stats(),
+        'buffer': {'size': len(log_ring), 'lastSeq': log_ring.last_seq}
+    })
+
+
+# Instances
+def instance_or_404(instance_id):
+    instance = instance_manager.get(instance_id)
+    if instance is None:
+        return None, (jsonify({'success': False, 'message': f'Instance not found: {instance_id}'}), 404)
+    return instance, None
+
+
+@app.route('/api/instances', methods=['GET'])
+def api_get_instances():
+    return jsonify({
+        'success': True,
+        'instances': [instance.to_dict() for instance in instance_manager.instances.values()]
+    })
+
+
+@app.route('/api/instances', methods=['POST'])
+def api_create_instance():
+    data = request.get_json(silent=True) or {}
+    if not data.get('id') or not data.get('path') or not data.get('jar'):
+        return jsonify({'success': False, 'message': 'id, path and jar are required'}), 400
+    try:
+        instance = instance_manager.add(data['id'], data['path'], data['jar'], data.get('javaArgs'))
+    except ValueError as error:
+        return jsonify({'success': False, 'message': str(error)}), 409
+    instance_manager.save(skip=(DEFAULT_INSTANCE,))
+    return jsonify({'success': True, 'instance': instance.to_dict()}), 201
+
+
+@app.route('/api/instances/<instance_id>', methods=['DELETE'])
+def api_delete_instance(instance_id):
+    if instance_id == DEFAULT_INSTANCE:
+        return jsonify({'success': False, 'message': 'The default instance cannot be removed'}), 400
+    try:
+        instance_manager.remove(instance_id)
+    except KeyError:
+        return jsonify({'success': False, 'message': f'Instance not found: {instance_id}'}), 404
+    except ValueError as error:
+        return jsonify({'success': False, 'message': str(error)}), 409
+    with instance_dispatchers_lock:
+        dispatcher = instance_dispatchers.pop(instance_id, None)
+    if dispatcher is not None:
+        dispatcher.close()
+    instance_manager.save(skip=(DEFAULT_INSTANCE,))
+    return jsonify({'success': True, 'message': 'Instance removed'})
+
+
+@app.route('/api/instances/<instance_id>/status', methods=['GET'])
+def api_get_instance_status(instance_id):
+    instance, error = instance_or_404(instance_id)
+    if error:
+        return error
+    return jsonify(dict(instance.to_dict(), success=True, ingest=instance.ingest_stats()))
+
+
+@app.route('/api/instances/<instance_id>/<action>', methods=['POST'])
+def api_control_instance(instance_id, action):
+    if instance_id == DEFAULT_INSTANCE:
+        # Keep backup guards and RCON for the default server
+        handlers = {'start': start_server, 'stop': stop_server, 'restart': restart_server}
+    else:
+        instance, error = instance_or_404(instance_id)
+        if error:
+            return error
+        handlers = {'start': instance.start, 'stop': instance.stop, 'restart': instance.restart}
+
+    if action == 'command':
+        data = request.get_json(silent=True)
+        if not data or 'command' not in data:
+            return jsonify({'success': False, 'message': 'Command is required'}), 400
+        wait = data.get('wait', True) is not False
+        if instance_id == DEFAULT_INSTANCE:
+            return command_response(execute_command(data['command'], wait=wait))
+        return command_response(run_commands([data['command']], source='api', wait=wait,
+                                             dispatcher=instance_dispatcher(instance)))
+    if action not in handlers:
+        return jsonify({'success': False, 'message': f'Unknown action: {action}'}), 404
+    return jsonify(handlers[action]())
+
+
+@app.route('/api/instances/<instance_id>/boots', methods=['GET'])
+def api_get_instance_boots(instance_id):
+    instance, error = instance_or_404(instance_id)
+    if error:
+        return error
+    return jsonify(get_boots(instance.id, min(request.args.get('limit', 20, type=int), 50)))
+
+
+@app.route('/api/instances/<instance_id>/logs', methods=['GET'])
+def api_get_instance_logs(instance_id):
+    instance, error = instance_or_404(instance_id)
+    if error:
+        return error
+    try:
+        log_filter = log_filter_from_args(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    # Without ?after= the newest lines are returned
+    result = get_buffered_logs(
+        request.args.get('after', type=int),
+        request.args.get('lines', 100, type=int),
+        instance.log_ring,
+        log_filter,
+        request.args.get('format') == 'records'
+    )
     return jsonify(result)
 
 
+# World
+@app.route('/api/world/stats', methods=['GET'])
+def api_get_world_stats():
+    return jsonify(get_region_analyzer().stats(
+        default_worlds(),
+        refresh=bool(request.args.get('refresh')),
+        heatmap=bool(request.args.get('heatmap'))
+    ))
+
+
+# Java
+@app.route('/api/java', methods=['GET'])
+def api_get_java():
+    if request.args.get('refresh'):
+        java_finder.scan(refresh=True)
+    return jsonify(dict(java_finder.to_dict(), success=True))
+
+
+# Snapshot
+@app.route('/api/snapshot', methods=['GET'])
+def api_get_snapshot():
+    lines = max(0, min(request.args.get('logs', 100, type=int), max_logs))
+    status, body, headers = snapshot_cache.respond(
+        snapshot_version(lines),
+        lambda etag: get_snapshot(lines, etag),
+        request.headers.get('If-None-Match'),
+        request.headers.get('Accept-Encoding')
+    )
+    return Response(body, status=status, headers=headers, content_type='application/json')
+
+
 # Health check
 @app.route('/api/health', methods=['GET'])
 def api_health():
-    return jsonify({'status': 'ok', 'serverStatus': server_status})
+    return jsonify({'status': 'ok', 'serverStatus': default_instance.status})
+
+
+# Prometheus
+@app.route('/metrics', methods=['GET'])
+def api_prometheus_metrics():
+    from exporter import CONTENT_TYPE
+    return Response(get_prometheus().registry.render(), content_type=CONTENT_TYPE)
 
 
 if __name__ == '__main__':
     print(f'PaperMC Dashboard API server running on http://localhost:{API_PORT}')
     print(f'Configure SERVER_PATH environment variable to point to your PaperMC server directory')
     add_log(f'API server started on port {API_PORT}')
+    tps_sampler.start()
+    warm_up()
     try:
         socketio.run(app, host='0.0.0.0', port=API_PORT, debug=False, allow_unsafe_werkzeug=True)
     except Exception as e:
@@ -0,0 +1,151 @@
+"""asyncio runtime for the dashboard API
+
+Serves the same REST routes and Socket.IO events as app.py. Socket.IO
+connections are coroutines on python-socketio's AsyncServer instead of one
+OS thread each, the Paper processes run under asyncio.create_subprocess_exec,
+and start/stop/restart only schedule work on the loop. The Flask routes are
+mounted unchanged and run on a small thread pool.
+
+Run with `python app_async.py`, or
+`uvicorn app_async:asgi_app --port 3001 --ws-per-message-deflate false`.
+"""
+import asyncio
+import os
+
+import socketio
+import uvicorn
+from a2wsgi import WSGIMiddleware
+from engineio import packet as eio_packet
+from socketio import packet as sio_packet
+
+# app.py builds its instance manager at import, this makes it the asyncio one
+os.environ['DASHBOARD_RUNTIME'] = 'asyncio'
+
+import app as dashboard  # noqa: E402
+
+# Threads serving the Flask routes
+ASGI_WORKERS = int(os.getenv('ASGI_WORKERS', 16))
+
+sio = socketio.AsyncServer(
+    async_mode='asgi',
+    cors_allowed_origins='*',
+    logger=False,
+    engineio_logger=False,
+    ping_timeout=60,
+    ping_interval=25
+)
+
+
+class SocketBridge:
+    """Flask-SocketIO style emit() for an AsyncServer, callable from any thread
+
+    The packet is encoded once and queued on every recipient's socket in a
+    single pass; AsyncServer.emit would create a task per recipient, which
+    dominates the cost of a broadcast to a thousand dashboards. `server` is
+    exposed so LogBroadcaster can read client queue depths.
+    """
+
+    def __init__(self, server, loop):
+        self.server = server
+        self.loop = loop
+
+    async def _emit(self, event, data, namespace, to, skip_sid):
+        server = self.server
+        if namespace not in server.manager.rooms:
+            return
+        skip = set(skip_sid) if isinstance(skip_sid, list) else {skip_sid}
+        encoded = server.packet_class(sio_packet.EVENT, namespace=namespace, data=[event, data]).encode()
+        pkt = eio_packet.Packet(eio_packet.MESSAGE, encoded)
+        for sid, eio_sid in list(server.manager.get_participants(namespace, to)):
+            if sid not in skip:
+                await server._send_eio_packet(eio_sid, pkt)
+
+    def emit(self, event, data, namespace='/', to=None, skip_sid=None):
+        coro = self._emit(event, data, namespace, to, skip_sid)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.loop.create_task(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+@sio.event
+async def connect(sid, environ, auth=None):
+    """Handle WebSocket connection"""
+    try:
+        dashboard.log_broadcaster.add_client(sid)
+        dashboard.add_log('Client connected to WebSocket')
+
+        await sio.emit('status', {'status': dashboard.default_instance.status}, to=sid)
+
+        # Last logs, or everything after the client's last seen seq, in one frame
+        replay = dashboard.connect_replay(auth)
+        if replay is not None:
+            await sio.emit('message', replay, to=sid)
+
+    except Exception as e:
+        print('Error in handle_connect:', e)
+
+
+@sio.event
+async def disconnect(sid):
+    """Handle WebSocket disconnect"""
+    try:
+        dashboard.log_broadcaster.remove_client(sid)
+        dashboard.add_log('Client disconnected from WebSocket')
+    except Exception as e:
+        print(f'Error in handle_disconnect: {e}')
+
+
+@sio.event
+async def log_filter(sid, data=None):
+    """Only receive console lines matching a filter"""
+    for message in dashboard.set_log_filter(sid, data):
+        await sio.emit('message', message, to=sid)
+
+
+@sio.event
+async def subscribe_instance(sid, data):
+    """Follow another instance's console, replaying its recent lines"""
+    instance = dashboard.instance_manager.get((data or {}).get('instance'))
+    if instance is None or instance is dashboard.default_instance:
+        return
+    await sio.enter_room(sid, f'instance:{instance.id}')
+    entries = instance.log_ring.since(data['after']) if data.get('after') else instance.log_ring.tail(50)
+    if entries:
+        await sio.emit('message', {
+            'type': 'instance_log',
+            'instance': instance.id,
+            'lines': [entry.format() for entry in entries],
+            'firstSeq': entries[0].seq,
+            'lastSeq': entries[-1].seq
+        }, to=sid)
+
+
+@sio.event
+async def unsubscribe_instance(sid, data):
+    await sio.leave_room(sid, f'instance:{(data or {}).get("instance")}')
+
+
+async def startup():
+    loop = asyncio.get_running_loop()
+    dashboard.instance_manager.bind(loop)
+    dashboard.use_socket_server(SocketBridge(sio, loop))
+    dashboard.add_log(f'API server started on port {dashboard.API_PORT} (asyncio)')
+    dashboard.tps_sampler.start()
+    dashboard.warm_up()
+
+
+asgi_app = socketio.ASGIApp(
+    sio,
+    other_asgi_app=WSGIMiddleware(dashboard.app, workers=ASGI_WORKERS),
+    on_startup=startup
+)
+
+
+if __name__ == '__main__':
+    print(f'PaperMC Dashboard API server (asyncio) running on http://localhost:{dashboard.API_PORT}')
+    uvicorn.run(asgi_app, host='0.0.0.0', port=dashboard.API_PORT, log_level='warning', ws_per_message_deflate=False)
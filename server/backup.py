@@ -0,0 +1,402 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+
+# Region files change a few 4 KiB sectors at a time, so they get small chunks
+REGION_CHUNK = 64 * 1024
+FILE_CHUNK = 1024 * 1024
+# Compressions in flight at once, bounds memory held by pending chunks
+MAX_IN_FLIGHT = 64
+# Files never worth backing up
+SKIP_FILES = ('session.lock',)
+# Written next to each manifest with everything but its file list
+SUMMARY_SUFFIX = '.summary.json'
+
+
+def compress_chunk(data):
+    """Process pool worker, must stay a module-level function to be picklable"""
+    return zlib.compress(data, 6)
+
+
+class BackupError(Exception):
+    """Backup or restore could not be performed"""
+
+
+class BackupEngine:
+    """Incremental, deduplicated world backups in a content-addressed store
+
+    Files are split into chunks named by their SHA-256 and stored
+    zlib-compressed under `<store>/chunks`, so a chunk shared by several
+    files or backups is stored once. A file whose size and mtime match the
+    previous backup reuses that backup's chunk list without being read.
+    Each backup is a JSON manifest under `<store>/manifests`, with a small
+    summary beside it so listing backups never parses the chunk lists.
+
+    `before_snapshot`/`after_snapshot` are called around the read phase
+    (e.g. save-off / save-all flush and save-on) and `on_progress` receives
+    progress dicts.
+    """
+
+    def __init__(self, root, store_dir, before_snapshot=None, after_snapshot=None,
+                 on_progress=None, workers=None):
+        self.root = root
+        self.store_dir = store_dir
+        self.chunks_dir = os.path.join(store_dir, 'chunks')
+        self.manifests_dir = os.path.join(store_dir, 'manifests')
+        self.before_snapshot = before_snapshot
+        self.after_snapshot = after_snapshot
+        self.on_progress = on_progress
+        self.workers = workers
+        self.current = None
+        self.restoring = False
+        self._lock = threading.Lock()
+        self._known_chunks = None
+
+    # Store layout
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    def _manifest_path(self, backup_id):
+        if not backup_id or os.sep in backup_id or '/' in backup_id or backup_id.startswith('.'):
+            raise BackupError(f'Invalid backup id: {backup_id}')
+        return os.path.join(self.manifests_dir, f'{backup_id}.json')
+
+    def _summary_path(self, backup_id):
+        return self._manifest_path(backup_id)[:-len('.json')] + SUMMARY_SUFFIX
+
+    @staticmethod
+    def _write_json(path, data):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _summarize(manifest):
+        summary = {key: value for key, value in manifest.items() if key != 'files'}
+        summary['fileCount'] = len(manifest['files'])
+        return summary
+
+    def _load_known_chunks(self):
+        if self._known_chunks is None:
+            known = set()
+            if os.path.isdir(self.chunks_dir):
+                for prefix in os.listdir(self.chunks_dir):
+                    known.update(os.listdir(os.path.join(self.chunks_dir, prefix)))
+            self._known_chunks = known
+        return self._known_chunks
+
+    def _write_chunk(self, digest, data):
+        path = self._chunk_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._known_chunks.add(digest)
+
+    def list(self):
+        """Summaries of every backup, newest first"""
+        if not os.path.isdir(self.manifests_dir):
+            return []
+        backups = []
+        for name in os.listdir(self.manifests_dir):
+            if name.endswith('.json') and not name.endswith(SUMMARY_SUFFIX):
+                try:
+                    backups.append(self.summary(name[:-len('.json')]))
+                except BackupError:
+                    # Deleted since listdir
+                    continue
+        backups.sort(key=lambda b: b['created'], reverse=True)
+        return backups
+
+    def summary(self, backup_id):
+        """One backup without its file list"""
+        try:
+            with open(self._summary_path(backup_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+        # Backups made before summaries existed get one on first use
+        summary = self._summarize(self.get(backup_id))
+        try:
+            self._write_json(self._summary_path(backup_id), summary)
+        except OSError as e:
+            print(f'Error writing backup summary: {e}')
+        return summary
+
+    def get(self, backup_id):
+        try:
+            with open(self._manifest_path(backup_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise BackupError(f'Backup not found: {backup_id}')
+
+    def _latest_files(self, worlds):
+        """path -> file entry from the newest backup of each world, to skip unchanged files"""
+        latest = {}
+        pending = set(worlds)
+        for summary in self.list():
+            covered = pending.intersection(summary['worlds'])
+            if not covered:
+                continue
+            pending -= covered
+            for entry in self.get(summary['id'])['files']:
+                if entry['path'].split('/', 1)[0] in covered:
+                    latest[entry['path']] = entry
+            if not pending:
+                break
+        return latest
+
+    # Backup
+
+    def start(self, worlds):
+        """Run a backup of `worlds` (directory names under root) in the background"""
+        missing = [w for w in worlds if not self._is_world(w)]
+        if not worlds or missing:
+            raise BackupError(f'World not found: {", ".join(missing) or "none given"}')
+        backup_id = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        self._launch(backup_id, self.backup, backup_id, list(worlds))
+        return backup_id
+
+    def start_restore(self, backup_id, target=None):
+        """Run a restore in the background, returns immediately"""
+        self.get(backup_id)
+        self._launch(backup_id, self.restore, backup_id, target, restoring=True)
+
+    def _is_world(self, name):
+        return (bool(name) and not os.path.isabs(name) and '..' not in name.replace('\\', '/').split('/')
+                and os.path.isdir(os.path.join(self.root, name)))
+
+    def _claim(self, backup_id, restoring=False):
+        # One backup, restore or delete at a time, they would fight over the same files
+        with self._lock:
+            if self.current is not None:
+                raise BackupError(f'Backup {self.current} is already in progress')
+            self.current = backup_id
+            # Set before the thread runs, so nothing starts the server in between
+            if restoring:
+                self.restoring = True
+
+    def _launch(self, backup_id, target, *args, restoring=False):
+        self._claim(backup_id, restoring)
+        threading.Thread(target=self._run, args=(backup_id, target) + args, daemon=True).start()
+
+    def _run(self, backup_id, target, *args):
+        try:
+            target(*args)
+        except Exception as e:
+            self._progress({'id': backup_id, 'phase': 'failed', 'message': str(e)})
+        finally:
+            self.current = None
+
+    def _progress(self, data):
+        if self.on_progress is not None:
+            try:
+                self.on_progress(data)
+            except Exception as e:
+                print(f'Error reporting backup progress: {e}')
+
+    def _walk(self, worlds):
+        for world in worlds:
+            base = os.path.join(self.root, world)
+            for dirpath, _, filenames in os.walk(base):
+                for name in filenames:
+                    if name in SKIP_FILES:
+                        continue
+                    path = os.path.join(dirpath, name)
+                    yield os.path.relpath(path, self.root).replace(os.sep, '/'), path
+
+    def backup(self, backup_id, worlds):
+        """Snapshot `worlds` into the store and write the manifest"""
+        started = time.monotonic()
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        known = self._load_known_chunks()
+        previous = self._latest_files(worlds)
+        stats = {'files': 0, 'bytes': 0, 'reusedFiles': 0, 'newChunks': 0, 'newBytes': 0, 'storedBytes': 0}
+        files = []
+        in_flight = deque()
+        queued = set()
+        last_report = 0.0
+
+        def drain(limit):
+            while len(in_flight) > limit:
+                digest, future = in_flight.popleft()
+                data = future.result()
+                self._write_chunk(digest, data)
+                stats['storedBytes'] += len(data)
+
+        if self.before_snapshot is not None:
+            self.before_snapshot()
+        resumed = False
+        try:
+            self._progress({'id': backup_id, 'phase': 'snapshot', 'worlds': worlds})
+            # multiprocessing is only loaded once a backup actually runs
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                for rel, path in self._walk(worlds):
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    stats['files'] += 1
+                    stats['bytes'] += st.st_size
+
+                    cached = previous.get(rel)
+                    if (cached and cached['size'] == st.st_size and cached['mtime_ns'] == st.st_mtime_ns
+                            and all(digest in known for digest in cached['chunks'])):
+                        files.append(cached)
+                        stats['reusedFiles'] += 1
+                        continue
+
+                    chunk_size = REGION_CHUNK if rel.endswith('.mca') else FILE_CHUNK
+                    chunks = []
+                    with open(path, 'rb') as f:
+                        while True:
+                            data = f.read(chunk_size)
+                            if not data:
+                                break
+                            digest = hashlib.sha256(data).hexdigest()
+                            chunks.append(digest)
+                            if digest in known or digest in queued:
+                                continue
+                            queued.add(digest)
+                            stats['newChunks'] += 1
+                            stats['newBytes'] += len(data)
+                            in_flight.append((digest, pool.submit(compress_chunk, data)))
+                            drain(MAX_IN_FLIGHT)
+                    files.append({'path': rel, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'chunks': chunks})
+
+                    now = time.monotonic()
+                    if now - last_report >= 0.5:
+                        last_report = now
+                        self._progress(dict(stats, id=backup_id, phase='copying', file=rel))
+
+                # Everything is read, the server may save again while compression finishes
+                resumed = True
+                if self.after_snapshot is not None:
+                    self.after_snapshot()
+                drain(0)
+        finally:
+            if not resumed and self.after_snapshot is not None:
+                self.after_snapshot()
+
+        manifest = {
+            'id': backup_id,
+            'created': time.time(),
+            'worlds': worlds,
+            'stats': dict(stats, seconds=round(time.monotonic() - started, 2)),
+            'files': files
+        }
+        # The summary goes first: list() only sees backups whose manifest exists
+        self._write_json(self._summary_path(backup_id), self._summarize(manifest))
+        self._write_json(self._manifest_path(backup_id), manifest)
+        self._progress(dict(manifest['stats'], id=backup_id, phase='done'))
+        return manifest
+
+    # Restore
+
+    def restore(self, backup_id, target=None):
+        """Stream a backup back out of the chunk store
+
+        Files are rebuilt one chunk at a time into temp files and renamed
+        into place. Files in the backed-up worlds that are not part of the
+        backup are removed, so the worlds match the snapshot exactly.
+        """
+        self.restoring = True
+        try:
+            return self._restore(self.get(backup_id), target or self.root)
+        finally:
+            self.restoring = False
+
+    def _restore(self, manifest, target):
+        backup_id = manifest['id']
+        wanted = set()
+        total = len(manifest['files'])
+        last_report = 0.0
+
+        for done, entry in enumerate(manifest['files'], 1):
+            path = os.path.join(target, *entry['path'].split('/'))
+            wanted.add(os.path.normpath(path))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.restore-tmp'
+            with open(tmp_path, 'wb') as out:
+                for digest in entry['chunks']:
+                    try:
+                        with open(self._chunk_path(digest), 'rb') as f:
+                            out.write(zlib.decompress(f.read()))
+                    except FileNotFoundError:
+                        raise BackupError(f'Chunk {digest} of {entry["path"]} is missing from the store')
+            os.replace(tmp_path, path)
+            os.utime(path, ns=(entry['mtime_ns'], entry['mtime_ns']))
+
+            now = time.monotonic()
+            if now - last_report >= 0.5:
+                last_report = now
+                self._progress({'id': backup_id, 'phase': 'restoring', 'done': done, 'total': total})
+
+        for world in manifest['worlds']:
+            base = os.path.join(target, world)
+            # Bottom-up, so folders created after the backup are empty by the time they are reached
+            for dirpath, _, filenames in os.walk(base, topdown=False):
+                for name in filenames:
+                    path = os.path.normpath(os.path.join(dirpath, name))
+                    if path not in wanted and name not in SKIP_FILES:
+                        os.remove(path)
+                if dirpath != base and not os.listdir(dirpath):
+                    os.rmdir(dirpath)
+
+        self._progress({'id': backup_id, 'phase': 'restored', 'done': total, 'total': total})
+        return {'files': total}
+
+    # Retention
+
+    def delete(self, backup_id):
+        """Remove a backup and every chunk no other backup references
+
+        Takes the slot of a backup or restore, BackupError while one runs: a
+        running backup has no manifest yet, so its chunks look unreferenced.
+        """
+        manifest_path = self._manifest_path(backup_id)
+        self._claim(backup_id)
+        try:
+            try:
+                os.remove(manifest_path)
+            except FileNotFoundError:
+                raise BackupError(f'Backup not found: {backup_id}')
+            try:
+                os.remove(self._summary_path(backup_id))
+            except FileNotFoundError:
+                pass
+            return self._remove_unreferenced()
+        finally:
+            self.current = None
+
+    def _remove_unreferenced(self):
+        referenced = set()
+        for summary in self.list():
+            for entry in self.get(summary['id'])['files']:
+                referenced.update(entry['chunks'])
+
+        removed = 0
+        known = self._load_known_chunks()
+        for digest in list(known):
+            if digest not in referenced:
+                try:
+                    os.remove(self._chunk_path(digest))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                known.discard(digest)
+        for prefix in os.listdir(self.chunks_dir) if os.path.isdir(self.chunks_dir) else []:
+            prefix_dir = os.path.join(self.chunks_dir, prefix)
+            if not os.listdir(prefix_dir):
+                shutil.rmtree(prefix_dir, ignore_errors=True)
+        return {'removedChunks': removed}
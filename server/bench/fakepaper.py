@@ -0,0 +1,135 @@
+"""Stand-in for `java -jar paper.jar` that prints a scripted console
+
+Accepts (and ignores) any JVM arguments, so it can be started by the
+dashboard through a JAVA_PATH launcher (see `write_launcher`). Behaviour is
+set with environment variables:
+
+  FAKE_PAPER_BOOT         seconds between the first line and `Done` (default 1)
+  FAKE_PAPER_PLUGINS      plugins enabled during boot (default 5)
+  FAKE_PAPER_RATE         console lines per second after `Done` (default 100)
+  FAKE_PAPER_TRACE_EVERY  seconds between stack trace bursts, 0 for none (default 5)
+  FAKE_PAPER_TRACE_DEPTH  frames per stack trace (default 30)
+
+Steady-state lines carry `seq=<n> ns=<time.time_ns()>` so a client can
+count what it missed and measure end-to-end latency. Commands on stdin
+are echoed; `tps`, `mspt`, `list` and `save-all` get Paper-like replies and
+`stop` exits.
+"""
+import os
+import sys
+import threading
+import time
+
+BOOT = float(os.getenv('FAKE_PAPER_BOOT', 1))
+PLUGINS = int(os.getenv('FAKE_PAPER_PLUGINS', 5))
+RATE = float(os.getenv('FAKE_PAPER_RATE', 100))
+TRACE_EVERY = float(os.getenv('FAKE_PAPER_TRACE_EVERY', 5))
+TRACE_DEPTH = int(os.getenv('FAKE_PAPER_TRACE_DEPTH', 30))
+# Lines are written in slices of this many seconds to keep the rate smooth
+SLICE = 0.01
+
+out = sys.stdout
+lock = threading.Lock()
+
+
+def emit(level, message):
+    stamp = time.strftime('%H:%M:%S')
+    with lock:
+        out.write(f'[{stamp} {level}]: {message}\n')
+        out.flush()
+
+
+def emit_many(lines):
+    with lock:
+        out.write(''.join(lines))
+        out.flush()
+
+
+def boot():
+    started = time.monotonic()
+    emit('INFO', 'Starting minecraft server version 1.21.4')
+    emit('INFO', 'Loading properties')
+    step = BOOT / (PLUGINS + 2)
+    for i in range(PLUGINS):
+        time.sleep(step)
+        emit('INFO', f'[Bench{i}] Enabling Bench{i} v1.{i}.0')
+    time.sleep(step)
+    emit('INFO', 'Preparing level "world"')
+    time.sleep(step)
+    emit('INFO', 'Running delayed init tasks')
+    emit('INFO', f'Done ({time.monotonic() - started:.3f}s)! For help, type "help"')
+
+
+def trace_lines(n):
+    stamp = time.strftime('%H:%M:%S')
+    lines = [f'[{stamp} ERROR]: Could not pass event PlayerMoveEvent to Bench0 v1.0.0\n',
+             'java.lang.NullPointerException: Cannot invoke "Object.hashCode()" because "key" is null\n']
+    lines += [f'\tat dev.bench.Listener.frame{i}(Listener.java:{100 + i})\n' for i in range(TRACE_DEPTH)]
+    lines.append(f'\tat java.base/java.lang.Thread.run(Thread.java:{n % 7 + 1000})\n')
+    return lines
+
+
+def steady():
+    seq = 0
+    started = time.monotonic()
+    next_trace = started + TRACE_EVERY if TRACE_EVERY else None
+    traces = 0
+    while True:
+        now = time.monotonic()
+        due = int((now - started) * RATE)
+        if due > seq:
+            stamp = time.strftime('%H:%M:%S')
+            lines = []
+            for n in range(seq, due):
+                lines.append(f'[{stamp} INFO]: [Bench] tick seq={n} ns={time.time_ns()}\n')
+            seq = due
+            emit_many(lines)
+        if next_trace is not None and now >= next_trace:
+            emit_many(trace_lines(traces))
+            traces += 1
+            next_trace += TRACE_EVERY
+        time.sleep(SLICE)
+
+
+def main():
+    boot()
+    if RATE > 0:
+        threading.Thread(target=steady, daemon=True).start()
+    for line in sys.stdin:
+        command = line.strip()
+        name = command.split(' ')[0]
+        if name == 'stop':
+            emit('INFO', 'Stopping server')
+            emit('INFO', 'Saving worlds')
+            return
+        if name == 'tps':
+            emit('INFO', 'TPS from last 1m, 5m, 15m: 20.0, 20.0, 20.0')
+        elif name == 'mspt':
+            emit('INFO', 'Server tick times (avg/min/max) from last 5s, 10s, 1m:')
+            emit('INFO', '2.1/1.0/8.3, 2.0/1.0/9.1, 2.2/0.9/12.4')
+        elif name == 'list':
+            emit('INFO', 'There are 0 of a max of 20 players online: ')
+        elif name == 'save-all':
+            emit('INFO', 'Saving the game (this may take a moment!)')
+            emit('INFO', 'Saved the game')
+        else:
+            emit('INFO', f'Unknown or incomplete command, see below for error: {command}')
+
+
+def write_launcher(directory):
+    """An executable that runs this script, to be used as JAVA_PATH"""
+    script = os.path.abspath(__file__)
+    if sys.platform == 'win32':
+        path = os.path.join(directory, 'java.cmd')
+        with open(path, 'w') as f:
+            f.write(f'@"{sys.executable}" "{script}" %*\n')
+    else:
+        path = os.path.join(directory, 'java')
+        with open(path, 'w') as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        os.chmod(path, 0o755)
+    return path
+
+
+if __name__ == '__main__':
+    main()
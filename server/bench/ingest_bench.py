@@ -0,0 +1,132 @@
+"""Measure console ingestion throughput against a synthetic child process
+
+By default every batch goes through the dashboard's own sink, the default
+instance's `_ingest`: ring buffer, line parsing, console listeners, the
+incident detector and the log broadcaster, with app.py imported against a
+scratch SERVER_PATH and DATA_PATH. `--sink null` only counts (or decodes,
+or parses) lines, which is the ceiling of the reader threads and queue.
+
+Usage: python -m bench.ingest_bench [--lines N] [--stderr-every K] [--sink dashboard|null] [--parse]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import ConsoleIngestor  # noqa: E402
+from logparse import LogParser  # noqa: E402
+
+# Child that writes Paper-like lines as fast as the pipe accepts them
+CHILD = r'''
+import sys
+n, every = int(sys.argv[1]), int(sys.argv[2])
+out, err = sys.stdout.buffer, sys.stderr.buffer
+line = b'[12:00:00 INFO]: [ChunkTaskScheduler] Chunk system is processing region batch 000000\n'
+for i in range(n):
+    if every and i % every == 0:
+        err.write(b'[12:00:00 WARN]: synthetic stderr line\n')
+    else:
+        out.write(line)
+out.flush()
+err.flush()
+'''
+
+
+def dashboard_sink(scratch):
+    """The default instance's ingestion path, counting lines on the way"""
+    os.environ.update(SERVER_PATH=os.path.join(scratch, 'server'), DATA_PATH=os.path.join(scratch, 'data'))
+    import app as dashboard
+    instance = dashboard.default_instance
+    received = [0]
+
+    def sink(batch):
+        for label, chunk in batch:
+            instance._ingest(label, chunk)
+            received[0] += len(chunk)
+
+    return sink, received, dashboard
+
+
+def null_sink(decode, parse):
+    received = [0]
+    parsers = {'stdout': LogParser(), 'stderr': LogParser()}
+
+    def sink(batch):
+        for label, chunk in batch:
+            if parse:
+                parse_line = parsers[label].parse
+                for line in chunk:
+                    parse_line(line)
+            if decode:
+                for line in chunk:
+                    line.decode('utf-8', errors='replace')
+            received[0] += len(chunk)
+
+    return sink, received
+
+
+def run(lines, stderr_every, sink, received):
+    received[0] = 0
+    proc = subprocess.Popen(
+        [sys.executable, '-c', CHILD, str(lines), str(stderr_every)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=0,
+    )
+    ingestor = ConsoleIngestor(sink)
+    ingestor.attach(proc.stdout, 'stdout')
+    ingestor.attach(proc.stderr, 'stderr')
+    started = time.perf_counter()
+    ingestor.start()
+    ingestor.wait()
+    elapsed = time.perf_counter() - started
+    proc.wait()
+
+    stats = ingestor.stats()
+    return {
+        'lines': received[0],
+        'seconds': round(elapsed, 3),
+        'linesPerSecond': round(received[0] / elapsed),
+        'batches': stats['batches'],
+        'maxQueueDepth': stats['maxQueueDepth'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=500000)
+    parser.add_argument('--stderr-every', type=int, default=100)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--no-decode', action='store_true')
+    parser.add_argument('--parse', action='store_true', help='with --sink null, also parse every line into a LogRecord')
+    parser.add_argument('--sink', choices=('dashboard', 'null'), default='dashboard',
+                        help='the dashboard\'s ingestion path, or a sink that only counts lines')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        dashboard = None
+        if args.sink == 'dashboard':
+            sink, received, dashboard = dashboard_sink(scratch)
+        else:
+            sink, received = null_sink(not args.no_decode, args.parse)
+        results = [run(args.lines, args.stderr_every, sink, received) for _ in range(args.runs)]
+        rates = sorted(r['linesPerSecond'] for r in results)
+        result = {
+            'sink': args.sink,
+            'runs': results,
+            'minLinesPerSecond': rates[0],
+            'medianLinesPerSecond': rates[len(rates) // 2],
+        }
+        if dashboard is not None:
+            broadcast = dashboard.log_broadcaster.stats()
+            result['broadcast'] = {key: broadcast.get(key) for key in ('framesSent', 'linesSent', 'linesDropped')}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""Load-test the dashboard against a fake Paper server
+
+Starts app.py (or app_async.py) with JAVA_PATH pointing at bench/fakepaper.py,
+starts the server through the API and, while it prints FAKE_PAPER_RATE lines
+a second with periodic stack trace bursts, keeps N Socket.IO clients
+connected and M HTTP pollers looping over status, TPS, the tail of a large
+latest.log, the console ring and a command round trip over stdin. Reports
+console delivery and latency, per-endpoint HTTP latency, and the API
+process' RSS, threads and CPU as JSON for comparison across commits.
+
+Usage: python -m bench.load_bench [--clients N] [--pollers M] [--rate L] [--duration S] [--asyncio]
+                                  [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import websockets
+
+from bench.fakepaper import write_launcher
+from bench.socket_bench import SCRIPTS, SERVER_DIR, cpu_seconds, free_port, http, percentile, proc_status
+
+BENCH_LINE_RE = re.compile(r'\[Bench\] tick seq=(\d+) ns=(\d+)')
+# fakepaper's reply to an unknown command, here the pollers' `bench-<n>`
+ECHO_RE = re.compile(r'see below for error: bench-(\d+)')
+# Endpoints each poller cycles through; the command one is a POST
+ENDPOINTS = ['/api/server/status', '/api/tps', '/api/logs?lines=100', '/api/logs?after=0&lines=100',
+             '/api/metrics', 'POST /api/server/command']
+
+
+# Numbers compared with --baseline, as paths into the result
+COMPARED = [('console', 'linesPerSecond'), ('console', 'delivered'), ('console', 'frameLatencyMs', 'p99'),
+            ('http', 'requestsPerSecond'), ('commandEchoMs', 'p99'), ('process', 'peakRssMiB'),
+            ('process', 'peakThreads'), ('process', 'cpuPercent')]
+
+
+def latency_summary(seconds):
+    if not seconds:
+        return None
+    return {
+        'count': len(seconds),
+        'p50': round(percentile(seconds, 50) * 1000, 1),
+        'p99': round(percentile(seconds, 99) * 1000, 1),
+        'max': round(max(seconds) * 1000, 1),
+    }
+
+
+def write_latest_log(server_path, lines):
+    """A large logs/latest.log for /api/logs to tail"""
+    os.makedirs(os.path.join(server_path, 'logs'))
+    line = '[12:00:00 INFO]: [ChunkTaskScheduler] Chunk system is processing region batch {:06d}\n'
+    with open(os.path.join(server_path, 'logs', 'latest.log'), 'w') as f:
+        for start in range(0, lines, 10000):
+            f.write(''.join(line.format(n) for n in range(start, min(lines, start + 10000))))
+
+
+class Console:
+    """What one Socket.IO client saw of the fake server's tick lines"""
+
+    def __init__(self, echoes=None):
+        self.seqs = set()
+        self.latencies = []
+        self.frames = 0
+        self.first_ns = None
+        self.last_ns = None
+        # {n: [sent, arrived]} of command echoes, watched by one client only
+        self.echoes = echoes
+
+
+async def client(port, console, ready, stop):
+    url = f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket'
+    async with websockets.connect(url, max_queue=None, open_timeout=60) as ws:
+        await ws.recv()
+        await ws.send('40')
+        ready.set_result(True)
+        while not stop.is_set():
+            try:
+                message = await asyncio.wait_for(ws.recv(), 1)
+            except asyncio.TimeoutError:
+                continue
+            if message == '2':
+                await ws.send('3')
+            elif message.startswith('42') and '"log_batch"' in message:
+                arrived = time.time_ns()
+                _, payload = json.loads(message[2:])
+                console.frames += 1
+                newest = None
+                for line in payload.get('lines', ()):
+                    match = BENCH_LINE_RE.search(line)
+                    if match:
+                        console.seqs.add(int(match.group(1)))
+                        newest = int(match.group(2))
+                    elif console.echoes is not None and 'bench-' in line:
+                        match = ECHO_RE.search(line)
+                        if match and int(match.group(1)) in console.echoes:
+                            console.echoes[int(match.group(1))][1] = time.perf_counter()
+                # One latency per frame: from its newest line being printed to the frame arriving
+                if newest is not None:
+                    console.latencies.append((arrived - newest) / 1e9)
+                    console.first_ns = console.first_ns or newest
+                    console.last_ns = newest
+
+
+def poller(port, stop, interval, latencies, errors, echoes, first):
+    n = first
+    while not stop.is_set():
+        endpoint = ENDPOINTS[n % len(ENDPOINTS)]
+        started = time.perf_counter()
+        try:
+            if endpoint.startswith('POST '):
+                # Not waiting for output: with a busy console the quiet period never comes
+                echoes[n] = [started, None]
+                http(port, '/api/server/command', {'command': f'bench-{n}', 'wait': False})
+            else:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}{endpoint}', timeout=30) as response:
+                    response.read()
+            latencies.setdefault(endpoint, []).append(time.perf_counter() - started)
+        except OSError:
+            errors[0] += 1
+        n += 1
+        if interval:
+            stop.wait(interval)
+
+
+def wait_for_status(port, status, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if http(port, '/api/server/status').get('status') == status:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+async def load(port, pid, args):
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    echoes = {}
+    consoles = [Console(echoes if i == 0 else None) for i in range(args.clients)]
+    tasks = []
+    for offset in range(0, args.clients, 100):
+        batch = []
+        for i in range(offset, min(args.clients, offset + 100)):
+            ready = loop.create_future()
+            tasks.append(asyncio.create_task(client(port, consoles[i], ready, stop)))
+            batch.append(ready)
+        await asyncio.wait_for(asyncio.gather(*batch), 120)
+    idle_rss, idle_threads = proc_status(pid)
+
+    started = time.perf_counter()
+    await loop.run_in_executor(None, http, port, '/api/server/start', {})
+    if not await loop.run_in_executor(None, wait_for_status, port, 'running'):
+        raise RuntimeError('The fake server never reported Done')
+    boot_seconds = time.perf_counter() - started
+    # Only lines printed from here on are counted
+    for console in consoles:
+        console.seqs.clear()
+        console.latencies.clear()
+        console.first_ns = None
+
+    poll_stop = threading.Event()
+    http_latencies = {}
+    http_errors = [0]
+    pollers = [threading.Thread(target=poller, daemon=True,
+                                args=(port, poll_stop, args.poll_interval, http_latencies, http_errors, echoes,
+                                      i * 1000000))
+               for i in range(args.pollers)]
+    for thread in pollers:
+        thread.start()
+
+    cpu_started = cpu_seconds(pid)
+    peak_rss, peak_threads = idle_rss, idle_threads
+    measured = time.perf_counter()
+    while time.perf_counter() - measured < args.duration:
+        await asyncio.sleep(0.5)
+        rss, threads = proc_status(pid)
+        peak_rss, peak_threads = max(peak_rss, rss), max(peak_threads, threads)
+    elapsed = time.perf_counter() - measured
+    cpu = cpu_seconds(pid) - cpu_started
+    poll_stop.set()
+    for thread in pollers:
+        thread.join()
+    # Let the last frames arrive
+    await asyncio.sleep(1)
+
+    await loop.run_in_executor(None, http, port, '/api/server/stop', {})
+    await loop.run_in_executor(None, wait_for_status, port, 'stopped')
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    seen = [console.seqs for console in consoles]
+    printed = max((max(seqs) - min(seqs) + 1 for seqs in seen if seqs), default=0)
+    span = max(((c.last_ns - c.first_ns) / 1e9 for c in consoles if c.first_ns and c.last_ns > c.first_ns), default=0)
+    latencies = [latency for console in consoles for latency in console.latencies]
+    return {
+        'bootMs': round(boot_seconds * 1000, 1),
+        'console': {
+            'linesPrinted': printed,
+            'linesPerSecond': round(printed / span, 1) if span else None,
+            'delivered': round(sum(len(seqs) for seqs in seen) / (printed * len(seen)), 4) if printed and seen else None,
+            'frames': sum(console.frames for console in consoles),
+            'frameLatencyMs': latency_summary(latencies)
+        },
+        'http': {
+            'requests': sum(len(values) for values in http_latencies.values()),
+            'requestsPerSecond': round(sum(len(values) for values in http_latencies.values()) / elapsed, 1),
+            'errors': http_errors[0],
+            'latencyMs': {endpoint: latency_summary(values) for endpoint, values in http_latencies.items()}
+        },
+        # POST /api/server/command to its echo arriving on a socket: queue, stdin, ingestion and broadcast
+        'commandEchoMs': latency_summary([arrived - sent for sent, arrived in echoes.values() if arrived]),
+        'commandEchoesMissing': sum(1 for _, arrived in echoes.values() if arrived is None),
+        'process': {
+            'idleRssMiB': idle_rss,
+            'peakRssMiB': peak_rss,
+            'idleThreads': idle_threads,
+            'peakThreads': peak_threads,
+            'cpuPercent': round(cpu / elapsed * 100, 1)
+        }
+    }
+
+
+def run(args):
+    mode = 'asyncio' if args.asyncio else 'threading'
+    with tempfile.TemporaryDirectory() as scratch:
+        server_path = os.path.join(scratch, 'server')
+        os.makedirs(server_path)
+        with open(os.path.join(server_path, 'server.properties'), 'w') as f:
+            f.write('motd=A Minecraft Server\n')
+        open(os.path.join(server_path, 'paper.jar'), 'wb').close()
+        write_latest_log(server_path, args.log_lines)
+        port = free_port()
+        env = dict(os.environ, PORT=str(port), SERVER_PATH=server_path, SERVER_JAR='paper.jar',
+                   DATA_PATH=os.path.join(scratch, 'data'), JAVA_PATH=write_launcher(scratch),
+                   AUTO_RESTART='0', PYTHONUNBUFFERED='1',
+                   FAKE_PAPER_RATE=str(args.rate), FAKE_PAPER_TRACE_EVERY=str(args.trace_every),
+                   FAKE_PAPER_BOOT=str(args.boot))
+        proc = subprocess.Popen([sys.executable, SCRIPTS[mode]], cwd=SERVER_DIR, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            for _ in range(100):
+                try:
+                    http(port, '/api/health')
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            result = asyncio.run(load(port, proc.pid, args))
+        finally:
+            proc.terminate()
+            proc.wait(10)
+    return dict({
+        'mode': mode,
+        'clients': args.clients,
+        'pollers': args.pollers,
+        'rate': args.rate,
+        'durationSeconds': args.duration,
+    }, **result)
+
+
+def compare(result, baseline):
+    """Relative change of the COMPARED numbers against an earlier run"""
+    changes = {}
+    for path in COMPARED:
+        new, old = result, baseline
+        for key in path:
+            new = new.get(key) if isinstance(new, dict) else None
+            old = old.get(key) if isinstance(old, dict) else None
+        if new is not None and old:
+            changes['.'.join(path)] = f'{(new - old) / old * 100:+.1f}%'
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=50, help='Socket.IO clients')
+    parser.add_argument('--pollers', type=int, default=4, help='HTTP polling threads')
+    parser.add_argument('--poll-interval', type=float, default=0, help='seconds between a poller\'s requests')
+    parser.add_argument('--rate', type=float, default=500, help='console lines per second')
+    parser.add_argument('--trace-every', type=float, default=5, help='seconds between stack trace bursts')
+    parser.add_argument('--boot', type=float, default=1, help='seconds the fake server takes to boot')
+    parser.add_argument('--duration', type=float, default=20, help='seconds to measure')
+    parser.add_argument('--log-lines', type=int, default=500000, help='lines in logs/latest.log')
+    parser.add_argument('--asyncio', action='store_true', help='start app_async.py instead of app.py')
+    parser.add_argument('--baseline', help='JSON output of an earlier run to compare with')
+    args = parser.parse_args()
+    result = run(args)
+    if args.baseline:
+        with open(args.baseline) as f:
+            result['vsBaseline'] = compare(result, json.load(f))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
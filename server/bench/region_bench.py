@@ -0,0 +1,89 @@
+"""Scan a synthetic world of region files cold (no cache) and warm (cached)
+
+Usage: python -m bench.region_bench [--regions N] [--workers N]
+
+Region files get a real header and a sparse body, so disk use stays small.
+"""
+import argparse
+import json
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from region import RegionAnalyzer, np  # noqa: E402
+
+DAY = 86400
+
+
+def write_region(path, rng, now):
+    locations = []
+    timestamps = []
+    sector = 2
+    generated = now - rng.randint(0, 400) * DAY
+    revisited = rng.random() < 0.3
+    for _ in range(1024):
+        if rng.random() < 0.25:
+            locations.append(0)
+            timestamps.append(0)
+            continue
+        count = rng.randint(1, 4)
+        locations.append(sector << 8 | count)
+        sector += count
+        stamp = generated + rng.randint(0, 600)
+        if revisited and rng.random() < 0.5:
+            stamp = rng.randint(generated, now)
+        timestamps.append(stamp)
+    with open(path, 'wb') as f:
+        f.write(struct.pack('>1024I', *locations))
+        f.write(struct.pack('>1024I', *timestamps))
+        f.truncate(sector * 4096)
+
+
+def make_world(root, regions, seed=1):
+    rng = random.Random(seed)
+    now = int(time.time())
+    side = int(regions ** 0.5) + 1
+    directory = os.path.join(root, 'world', 'region')
+    os.makedirs(directory)
+    for i in range(regions):
+        write_region(os.path.join(directory, f'r.{i % side - side // 2}.{i // side - side // 2}.mca'), rng, now)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        started = time.perf_counter()
+        make_world(root, args.regions)
+        generate_ms = (time.perf_counter() - started) * 1000
+
+        cache = os.path.join(root, 'data', 'regions.json')
+        cold = RegionAnalyzer(root, cache, workers=args.workers).stats(['world'])
+        # A new analyzer, as after a dashboard restart, reading the saved cache
+        warm = RegionAnalyzer(root, cache, workers=args.workers).stats(['world'])
+        serial = RegionAnalyzer(root, workers=1).stats(['world'])
+
+    print(json.dumps({
+        'regions': args.regions,
+        'chunks': cold['totals']['chunks'],
+        'numpy': np is not None,
+        'workers': args.workers,
+        'generateMs': round(generate_ms, 1),
+        'coldScanMs': cold['scanMs'],
+        'serialScanMs': serial['scanMs'],
+        'warmScanMs': warm['scanMs'],
+        'warmFilesScanned': warm['filesScanned'],
+        'pruneRegions': cold['prune']['regions'],
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
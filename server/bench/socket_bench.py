@@ -0,0 +1,182 @@
+"""Load-test the threading and asyncio runtimes with concurrent dashboard sockets
+
+Starts app.py and/or app_async.py against a scratch server directory, opens
+N Engine.IO websockets speaking the same protocol as the frontend, then
+times a broadcast (a server.properties update fans out `properties_changed`
+to every socket) and samples the API process' RSS and thread count.
+
+Usage: python -m bench.socket_bench [--clients N] [--rounds R] [--mode threading|asyncio|both]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import websockets
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = {'threading': 'app.py', 'asyncio': 'app_async.py'}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def cpu_seconds(pid):
+    """User + system CPU time of a process from /proc"""
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def proc_status(pid):
+    """VmRSS in MiB and thread count from /proc"""
+    values = {}
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            values[key] = value.strip()
+    return round(int(values['VmRSS'].split()[0]) / 1024, 1), int(values['Threads'])
+
+
+def http(port, path, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}{path}', data=data,
+        headers={'Content-Type': 'application/json'}, method='POST' if data else 'GET'
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else None
+
+
+async def client(port, inbox, ready, stop):
+    url = f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket'
+    async with websockets.connect(url, max_queue=None, open_timeout=60) as ws:
+        await ws.recv()
+        await ws.send('40')
+        ready.set_result(True)
+        while not stop.is_set():
+            try:
+                message = await asyncio.wait_for(ws.recv(), 1)
+            except asyncio.TimeoutError:
+                continue
+            if message == '2':
+                await ws.send('3')
+            elif message.startswith('42') and '"properties_changed"' in message:
+                event, data = json.loads(message[2:])
+                inbox.append((time.perf_counter(), data['properties'].get('motd')))
+
+
+async def load(port, pid, clients, rounds, connect_batch):
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    inboxes = [[] for _ in range(clients)]
+    tasks = []
+    cpu_started = cpu_seconds(pid)
+    started = time.perf_counter()
+    for offset in range(0, clients, connect_batch):
+        batch = []
+        for i in range(offset, min(clients, offset + connect_batch)):
+            ready = loop.create_future()
+            tasks.append(asyncio.create_task(client(port, inboxes[i], ready, stop)))
+            batch.append(ready)
+        await asyncio.wait_for(asyncio.gather(*batch), 120)
+    connect_seconds = time.perf_counter() - started
+
+    # Let the connect-time log frames settle before measuring
+    await asyncio.sleep(2)
+    rss, threads = proc_status(pid)
+    connect_cpu = cpu_seconds(pid) - cpu_started
+    cpu_started = cpu_seconds(pid)
+
+    latencies = []
+    delivered = 0
+    for r in range(rounds):
+        marker = f'bench-{r}-{time.time_ns()}'
+        sent = time.perf_counter()
+        await loop.run_in_executor(None, http, port, '/api/server/properties', {'properties': {'motd': marker}})
+        deadline = time.perf_counter() + 10
+        while time.perf_counter() < deadline:
+            arrived = [next((t for t, m in inbox if m == marker), None) for inbox in inboxes]
+            if all(arrived):
+                break
+            await asyncio.sleep(0.01)
+        got = [t - sent for t in arrived if t is not None]
+        delivered += len(got)
+        latencies.extend(got)
+
+    broadcast_cpu = cpu_seconds(pid) - cpu_started
+    peak_rss, peak_threads = proc_status(pid)
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {
+        'clients': clients,
+        'connectSeconds': round(connect_seconds, 2),
+        'connectCpuSeconds': round(connect_cpu, 2),
+        'broadcastCpuSeconds': round(broadcast_cpu, 2),
+        'rssMiB': rss,
+        'peakRssMiB': peak_rss,
+        'threads': max(threads, peak_threads),
+        'delivered': round(delivered / (clients * rounds), 4),
+        'latencyMs': {
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'max': round(max(latencies) * 1000, 1),
+        } if latencies else None
+    }
+
+
+def run(mode, clients, rounds, connect_batch):
+    with tempfile.TemporaryDirectory() as scratch:
+        server_path = os.path.join(scratch, 'server')
+        os.makedirs(server_path)
+        with open(os.path.join(server_path, 'server.properties'), 'w') as f:
+            f.write('motd=A Minecraft Server\n')
+        port = free_port()
+        env = dict(os.environ, PORT=str(port), SERVER_PATH=server_path,
+                   DATA_PATH=os.path.join(scratch, 'data'), PYTHONUNBUFFERED='1')
+        proc = subprocess.Popen([sys.executable, SCRIPTS[mode]], cwd=SERVER_DIR, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            for _ in range(100):
+                try:
+                    http(port, '/api/health')
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            idle_rss, idle_threads = proc_status(proc.pid)
+            result = asyncio.run(load(port, proc.pid, clients, rounds, connect_batch))
+            return dict(result, mode=mode, idleRssMiB=idle_rss, idleThreads=idle_threads)
+        finally:
+            proc.terminate()
+            proc.wait(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--connect-batch', type=int, default=100)
+    parser.add_argument('--mode', choices=['threading', 'asyncio', 'both'], default='both')
+    args = parser.parse_args()
+
+    modes = ['threading', 'asyncio'] if args.mode == 'both' else [args.mode]
+    print(json.dumps([run(mode, args.clients, args.rounds, args.connect_batch) for mode in modes], indent=2))
+
+
+if __name__ == '__main__':
+    main()
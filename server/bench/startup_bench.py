@@ -0,0 +1,76 @@
+"""Measure dashboard cold start: `import app` and the first /api/health response
+
+Usage: python -m bench.startup_bench [--runs N] [--asyncio]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def time_import(env):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import app'], cwd=SERVER_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def time_first_health(env, script, timeout=30):
+    port = free_port()
+    env = dict(env, PORT=str(port))
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, script], cwd=SERVER_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError('No /api/health response')
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--asyncio', action='store_true', help='start app_async.py instead of app.py')
+    args = parser.parse_args()
+
+    imports, healths = [], []
+    for _ in range(args.runs):
+        # A fresh DATA_PATH each run so caches start cold
+        with tempfile.TemporaryDirectory() as data_path:
+            env = dict(os.environ, DATA_PATH=data_path)
+            env.setdefault('SERVER_PATH', data_path)
+            imports.append(time_import(env))
+            healths.append(time_first_health(env, 'app_async.py' if args.asyncio else 'app.py'))
+
+    print(json.dumps({
+        'runs': args.runs,
+        'importMs': round(statistics.median(imports) * 1000, 1),
+        'firstHealthMs': round(statistics.median(healths) * 1000, 1),
+        'minFirstHealthMs': round(min(healths) * 1000, 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Measure the TPS sampler's per-line and per-sample cost
+
+Usage: python -m bench.tps_bench [--lines N] [--samples N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tpsmonitor import TPSSampler  # noqa: E402
+
+NOISE = '[12:00:00 INFO]: [SomePlugin] Saved 42 entries to the database in 3ms'
+REPLY = [
+    '[12:00:00 INFO]: Server tick times (avg/min/max) from last 5s, 10s, 1m:',
+    '[12:00:00 INFO]: ◴ 2.4/1.1/9.8, 2.3/1.0/9.8, 2.5/1.0/12.3',
+    '[12:00:00 INFO]: TPS from last 1m, 5m, 15m: 19.98, *20.0, 20.0',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=1000000)
+    parser.add_argument('--samples', type=int, default=200000)
+    args = parser.parse_args()
+
+    clock = [0.0]
+    sampler = TPSSampler(lambda command: None, lambda: True, clock=lambda: clock[0])
+
+    feed = sampler.feed_line
+    started = time.perf_counter()
+    for _ in range(args.lines):
+        feed(NOISE)
+    noise_ns = (time.perf_counter() - started) / args.lines * 1e9
+
+    started = time.perf_counter()
+    for _ in range(args.samples):
+        clock[0] += 1.0
+        for line in REPLY:
+            feed(line)
+    sample_ns = (time.perf_counter() - started) / args.samples * 1e9
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        sampler.history('24h')
+    cached_ns = (time.perf_counter() - started) / 1000 * 1e9
+
+    print(json.dumps({
+        'nonReplyLineNs': round(noise_ns),
+        'sampleNs': round(sample_ns),
+        'cachedHistoryNs': round(cached_ns),
+        'latest': sampler.latest,
+        'rollups': {name: len(ring) for name, ring in sampler.series.rollups.items()},
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
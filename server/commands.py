@@ -0,0 +1,332 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from rcon import RconError
+
+# [12:00:00 INFO]: ... in front of each captured output line
+CONSOLE_PREFIX_RE = re.compile(r'^\[\d\d:\d\d:\d\d [A-Z]+\]: ')
+# Bytes of fire-and-forget commands coalesced into one stdin write
+BATCH_BYTES = 64 * 1024
+# Tail of the audit log read back into history on startup
+AUDIT_TAIL_BYTES = 256 * 1024
+
+
+class CommandError(Exception):
+    pass
+
+
+class CommandJob:
+    """One submitted command, or a batch of them written together"""
+
+    __slots__ = ('id', 'commands', 'source', 'quiet', 'capture', 'audit', 'status', 'result',
+                 'submitted', 'done')
+
+    def __init__(self, commands, source, quiet, capture, audit):
+        self.id = uuid.uuid4().hex[:12]
+        self.commands = commands
+        self.source = source
+        self.quiet = quiet
+        self.capture = capture
+        self.audit = audit
+        self.status = 'queued'
+        self.result = None
+        self.submitted = time.time()
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        self.done.wait(timeout)
+        return self.to_dict()
+
+    def to_dict(self):
+        data = {'id': self.id, 'status': self.status, 'commands': len(self.commands)}
+        if self.result is not None:
+            data.update(self.result)
+        else:
+            # Not finished yet, e.g. when waiting for it timed out
+            data.update(success=False, pending=True, message=f'Command {self.status}')
+        return data
+
+
+class CommandDispatcher:
+    """Runs console commands in order from a single writer thread
+
+    Jobs wait in a bounded queue. RCON is used when `get_rcon()` returns a
+    pool, giving each command its own reply. A job RCON failed on after it
+    may have reached the server fails; jobs never sent fall back to the
+    stdin of `get_instance()`. There, fire-and-forget jobs queued back to
+    back are coalesced into one write, and the console lines passed to
+    `feed_line` within `capture_window` seconds of a capturing job's write
+    become its output. The writer moves on meanwhile and the capture ends
+    early when it writes again, so lines of later commands are never
+    mixed in. Finished jobs are appended as JSON lines to `audit_path`.
+    """
+
+    def __init__(self, get_instance, get_rcon=None, audit_path=None, max_queue=256,
+                 capture_window=0.25, history=200):
+        self.get_instance = get_instance
+        self.get_rcon = get_rcon or (lambda: None)
+        self.audit_path = audit_path
+        self.capture_window = capture_window
+        self.commands_run = 0
+        self._queue = queue.Queue(max_queue)
+        self._jobs = OrderedDict()
+        self._history = deque(maxlen=history)
+        self._capture_lock = threading.Lock()
+        self._capture = None
+        # (job, write result, started, deadline) of the capture in progress, writer thread only
+        self._capturing = None
+        self._audit_file = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self._load_history()
+
+    # Submitting
+
+    def submit(self, commands, source='api', quiet=False, capture=True, audit=True):
+        """Queue a command or list of commands as one job, CommandError when it can't be queued"""
+        if isinstance(commands, str):
+            commands = [commands]
+        commands = [str(command).strip() for command in commands]
+        if not commands or not all(commands):
+            raise CommandError('Commands must be non-empty')
+        if any('\n' in command or '\r' in command for command in commands):
+            raise CommandError('Commands must not contain line breaks')
+        if self.get_instance().status != 'running':
+            raise CommandError('Server is not running')
+
+        job = CommandJob(commands, source, quiet, capture, audit)
+        with self._start_lock:
+            # Under the lock, so nothing is queued behind close()'s stop marker
+            if self._closed:
+                raise CommandError('Command dispatcher is closed')
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise CommandError('Command queue is full')
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._history.maxlen:
+                self._jobs.popitem(last=False)
+        self.start()
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def feed_line(self, text):
+        """Console listener: collect output for the job being captured"""
+        if self._capture is None:
+            return
+        with self._capture_lock:
+            if self._capture is not None:
+                self._capture.append(text)
+
+    # Writer
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the writer once the queued jobs ran, e.g. when the instance was removed"""
+        with self._start_lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+        elif self._audit_file is not None:
+            self._audit_file.close()
+
+    def _run(self):
+        while True:
+            try:
+                job = self._queue.get(timeout=self._capture_remaining())
+            except queue.Empty:
+                self._end_capture()
+                continue
+            # Output of whatever is written next would be mixed into the capture
+            self._end_capture()
+            if job is None:
+                break
+            jobs = [job]
+            # Coalesce fire-and-forget jobs queued behind it into the same write
+            size = sum(len(command) + 1 for command in jobs[0].commands)
+            while not jobs[-1].capture and size < BATCH_BYTES:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    # Stop after this write
+                    self._queue.put(None)
+                    break
+                jobs.append(job)
+                size += sum(len(command) + 1 for command in job.commands)
+            try:
+                self._execute(jobs)
+            except Exception as e:
+                print(f'Error running commands: {e}')
+                for job in jobs:
+                    if not job.done.is_set():
+                        self._finish(job, {'success': False, 'message': str(e)}, None, time.monotonic())
+        if self._audit_file is not None:
+            self._audit_file.close()
+
+    def _execute(self, jobs):
+        started = time.monotonic()
+        for job in jobs:
+            job.status = 'running'
+
+        rcon = self.get_rcon()
+        if rcon is not None:
+            try:
+                for job in jobs:
+                    self._run_rcon(rcon, job)
+                return
+            except RconError as error:
+                # _run_rcon failed the job that may have reached the server, the rest were never sent
+                jobs = [job for job in jobs if not job.done.is_set()]
+                if not jobs:
+                    return
+                self.get_instance().log(f'WARNING: RCON command failed, falling back to stdin: {error}')
+
+        instance = self.get_instance()
+        capture = jobs[-1].capture
+        if capture:
+            with self._capture_lock:
+                self._capture = []
+        result = {'success': False, 'message': 'Cannot write to server stdin'}
+        try:
+            commands = [command for job in jobs for command in job.commands]
+            result = instance.send_many(commands, quiet=True)
+        finally:
+            if capture and not result['success']:
+                with self._capture_lock:
+                    self._capture = None
+        if result['success']:
+            for job in jobs:
+                self._log(job)
+            if capture:
+                self._capturing = (jobs[-1], result, started, time.monotonic() + self.capture_window)
+                jobs = jobs[:-1]
+        for job in jobs:
+            self._finish(job, dict(result, transport='stdin', output=[], response=''), 'stdin', started)
+
+    def _run_rcon(self, rcon, job):
+        started = time.monotonic()
+        responses = []
+        self.get_instance().note_commands(job.commands)
+        for command in job.commands:
+            try:
+                responses.append(rcon.command(command))
+            except RconError as error:
+                if error.sent or responses:
+                    # Part of the job may have run, resending it over stdin could run it twice
+                    self._finish(job, {
+                        'success': False,
+                        'message': f'RCON command failed: {error}',
+                        'transport': 'rcon',
+                        'output': responses,
+                        'response': '\n'.join(response for response in responses if response)
+                    }, 'rcon', started)
+                raise
+        self._log(job)
+        self._finish(job, {
+            'success': True,
+            'message': 'Command executed',
+            'transport': 'rcon',
+            'output': responses,
+            'response': '\n'.join(response for response in responses if response)
+        }, 'rcon', started)
+
+    def _log(self, job):
+        if not job.quiet:
+            more = f' (+{len(job.commands) - 1} more)' if len(job.commands) > 1 else ''
+            self.get_instance().log(f'[COMMAND] {job.commands[0]}{more}')
+
+    def _capture_remaining(self):
+        """Seconds the writer may wait for the next job before ending the capture"""
+        if self._capturing is None:
+            return None
+        return max(0.0, self._capturing[3] - time.monotonic())
+
+    def _end_capture(self):
+        if self._capturing is None:
+            return
+        job, result, started, _ = self._capturing
+        self._capturing = None
+        with self._capture_lock:
+            output, self._capture = self._capture, None
+        self._finish(job, dict(result, transport='stdin', output=output,
+                               response='\n'.join(CONSOLE_PREFIX_RE.sub('', line) for line in output)),
+                     'stdin', started)
+
+    def _finish(self, job, result, transport, started):
+        job.result = result
+        job.status = 'done'
+        self.commands_run += len(job.commands)
+        job.done.set()
+        if job.audit:
+            self._record({
+                'id': job.id,
+                'ts': job.submitted,
+                'source': job.source,
+                'commands': job.commands,
+                'transport': transport,
+                'success': result['success'],
+                'message': result['message'],
+                'outputLines': len(result.get('output') or ()),
+                'ms': round((time.monotonic() - started) * 1000, 1)
+            })
+
+    # Audit log
+
+    def _record(self, record):
+        self._history.append(record)
+        if self.audit_path is None:
+            return
+        try:
+            if self._audit_file is None:
+                os.makedirs(os.path.dirname(self.audit_path), exist_ok=True)
+                self._audit_file = open(self.audit_path, 'a', encoding='utf-8')
+            self._audit_file.write(json.dumps(record) + '\n')
+            self._audit_file.flush()
+        except OSError as e:
+            print(f'Error writing command audit log: {e}')
+
+    def _load_history(self):
+        if self.audit_path is None or not os.path.exists(self.audit_path):
+            return
+        try:
+            with open(self.audit_path, 'rb') as f:
+                f.seek(max(0, os.path.getsize(self.audit_path) - AUDIT_TAIL_BYTES))
+                lines = f.read().splitlines()[-self._history.maxlen:]
+        except OSError as e:
+            print(f'Error reading command audit log: {e}')
+            return
+        for line in lines:
+            try:
+                self._history.append(json.loads(line))
+            except ValueError:
+                # The first line may be cut by the seek
+                continue
+
+    def history(self, limit=50):
+        """Most recent audit records, newest first"""
+        records = list(self._history)
+        return records[::-1][:limit]
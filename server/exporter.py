@@ -0,0 +1,187 @@
+import bisect
+import itertools
+import math
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Stripes per metric; a thread always records into the same one
+SHARDS = 16
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_next_shard = itertools.count()
+_local = threading.local()
+
+
+def _shard_index():
+    try:
+        return _local.shard
+    except AttributeError:
+        # itertools.count is atomic under the GIL, threads are spread round-robin
+        index = _local.shard = next(_next_shard) % SHARDS
+        return index
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Shard:
+    __slots__ = ('lock', 'values')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+
+class Counter:
+    """Monotonic counter striped over SHARDS locks, summed when scraped"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._shards = [_Shard() for _ in range(SHARDS)]
+
+    def inc(self, amount=1, labels=()):
+        shard = self._shards[_shard_index()]
+        with shard.lock:
+            shard.values[labels] = shard.values.get(labels, 0) + amount
+
+    def collect(self):
+        totals = {}
+        for shard in self._shards:
+            with shard.lock:
+                items = list(shard.values.items())
+            for labels, value in items:
+                totals[labels] = totals.get(labels, 0) + value
+        return [(f'{self.name}_total', _labels(self.labelnames, labels), value)
+                for labels, value in sorted(totals.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram striped like Counter"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._shards = [_Shard() for _ in range(SHARDS)]
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        shard = self._shards[_shard_index()]
+        with shard.lock:
+            counts = shard.values.get(labels)
+            if counts is None:
+                # One slot per bucket plus +Inf, then the sum
+                counts = shard.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def collect(self):
+        totals = {}
+        for shard in self._shards:
+            with shard.lock:
+                items = [(labels, list(counts)) for labels, counts in shard.values.items()]
+            for labels, counts in items:
+                total = totals.get(labels)
+                if total is None:
+                    totals[labels] = counts
+                else:
+                    totals[labels] = [a + b for a, b in zip(total, counts)]
+
+        samples = []
+        for labels, counts in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append((f'{self.name}_bucket',
+                                _labels(self.labelnames, labels, ('le', _format_value(float(bound)))),
+                                cumulative))
+            samples.append((f'{self.name}_sum', _labels(self.labelnames, labels), counts[-1]))
+            samples.append((f'{self.name}_count', _labels(self.labelnames, labels), cumulative))
+        return samples
+
+
+class Callback:
+    """Gauge or counter read from existing state when scraped
+
+    `read()` returns a number, or a {label values tuple: number} dict.
+    Nothing is recorded on the hot path.
+    """
+
+    def __init__(self, name, help, read, labelnames=(), kind='gauge'):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def collect(self):
+        value = self.read()
+        if value is None:
+            return []
+        name = f'{self.name}_total' if self.kind == 'counter' else self.name
+        if not isinstance(value, dict):
+            return [(name, '', value)]
+        return [(name, _labels(self.labelnames, labels), v)
+                for labels, v in sorted(value.items()) if v is not None]
+
+
+class Registry:
+    """Metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, read, labelnames=()):
+        return self.register(Callback(name, help, read, labelnames))
+
+    def counter_func(self, name, help, read, labelnames=()):
+        return self.register(Callback(name, help, read, labelnames, kind='counter'))
+
+    def render(self):
+        out = []
+        for metric in self._metrics:
+            try:
+                samples = metric.collect()
+            except Exception as e:
+                print(f'Error collecting {metric.name}: {e}')
+                continue
+            name = f'{metric.name}_total' if metric.kind == 'counter' else metric.name
+            out.append(f'# HELP {name} {metric.help}')
+            out.append(f'# TYPE {name} {metric.kind}')
+            for name, labels, value in samples:
+                out.append(f'{name}{labels} {_format_value(value)}')
+        out.append('')
+        return '\n'.join(out)
@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+import json
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies are sent as is, compressing them saves less than it costs
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def etag_for(version):
+    """Weak ETag of a version: the same whatever the content encoding"""
+    return 'W/"' + hashlib.sha1(repr(version).encode('utf-8')).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match is a comma separated list of (weak) tags, or *"""
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or (tag[2:] if tag.startswith('W/') else tag) == opaque:
+            return True
+    return False
+
+
+def pick_encoding(accept_encoding):
+    """br when the client takes it and brotli is installed, then gzip, else identity"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        return 'gzip'
+    return 'identity'
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+class VersionedJSON:
+    """A JSON document served with an ETag, 304s and compression
+
+    `respond()` takes the current version of whatever the document is built
+    from. A request whose If-None-Match holds that version's ETag gets a
+    bodyless 304 without the document being built. Otherwise the document
+    is built and serialized once per version and compressed at most once
+    per encoding, so any number of tabs polling unchanged state cost one
+    build.
+    """
+
+    def __init__(self, min_size=COMPRESS_MIN_BYTES):
+        self.min_size = min_size
+        self.hits = 0
+        self.builds = 0
+        self._etag = None
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def respond(self, version, build, if_none_match=None, accept_encoding=None):
+        """(status, body, headers); `build(etag)` returns the document"""
+        etag = etag_for(version)
+        headers = {'ETag': etag, 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+        if if_none_match and etag_matches(if_none_match, etag):
+            self.hits += 1
+            return 304, b'', headers
+
+        with self._lock:
+            if etag != self._etag:
+                self._bodies = {'identity': json.dumps(build(etag), separators=(',', ':')).encode('utf-8')}
+                self._etag = etag
+                self.builds += 1
+            bodies = self._bodies
+            identity = bodies['identity']
+            encoding = pick_encoding(accept_encoding) if len(identity) >= self.min_size else 'identity'
+            body = bodies.get(encoding)
+            if body is None:
+                body = bodies[encoding] = compress(identity, encoding)
+
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return 200, body, headers
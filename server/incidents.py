@@ -0,0 +1,276 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from logparse import WARN
+
+# java.lang.NullPointerException: Cannot invoke "..." because "x" is null
+EXCEPTION_RE = re.compile(r'^(?:Exception in thread "[^"]*" )?((?:[A-Za-z_$][\w$]*\.)+[A-Z][\w$]*(?:Exception|Error|Throwable))(?::\s*(.*))?$')
+FRAME_RE = re.compile(r'^\s+at ([^\s(]+)\(')
+TRACE_CONTINUATION = ('Caused by: ', 'Suppressed: ')
+MORE_RE = re.compile(r'^\s+\.\.\. \d+ more')
+LAG_RE = re.compile(r"Can't keep up! Is the server overloaded\? Running (\d+)ms or (\d+) ticks behind")
+LAG_ID = 'lag'
+
+
+class Incident:
+    __slots__ = ('id', 'kind', 'type', 'message', 'frames', 'context', 'source', 'count', 'suppressed_lines',
+                 'first_seen', 'last_seen', 'last_shown', 'first_seq', 'last_seq', 'ms_behind', 'max_ms_behind')
+
+    def __init__(self, incident_id, kind, now):
+        self.id = incident_id
+        self.kind = kind
+        self.type = None
+        self.message = None
+        self.frames = ()
+        self.context = None
+        self.source = None
+        self.count = 0
+        self.suppressed_lines = 0
+        self.first_seen = self.last_seen = self.last_shown = now
+        self.first_seq = self.last_seq = None
+        self.ms_behind = 0
+        self.max_ms_behind = 0
+
+    def to_dict(self):
+        data = {
+            'id': self.id,
+            'kind': self.kind,
+            'count': self.count,
+            'firstSeen': self.first_seen,
+            'lastSeen': self.last_seen,
+            'firstSeq': self.first_seq,
+            'lastSeq': self.last_seq
+        }
+        if self.kind == LAG_ID:
+            data.update(msBehindTotal=self.ms_behind, maxMsBehind=self.max_ms_behind)
+        else:
+            data.update(type=self.type, message=self.message, frames=list(self.frames), context=self.context,
+                        source=self.source, suppressedLines=self.suppressed_lines)
+        return data
+
+
+class _Trace:
+    __slots__ = ('type', 'message', 'frames', 'context', 'source', 'entries', 'incident', 'suppress')
+
+    def __init__(self, exception_type, message, context, source):
+        self.type = exception_type
+        self.message = message
+        self.frames = []
+        self.context = context
+        self.source = source
+        self.entries = []
+        self.incident = None
+        self.suppress = False
+
+
+class IncidentDetector:
+    """Groups stack traces and lag warnings into fingerprinted incidents
+
+    Sits between the console ring and the broadcaster: `feed(entries)`
+    passes entries on to `forward`. Lines of a stack trace, and the WARN or
+    ERROR line just above it, are held until its fingerprint (exception type
+    and top `top_frames` frames) is known, or for at most `hold` seconds. A fingerprint seen within the last `collapse`
+    seconds has its trace dropped from the stream and only its counter
+    bumped; the lines stay in the ring. Incidents live in an LRU table of
+    `capacity` entries and changed ones are passed to `on_change` at most
+    once per `notify_interval`.
+    """
+
+    def __init__(self, forward, on_change=None, call_later=None, capacity=256, top_frames=5,
+                 hold=0.5, collapse=60, notify_interval=1.0, clock=time.time):
+        self.forward = forward
+        self.on_change = on_change
+        self.call_later = call_later or (lambda delay, callback: threading.Timer(delay, callback).start())
+        self.capacity = capacity
+        self.top_frames = top_frames
+        self.hold = hold
+        self.collapse = collapse
+        self.notify_interval = notify_interval
+        self.clock = clock
+        self.incidents = OrderedDict()
+        self.exceptions = 0
+        self._trace = None
+        # WARN/ERROR line waiting for the next one, usually the "Could not pass event ..." above a trace
+        self._held = None
+        self._queue = []
+        self._dirty = {}
+        self._notify_scheduled = False
+        self._lock = threading.Lock()
+
+    def feed(self, entries):
+        out = []
+        with self._lock:
+            for entry in entries:
+                self._step(entry, out)
+        if out:
+            self.forward(out)
+
+    def _step(self, entry, out):
+        record = entry.record
+        if record is not None and record.source == 'dashboard':
+            # Dashboard messages neither end nor join a trace
+            (self._queue if self._queue else out).append(entry)
+            return
+        text = entry.raw[record.offset if record is not None else 0:].decode('utf-8', errors='replace')
+
+        trace = self._trace
+        if trace is not None:
+            if text.startswith(TRACE_CONTINUATION) or MORE_RE.match(text):
+                self._trace_line(trace, entry, out)
+                return
+            frame = FRAME_RE.match(text)
+            if frame:
+                if len(trace.frames) < self.top_frames:
+                    trace.frames.append(frame.group(1))
+                self._trace_line(trace, entry, out)
+                if trace.incident is None and len(trace.frames) == self.top_frames:
+                    self._decide(trace, out)
+                return
+            self._end_trace(out)
+
+        held, self._held = self._held, None
+        if ('Exception' in text or 'Error' in text or 'Throwable' in text) and (match := EXCEPTION_RE.match(text)):
+            source = record.source if record is not None else None
+            if held is not None:
+                trace = _Trace(match.group(1), match.group(2), held[1], source or held[2])
+                trace.entries.append(held[0])
+            else:
+                trace = _Trace(match.group(1), match.group(2), None, source)
+            self._trace = trace
+            trace.entries.append(entry)
+            self._queue.append(entry)
+            self.call_later(self.hold, lambda: self._expire(trace))
+            return
+        if self._queue:
+            out.extend(self._queue)
+            self._queue = []
+
+        if "Can't keep up!" in text:
+            self._lag(text, entry)
+            out.append(entry)
+        elif record is not None and record.level >= WARN:
+            held = self._held = (entry, text, record.source)
+            self._queue.append(entry)
+            self.call_later(self.hold, lambda: self._expire(held))
+        else:
+            out.append(entry)
+
+    def _trace_line(self, trace, entry, out):
+        if trace.incident is None:
+            trace.entries.append(entry)
+            self._queue.append(entry)
+        elif trace.suppress:
+            trace.incident.suppressed_lines += 1
+        else:
+            out.append(entry)
+        if trace.incident is not None:
+            trace.incident.last_seq = entry.seq
+
+    def _end_trace(self, out):
+        if self._trace.incident is None:
+            self._decide(self._trace, out)
+        self._trace = None
+
+    def _expire(self, held):
+        """Stop holding a trace, or a line that may start one, after `hold` seconds"""
+        out = []
+        with self._lock:
+            if held is self._trace and held.incident is None:
+                self._decide(held, out)
+            elif held is self._held:
+                self._held = None
+                out.extend(self._queue)
+                self._queue = []
+        if out:
+            self.forward(out)
+
+    def _decide(self, trace, out):
+        fingerprint = '\n'.join([trace.type] + trace.frames)
+        incident_id = hashlib.sha1(fingerprint.encode()).hexdigest()[:12]
+        now = self.clock()
+        incident = self._touch(incident_id, 'exception', now)
+        if incident.count == 0:
+            incident.type = trace.type
+            incident.message = trace.message
+            incident.frames = tuple(trace.frames)
+            incident.context = trace.context
+            incident.source = trace.source
+            incident.first_seq = trace.entries[0].seq
+        incident.count += 1
+        incident.last_seq = trace.entries[-1].seq
+        self.exceptions += 1
+
+        trace.incident = incident
+        trace.suppress = incident.count > 1 and now - incident.last_shown < self.collapse
+        if trace.suppress:
+            held = set(map(id, trace.entries))
+            incident.suppressed_lines += len(trace.entries)
+            out.extend(entry for entry in self._queue if id(entry) not in held)
+        else:
+            incident.last_shown = now
+            out.extend(self._queue)
+        self._queue = []
+        self._changed(incident)
+
+    def _lag(self, text, entry):
+        match = LAG_RE.search(text)
+        incident = self._touch(LAG_ID, LAG_ID, self.clock())
+        incident.count += 1
+        if incident.first_seq is None:
+            incident.first_seq = entry.seq
+        incident.last_seq = entry.seq
+        if match:
+            ms = int(match.group(1))
+            incident.ms_behind += ms
+            incident.max_ms_behind = max(incident.max_ms_behind, ms)
+        self._changed(incident)
+
+    def _touch(self, incident_id, kind, now):
+        incident = self.incidents.get(incident_id)
+        if incident is None:
+            incident = self.incidents[incident_id] = Incident(incident_id, kind, now)
+            if len(self.incidents) > self.capacity:
+                self.incidents.popitem(last=False)
+        else:
+            self.incidents.move_to_end(incident_id)
+        incident.last_seen = now
+        return incident
+
+    # Notifications
+
+    def _changed(self, incident):
+        if self.on_change is None:
+            return
+        self._dirty[incident.id] = incident
+        if not self._notify_scheduled:
+            self._notify_scheduled = True
+            self.call_later(self.notify_interval, self._notify)
+
+    def _notify(self):
+        with self._lock:
+            changed = [incident.to_dict() for incident in self._dirty.values()]
+            self._dirty = {}
+            self._notify_scheduled = False
+        if changed:
+            self.on_change(changed)
+
+    # Queries
+
+    def list(self, limit=20, sort='count'):
+        """Incidents, most frequent (or most recent) first"""
+        with self._lock:
+            incidents = list(self.incidents.values())
+        key = (lambda i: i.last_seen) if sort == 'recent' else (lambda i: (i.count, i.last_seen))
+        return [incident.to_dict() for incident in sorted(incidents, key=key, reverse=True)[:limit]]
+
+    def get(self, incident_id):
+        incident = self.incidents.get(incident_id)
+        return incident.to_dict() if incident is not None else None
+
+    def clear(self):
+        with self._lock:
+            self.incidents.clear()
+            self._dirty = {}
@@ -0,0 +1,158 @@
+import queue
+import threading
+import time
+
+# Bytes requested per read() on a raw pipe
+READ_CHUNK = 64 * 1024
+# A line longer than this without a newline is flushed as-is
+MAX_PENDING = 1024 * 1024
+
+
+class LineBuffer:
+    """Splits a byte stream into lines, carrying the unterminated tail over"""
+
+    def __init__(self):
+        self._pending = bytearray()
+
+    def feed(self, chunk):
+        """Complete lines contained in `chunk` plus what was carried over"""
+        pending = self._pending
+        pending += chunk
+        end = pending.rfind(b'\n')
+        if end < 0:
+            if len(pending) >= MAX_PENDING:
+                line = bytes(pending)
+                pending.clear()
+                return [line]
+            return []
+
+        lines = [line for line in bytes(pending[:end]).splitlines() if line]
+        del pending[:end + 1]
+        return lines
+
+    def flush(self):
+        """The unterminated last line, if any"""
+        tail = bytes(self._pending).rstrip(b'\r')
+        self._pending.clear()
+        return [tail] if tail.strip() else []
+
+
+class ConsoleIngestor:
+    """Single ingestion stage for a child process' stdout/stderr
+
+    One reader thread per stream reads large chunks from the raw pipe, splits
+    them into lines with a reusable buffer and puts each chunk's lines on a
+    bounded queue. A single consumer thread drains the queue in batches and
+    hands them to `sink` as a list of (label, [line_bytes, ...]) tuples, so
+    lines of one stream are never reordered or read twice.
+    """
+
+    def __init__(self, sink, max_queue=1024, max_drain=256):
+        self.sink = sink
+        self.max_drain = max_drain
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._streams = []
+        self._consumer = None
+        self._done = threading.Event()
+        self.lines_in = 0
+        # Bytes read per stream, each written only by that stream's reader thread
+        self._bytes = {}
+        self.batches = 0
+        self.max_depth = 0
+        self.started_at = None
+
+    def attach(self, stream, label):
+        """Register a pipe to read from, must be called before start()"""
+        if stream is not None:
+            self._streams.append((stream, label))
+            self._bytes[label] = 0
+
+    @property
+    def bytes_in(self):
+        return sum(self._bytes.values())
+
+    def start(self):
+        """Start the reader threads and the consumer"""
+        self.started_at = time.monotonic()
+        self._consumer = threading.Thread(target=self._consume, daemon=True)
+        self._consumer.start()
+        for stream, label in self._streams:
+            threading.Thread(target=self._read_stream, args=(stream, label), daemon=True).start()
+        if not self._streams:
+            self._done.set()
+
+    def wait(self, timeout=None):
+        """Block until every stream hit EOF and the queue was drained"""
+        return self._done.wait(timeout)
+
+    def _read_stream(self, stream, label):
+        # Raw (bufsize=0) pipes return whatever is available up to READ_CHUNK
+        read = getattr(stream, 'read1', stream.read)
+        put = self._queue.put
+        buffer = LineBuffer()
+        counted = self._bytes
+        try:
+            while True:
+                try:
+                    chunk = read(READ_CHUNK)
+                except (OSError, ValueError):
+                    break
+                if not chunk:
+                    break
+
+                counted[label] += len(chunk)
+                lines = buffer.feed(chunk)
+                if lines:
+                    put((label, lines))
+
+            # Flush an unterminated last line
+            tail = buffer.flush()
+            if tail:
+                put((label, tail))
+        finally:
+            put(None)
+
+    def _consume(self):
+        get = self._queue.get
+        get_nowait = self._queue.get_nowait
+        open_streams = len(self._streams)
+
+        while open_streams:
+            item = get()
+            batch = []
+            while True:
+                if item is None:
+                    open_streams -= 1
+                else:
+                    batch.append(item)
+                    self.lines_in += len(item[1])
+                if len(batch) >= self.max_drain:
+                    break
+                try:
+                    item = get_nowait()
+                except queue.Empty:
+                    break
+
+            depth = self._queue.qsize()
+            if depth > self.max_depth:
+                self.max_depth = depth
+            if batch:
+                self.batches += 1
+                try:
+                    self.sink(batch)
+                except Exception as e:
+                    print(f'Error in console sink: {e}')
+
+        self._done.set()
+
+    def stats(self):
+        """Counters for the ingestion stage"""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0
+        return {
+            'linesIn': self.lines_in,
+            'bytesIn': self.bytes_in,
+            'batches': self.batches,
+            'queueDepth': self._queue.qsize(),
+            'maxQueueDepth': self.max_depth,
+            'linesPerSecond': round(self.lines_in / elapsed, 1) if elapsed > 0 else 0,
+        }
@@ -0,0 +1,594 @@
+import heapq
+import itertools
+import json
+import os
+import re
+import selectors
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from ingest import READ_CHUNK, ConsoleIngestor, LineBuffer
+from logparse import LogParser, dashboard_record
+from logstore import LogRing
+from supervisor import STOP_COMMANDS, BootTimer
+
+# Allowed status changes, anything else is ignored
+TRANSITIONS = {
+    'stopped': ('starting',),
+    'starting': ('running', 'stopping', 'stopped'),
+    'running': ('stopping', 'stopped'),
+    'stopping': ('stopped',),
+}
+INSTANCE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+DEFAULT_JAVA_ARGS = ['-Xmx8G', '-Xms8G']
+# Windows pipes cannot be polled, so each instance falls back to reader threads
+USE_SELECTOR = sys.platform != 'win32'
+# Without a Done line by then the server is assumed to be running
+READY_TIMEOUT = 300
+STOP_TIMEOUT = 10
+KILL_TIMEOUT = 2
+
+
+class ServerInstance:
+    """One Paper (or proxy) process with its own status, log ring and pipes
+
+    Output is read by the manager's event loop, so an instance costs no
+    threads of its own. Lines go to `log_ring` and to every callable in
+    `listeners`.
+    """
+
+    def __init__(self, manager, instance_id, path, jar, java_args=None, log_ring=None, listeners=None):
+        self.manager = manager
+        self.id = instance_id
+        self.path = path
+        self.jar = jar
+        self.java_args = list(java_args) if java_args is not None else list(DEFAULT_JAVA_ARGS)
+        self.log_ring = log_ring if log_ring is not None else LogRing(1000)
+        self.listeners = listeners if listeners is not None else []
+        self.status = 'stopped'
+        self.status_since = time.time()
+        self._status_lock = threading.Lock()
+        self.restarts = 0
+        self.process = None
+        # Java of the last start, reused by starts on the loop thread so they never search for it
+        self.java = None
+        self.started_at = None
+        self.lines_in = 0
+        self.bytes_in = 0
+        self.batches = 0
+        self._ingestor = None
+        self._parsers = {'stdout': LogParser(), 'stderr': LogParser()}
+        self._open_streams = 0
+        self._restart = False
+        # Set when a stop was asked for, so the exit is not treated as a crash
+        self._stop_requested = False
+        self._boot = None
+        self.last_boot = None
+        self.policy = manager.restart_policy() if manager.restart_policy is not None else None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'path': self.path,
+            'jar': self.jar,
+            'javaArgs': self.java_args,
+            'status': self.status,
+            'statusSince': self.status_since,
+            'restarts': self.restarts,
+            'pid': self.process.pid if self.process else None,
+            'bootMs': self.last_boot['totalMs'] if self.last_boot else None,
+            'supervisor': self.policy.to_dict() if self.policy is not None else None
+        }
+
+    # Logging
+
+    def log(self, message):
+        """Add a dashboard message to this instance's log"""
+        entry = self.log_ring.append(message, record=dashboard_record(message))
+        self.manager._entries(self, [entry])
+        return entry
+
+    def _ingest(self, label, lines):
+        prefix = b'[STDERR] ' if label == 'stderr' else b''
+        append = self.log_ring.append
+        parse = self._parsers[label].parse
+        entries = []
+        for line in lines:
+            raw = prefix + line
+            entries.append(append(raw, record=parse(raw)))
+        self.lines_in += len(lines)
+        self.batches += 1
+        if self._boot is not None:
+            self._feed_boot(lines)
+        self.manager._entries(self, entries)
+        if self.listeners:
+            for line in lines:
+                text = line.decode('utf-8', errors='replace')
+                for listener in self.listeners:
+                    try:
+                        listener(text)
+                    except Exception as e:
+                        print(f'Error in console listener: {e}')
+
+    def ingest_stats(self):
+        """Counters in the same shape as ConsoleIngestor.stats()"""
+        if self._ingestor is not None:
+            return self._ingestor.stats()
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0
+        return {
+            'linesIn': self.lines_in,
+            'bytesIn': self.bytes_in,
+            'batches': self.batches,
+            'queueDepth': 0,
+            'maxQueueDepth': 0,
+            'linesPerSecond': round(self.lines_in / elapsed, 1) if elapsed > 0 else 0,
+        }
+
+    # Status
+
+    def _set_status(self, status):
+        with self._status_lock:
+            if status not in TRANSITIONS[self.status]:
+                return False
+            self.status = status
+            self.status_since = time.time()
+        self.manager._status(self)
+        return True
+
+    # Lifecycle
+
+    def start(self, automatic=False):
+        """Start the server process"""
+        refusal = self.manager.start_guard(self) if self.manager.start_guard is not None else None
+        if refusal:
+            return {'success': False, 'message': refusal}
+        # The transition is the lock: of two concurrent starts only one gets past it
+        if self.process or not self._set_status('starting'):
+            return {'success': False, 'message': 'Server is already running or starting'}
+        if self.policy is not None:
+            self.policy.started(automatic)
+
+        try:
+            self.log('Starting PaperMC server...')
+
+            java_executable = self._find_java()
+            self.log(f'Using Java: {java_executable}')
+
+            server_dir = os.path.abspath(os.path.expanduser(self.path))
+            self.log(f'Server directory: {server_dir}')
+            jar_path = self.jar if os.path.isabs(self.jar) else os.path.join(server_dir, self.jar)
+
+            if not os.path.exists(jar_path):
+                self.log(f'ERROR: Server jar not found at {jar_path}')
+                self._set_status('stopped')
+                return {'success': False, 'message': 'Server jar not found'}
+
+            # Fall back to the jar's directory when server_dir cannot be created
+            if not os.path.exists(server_dir):
+                self.log(f'WARNING: Server directory does not exist: {server_dir}')
+                try:
+                    os.makedirs(server_dir, exist_ok=True)
+                    self.log(f'Created server directory: {server_dir}')
+                except Exception:
+                    if os.path.isabs(self.jar):
+                        server_dir = os.path.dirname(self.jar)
+                        self.log(f'Using JAR directory as working directory: {server_dir}')
+                    else:
+                        error_msg = f'Server directory does not exist and cannot be created: {server_dir}'
+                        self.log(f'ERROR: {error_msg}')
+                        self._set_status('stopped')
+                        return {'success': False, 'message': error_msg}
+
+            if not os.path.isdir(server_dir):
+                error_msg = f'Server path is not a directory: {server_dir}'
+                self.log(f'ERROR: {error_msg}')
+                self._set_status('stopped')
+                return {'success': False, 'message': error_msg}
+
+            server_dir = os.path.normpath(server_dir)
+            jar_path = os.path.normpath(jar_path)
+            self.log(f'Working directory: {server_dir}')
+
+            java_args = self.java_args + ['-jar', jar_path]
+            self.log(f'Starting with command: {java_executable} {" ".join(java_args)}')
+            return self._launch([os.path.normpath(java_executable)] + java_args, server_dir, java_executable)
+
+        except Exception as error:
+            error_msg = f'Failed to start server: {error}'
+            self.log(f'ERROR: {error_msg}')
+            self.process = None
+            self._set_status('stopped')
+            return {'success': False, 'message': error_msg}
+
+    def _find_java(self):
+        # A discovery scan runs `java -version` on every candidate, which must not stall the loop
+        # thread that reads every instance's console; restarts from it reuse the last Java
+        if self.java is not None and self.manager._in_loop() and os.path.exists(self.java):
+            return self.java
+        self.java = self.manager.find_java()
+        return self.java
+
+    def _launch(self, command, cwd, java_executable):
+        try:
+            process = subprocess.Popen(
+                command,
+                cwd=cwd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=0
+            )
+        except FileNotFoundError:
+            return self._java_missing(java_executable)
+
+        self._attach(process)
+        self.manager._watch(self, process)
+        return {'success': True, 'message': 'Server starting'}
+
+    def _java_missing(self, java_executable):
+        error_msg = f'Java executable not found at "{java_executable}". Please install Java or set JAVA_PATH environment variable to the full path'
+        self.log(f'ERROR: {error_msg}')
+        self._set_status('stopped')
+        return {'success': False, 'message': error_msg}
+
+    def _attach(self, process):
+        self.process = process
+        self.started_at = time.monotonic()
+        self.lines_in = self.bytes_in = self.batches = 0
+        self._stop_requested = False
+        self._boot = BootTimer(self.started_at)
+        for parser in self._parsers.values():
+            parser.reset()
+        self.manager.call_later(READY_TIMEOUT, lambda: self._check_started(process))
+
+    # Process I/O, overridden by the asyncio runtime
+
+    @staticmethod
+    def _alive(process):
+        return process.poll() is None
+
+    @staticmethod
+    def _write(process, data):
+        process.stdin.write(data)
+        process.stdin.flush()
+
+    def _feed_boot(self, lines):
+        boot = self._boot
+        for line in lines:
+            if boot.feed(line):
+                self._boot = None
+                if self._set_status('running'):
+                    self.last_boot = boot.to_dict()
+                    if self.policy is not None:
+                        self.policy.ready()
+                    self.log(f'Server started successfully! Ready in {self.last_boot["totalMs"] / 1000:.1f}s')
+                    self.manager._boot(self, self.last_boot)
+                return
+
+    def _check_started(self, process):
+        if self.process is process and self._alive(process) and self._set_status('running'):
+            self._boot = None
+            self.log(f'WARNING: No Done line after {READY_TIMEOUT}s, assuming the server started')
+
+    def stop(self):
+        """Send `stop`, terminating then killing the process if it hangs"""
+        process = self.process
+        if not process or self.status == 'stopped':
+            if self.policy is not None and self.policy.cancel():
+                self.log('Automatic restart cancelled')
+                return {'success': True, 'message': 'Automatic restart cancelled'}
+            return {'success': False, 'message': 'Server is not running'}
+
+        try:
+            self._stop_requested = True
+            self._set_status('stopping')
+            self.log('Stopping server...')
+            if process.stdin:
+                try:
+                    self._write(process, b'stop\n')
+                except OSError:
+                    pass
+            self.manager.call_later(STOP_TIMEOUT, lambda: self._terminate(process))
+            return {'success': True, 'message': 'Server stopping'}
+        except Exception as error:
+            self.log(f'ERROR: {error}')
+            return {'success': False, 'message': str(error)}
+
+    def _terminate(self, process):
+        if self._alive(process):
+            process.terminate()
+            self.manager.call_later(KILL_TIMEOUT, lambda: self._alive(process) and process.kill())
+
+    def restart(self):
+        """Stop the server and start it again once the process has exited"""
+        if self.status == 'stopped':
+            return self.start()
+        result = self.stop()
+        if result['success']:
+            self.restarts += 1
+            self._restart = True
+            return {'success': True, 'message': 'Server restarting'}
+        return result
+
+    def send(self, command, quiet=False):
+        """Write a console command to the server's stdin"""
+        return self.send_many([command], quiet)
+
+    def send_many(self, commands, quiet=False):
+        """Write console commands to the server's stdin in a single write"""
+        process = self.process
+        if not process or self.status != 'running':
+            return {'success': False, 'message': 'Server is not running'}
+        try:
+            if process.stdin:
+                self._write(process, ''.join(f'{command}\n' for command in commands).encode())
+                self.note_commands(commands)
+                if not quiet:
+                    more = f' (+{len(commands) - 1} more)' if len(commands) > 1 else ''
+                    self.log(f'[COMMAND] {commands[0]}{more}')
+                return {'success': True, 'message': 'Command executed'}
+            return {'success': False, 'message': 'Cannot write to server stdin'}
+        except Exception as error:
+            return {'success': False, 'message': str(error)}
+
+    def note_commands(self, commands):
+        """Expect an exit when commands sent by any route include `stop`"""
+        if any(command.strip().lstrip('/').split(' ')[0].lower() in STOP_COMMANDS for command in commands):
+            self._stop_requested = True
+
+    def _exited(self, process):
+        if self.process is not process:
+            return
+        crashed = self.policy is not None and not self._stop_requested and not self._restart
+        self.process = None
+        self._boot = None
+        # Decided before the status change so its broadcast carries the supervisor state
+        delay = self.policy.crashed(process.returncode) if crashed else None
+        self._set_status('stopped')
+        self.log(f'Server stopped with code {process.returncode}')
+        if self._restart:
+            self._restart = False
+            result = self.start()
+            if not result['success']:
+                self.log(f'WARNING: Not restarting: {result["message"]}')
+        elif crashed:
+            self._crashed(delay)
+
+    def _crashed(self, delay):
+        if delay is None:
+            self.log(f'ERROR: Server crashed {self.policy.loop_count} times within {self.policy.loop_window:g}s, '
+                     'not restarting it until it is started by hand')
+            return
+        generation = self.policy.generation
+        self.log(f'WARNING: Server exited unexpectedly, restarting in {delay:g}s')
+        self.manager.call_later(delay, lambda: self._auto_restart(generation))
+
+    def _auto_restart(self, generation):
+        # Skipped when the server was started or stopped by hand in the meantime
+        if self.policy.generation == generation and self.policy.state == 'backoff' and self.status == 'stopped':
+            result = self.start(automatic=True)
+            if not result['success']:
+                self.policy.cancel()
+                self.log(f'WARNING: Automatic restart cancelled: {result["message"]}')
+
+
+class InstanceManager:
+    """Owns every ServerInstance and one event loop thread for all of them
+
+    The loop multiplexes every instance's stdout/stderr with a selector and
+    runs the start/stop timers from a heap, so the thread count does not
+    grow with the number of instances. On Windows, where pipes cannot be
+    selected, each instance reads through a ConsoleIngestor instead.
+
+    `on_status(instance)` and `on_entries(instance, entries)` are called
+    from the loop thread or from whichever thread caused the change.
+    """
+
+    instance_class = ServerInstance
+
+    def __init__(self, find_java, on_status=None, on_entries=None, config_path=None, on_boot=None,
+                 restart_policy=None, start_guard=None):
+        self.find_java = find_java
+        self.on_status = on_status
+        self.on_entries = on_entries
+        self.on_boot = on_boot
+        # Called for each instance to get its RestartPolicy; None disables automatic restarts
+        self.restart_policy = restart_policy
+        # Asked before any start, by hand or automatic; returns why the instance must not start, or None
+        self.start_guard = start_guard
+        self.config_path = config_path
+        self.instances = {}
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._timers = []
+        self._timer_seq = itertools.count()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # Instances
+
+    def add(self, instance_id, path, jar, java_args=None, log_ring=None, listeners=None):
+        if not INSTANCE_ID_RE.match(instance_id or ''):
+            raise ValueError('Instance id must be 1-32 letters, digits, "-" or "_"')
+        with self._lock:
+            if instance_id in self.instances:
+                raise ValueError(f'Instance already exists: {instance_id}')
+            instance = self.instance_class(self, instance_id, path, jar, java_args, log_ring, listeners)
+            self.instances[instance_id] = instance
+        return instance
+
+    def get(self, instance_id):
+        return self.instances.get(instance_id)
+
+    def remove(self, instance_id):
+        instance = self.instances.get(instance_id)
+        if instance is None:
+            raise KeyError(instance_id)
+        if instance.status != 'stopped':
+            raise ValueError('Stop the instance before removing it')
+        with self._lock:
+            del self.instances[instance_id]
+
+    def load(self, skip=()):
+        """Create the instances saved in config_path"""
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for item in saved:
+            if item['id'] not in skip and item['id'] not in self.instances:
+                self.add(item['id'], item['path'], item['jar'], item.get('javaArgs'))
+
+    def save(self, skip=()):
+        """Persist every instance except those in `skip` to config_path"""
+        saved = [
+            {'id': i.id, 'path': i.path, 'jar': i.jar, 'javaArgs': i.java_args}
+            for i in self.instances.values() if i.id not in skip
+        ]
+        os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
+        tmp_path = f'{self.config_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, indent=2)
+        os.replace(tmp_path, self.config_path)
+
+    # Callbacks
+
+    def _status(self, instance):
+        if self.on_status is not None:
+            try:
+                self.on_status(instance)
+            except Exception as e:
+                print(f'Error in instance status handler: {e}')
+
+    def _entries(self, instance, entries):
+        if self.on_entries is not None:
+            try:
+                self.on_entries(instance, entries)
+            except Exception as e:
+                print(f'Error in instance log handler: {e}')
+
+    def _boot(self, instance, boot):
+        if self.on_boot is not None:
+            try:
+                self.on_boot(instance, boot)
+            except Exception as e:
+                print(f'Error in instance boot handler: {e}')
+
+    # Event loop
+
+    def call_later(self, delay, callback):
+        """Run `callback` on the loop thread after `delay` seconds"""
+        with self._lock:
+            heapq.heappush(self._timers, (time.monotonic() + delay, next(self._timer_seq), callback))
+            self._ensure_loop()
+        self._wake()
+
+    def call_soon(self, callback):
+        self.call_later(0, callback)
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+
+    def _in_loop(self):
+        return threading.current_thread() is self._thread
+
+    def _ensure_loop(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def _watch(self, instance, process):
+        if not USE_SELECTOR:
+            self._watch_threads(instance, process)
+            return
+        instance._ingestor = None
+        streams = [(process.stdout, 'stdout'), (process.stderr, 'stderr')]
+        instance._open_streams = len(streams)
+
+        def register():
+            for stream, label in streams:
+                os.set_blocking(stream.fileno(), False)
+                self._selector.register(stream, selectors.EVENT_READ, (instance, process, label, LineBuffer()))
+
+        self.call_soon(register)
+
+    def _watch_threads(self, instance, process):
+        ingestor = ConsoleIngestor(lambda batch: [instance._ingest(label, lines) for label, lines in batch])
+        ingestor.attach(process.stdout, 'stdout')
+        ingestor.attach(process.stderr, 'stderr')
+        instance._ingestor = ingestor
+        ingestor.start()
+
+        def wait():
+            ingestor.wait()
+            process.wait()
+            self.call_soon(lambda: instance._exited(process))
+
+        threading.Thread(target=wait, daemon=True).start()
+
+    def _read(self, key):
+        instance, process, label, buffer = key.data
+        try:
+            chunk = os.read(key.fd, READ_CHUNK)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b''
+
+        if chunk:
+            instance.bytes_in += len(chunk)
+            lines = buffer.feed(chunk)
+            if lines:
+                instance._ingest(label, lines)
+            return
+
+        self._selector.unregister(key.fileobj)
+        key.fileobj.close()
+        tail = buffer.flush()
+        if tail:
+            instance._ingest(label, tail)
+        instance._open_streams -= 1
+        if instance._open_streams == 0:
+            self._reap(instance, process)
+
+    def _reap(self, instance, process):
+        # Pipes close a moment before the process can be waited on
+        if process.poll() is None:
+            self.call_later(0.1, lambda: self._reap(instance, process))
+        else:
+            instance._exited(process)
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                timeout = max(0, self._timers[0][0] - time.monotonic()) if self._timers else None
+            for key, _ in self._selector.select(timeout):
+                if key.data is None:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                else:
+                    self._read(key)
+
+            now = time.monotonic()
+            due = []
+            with self._lock:
+                while self._timers and self._timers[0][0] <= now:
+                    due.append(heapq.heappop(self._timers)[2])
+            for callback in due:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f'Error in instance loop callback: {e}')
@@ -0,0 +1,212 @@
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+EXE = 'java.exe' if sys.platform == 'win32' else 'java'
+# Install roots searched besides JAVA_HOME and PATH; each match has bin/<EXE>
+JVM_DIRS = {
+    'win32': [
+        'C:\\Program Files\\Java\\*',
+        'C:\\Program Files\\jdk-*',
+        'C:\\Program Files\\Eclipse Adoptium\\*',
+        'C:\\Program Files\\Microsoft\\jdk-*',
+        'C:\\Program Files\\Zulu\\*',
+        'C:\\Program Files\\Amazon Corretto\\*',
+    ],
+    'darwin': ['/Library/Java/JavaVirtualMachines/*/Contents/Home'],
+}.get(sys.platform, ['/usr/lib/jvm/*', '/usr/java/*', '/opt/java/*', '/opt/jdk*'])
+# Oracle's installer puts a launcher here instead of on a bin directory
+EXTRA_BINARIES = ['C:\\ProgramData\\Oracle\\Java\\javapath\\java.exe'] if sys.platform == 'win32' else []
+# openjdk version "21.0.2" 2024-01-16 / java version "1.8.0_51"
+VERSION_RE = re.compile(r'version "([^"]+)"')
+PROBE_TIMEOUT = 10
+
+
+def major_version(version):
+    """'1.8.0_51' -> 8, '21.0.2' -> 21, '17-ea' -> 17"""
+    parts = re.split(r'[._+-]', version)
+    try:
+        major = int(parts[0])
+        return int(parts[1]) if major == 1 and len(parts) > 1 else major
+    except ValueError:
+        return None
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class JavaFinder:
+    """Finds Java installations once and remembers them
+
+    Candidates are `preferred` (JAVA_PATH), JAVA_HOME, every PATH entry
+    and the usual install directories. Each is probed with `java -version`
+    in parallel. Results are cached in `cache_path` under the binary's real
+    path with its size and mtime, so a rescan only runs binaries that
+    changed. `find()` picks an absolute `preferred` path when it exists,
+    the working Java a bare `preferred` name such as 'java' resolves to on
+    PATH (the admin's or update-alternatives' choice), then JAVA_HOME, then
+    the newest working Java, and keeps the answer until that binary
+    disappears.
+    """
+
+    def __init__(self, preferred='java', cache_path=None, workers=8):
+        self.preferred = preferred
+        self.cache_path = cache_path
+        self.workers = workers
+        self.installations = None
+        self.selected = None
+        self.scanned_at = None
+        self.scan_ms = None
+        self._cache = self._load_cache()
+        self._lock = threading.Lock()
+
+    # Discovery
+
+    def candidates(self):
+        paths = []
+        if self.preferred:
+            found = self.preferred if os.path.isabs(self.preferred) else shutil.which(self.preferred)
+            if found:
+                paths.append(found)
+        java_home = os.getenv('JAVA_HOME')
+        if java_home:
+            paths.append(os.path.join(java_home, 'bin', EXE))
+        for directory in os.getenv('PATH', '').split(os.pathsep):
+            if directory:
+                paths.append(os.path.join(directory, EXE))
+        for pattern in JVM_DIRS:
+            paths.extend(os.path.join(home, 'bin', EXE) for home in sorted(glob.glob(pattern)))
+        paths.extend(EXTRA_BINARIES)
+
+        seen = {}
+        for path in paths:
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                # /usr/bin/java is usually a symlink into one of the JVM directories
+                seen.setdefault(os.path.realpath(path), path)
+        return seen
+
+    def _probe(self, path):
+        try:
+            result = subprocess.run([path, '-version'], stdin=subprocess.DEVNULL, capture_output=True,
+                                    text=True, errors='replace', timeout=PROBE_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired) as error:
+            return {'ok': False, 'error': str(error)}
+        # -version prints to stderr, some launchers use stdout
+        output = result.stderr or result.stdout
+        match = VERSION_RE.search(output)
+        if result.returncode != 0 or not match:
+            return {'ok': False, 'error': output.strip().splitlines()[0][:200] if output.strip() else
+                    f'exited with code {result.returncode}'}
+        lines = output.strip().splitlines()
+        return {
+            'ok': True,
+            'version': match.group(1),
+            'major': major_version(match.group(1)),
+            'vendor': lines[1].split(' (build')[0].strip() if len(lines) > 1 else None
+        }
+
+    def scan(self, refresh=False):
+        """Probe every candidate not in the cache (all of them with `refresh`)"""
+        with self._lock:
+            started = time.perf_counter()
+            candidates = self.candidates()
+            keys = {}
+            todo = []
+            for real in candidates:
+                try:
+                    keys[real] = _stat_key(real)
+                except OSError:
+                    continue
+                cached = self._cache.get(real)
+                if refresh or cached is None or cached.get('key') != keys[real]:
+                    todo.append(real)
+
+            if todo:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(todo))) as pool:
+                    for real, probe in zip(todo, pool.map(self._probe, todo)):
+                        self._cache[real] = dict(probe, key=keys[real])
+                self._save_cache()
+
+            self.installations = [
+                dict({k: v for k, v in self._cache[real].items() if k != 'key'}, path=path, realPath=real)
+                for real, path in candidates.items() if real in keys
+            ]
+            self.selected = self._select()
+            self.scanned_at = time.time()
+            self.scan_ms = round((time.perf_counter() - started) * 1000, 1)
+            return self.installations
+
+    def _select(self):
+        if self.preferred and os.path.isabs(self.preferred) and os.path.exists(self.preferred):
+            return self.preferred
+        working = [java for java in self.installations if java['ok']]
+        on_path = shutil.which(self.preferred) if self.preferred and not os.path.isabs(self.preferred) else None
+        if on_path:
+            on_path = os.path.realpath(on_path)
+            for java in working:
+                if java['realPath'] == on_path:
+                    return java['path']
+        java_home = os.getenv('JAVA_HOME')
+        if java_home:
+            home_java = os.path.realpath(os.path.join(java_home, 'bin', EXE))
+            for java in working:
+                if java['realPath'] == home_java:
+                    return java['path']
+        if working:
+            return max(working, key=lambda java: java['major'] or 0)['path']
+        return None
+
+    def find(self):
+        """Java to start the server with; scans on first use or when the chosen binary is gone"""
+        selected = self.selected
+        if selected is not None and os.path.exists(selected):
+            return selected
+        if self.preferred and os.path.isabs(self.preferred) and os.path.exists(self.preferred):
+            # Explicitly configured, nothing to discover
+            self.selected = self.preferred
+            return self.preferred
+        self.scan()
+        return self.selected or self.preferred
+
+    def to_dict(self):
+        if self.installations is None:
+            self.scan()
+        return {
+            'selected': self.selected,
+            'preferred': self.preferred,
+            'installations': self.installations,
+            'scannedAt': self.scanned_at,
+            'scanMs': self.scan_ms
+        }
+
+    # Cache
+
+    def _load_cache(self):
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        if self.cache_path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f'{self.cache_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f'Error saving Java cache: {e}')
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+
+
+class _Client:
+    __slots__ = ('sid', 'skipped', 'filter', 'records')
+
+    def __init__(self, sid):
+        self.sid = sid
+        self.skipped = 0
+        self.filter = None
+        self.records = False
+
+
+class LogBroadcaster:
+    """Coalesces log entries into `log_batch` frames for Socket.IO clients
+
+    Entries are collected for up to `window` seconds or `max_lines` lines and
+    sent as one frame. A client whose Engine.IO send queue is deeper than
+    `client_backlog` packets is skipped for that frame; once it catches up it
+    gets a single frame carrying the number of lines it missed. The writer
+    only ever appends to a bounded deque, so it never waits on a client.
+    `on_frame(seconds, lines)` gets the time from a frame's oldest line being
+    queued to the frame being emitted.
+
+    Clients with a LogFilter, or that asked for parsed records instead of
+    lines, are grouped by what they asked for; each group gets its own frame,
+    built once and sent to all of its clients in one emit.
+    """
+
+    def __init__(self, socketio, window=0.05, max_lines=256, max_pending=10000,
+                 client_backlog=32, namespace='/', on_frame=None):
+        self.socketio = socketio
+        self.on_frame = on_frame
+        self.window = window
+        self.max_lines = max_lines
+        self.client_backlog = client_backlog
+        self.namespace = namespace
+        self._pending = deque(maxlen=max_pending)
+        self._cond = threading.Condition()
+        self._clients = {}
+        self._first_queued = None
+        self._thread = None
+        self.frames_sent = 0
+        self.lines_sent = 0
+        self.lines_dropped = 0
+        self.lines_skipped = 0
+
+    def add_client(self, sid):
+        self._clients[sid] = _Client(sid)
+
+    def remove_client(self, sid):
+        self._clients.pop(sid, None)
+
+    def set_filter(self, sid, log_filter=None, records=False):
+        """Send a client only the entries matching `log_filter`, as records if `records`"""
+        client = self._clients.get(sid)
+        if client is None:
+            return False
+        client.filter = log_filter
+        client.records = records
+        return True
+
+    def submit(self, entry):
+        """Queue an entry for the next frame"""
+        with self._cond:
+            if len(self._pending) == self._pending.maxlen:
+                self.lines_dropped += 1
+            self._pending.append(entry)
+            # Wake the writer to open a window, or to flush a full frame early
+            if len(self._pending) == 1:
+                self._first_queued = time.monotonic()
+                self._cond.notify()
+            elif len(self._pending) >= self.max_lines:
+                self._cond.notify()
+        if self._thread is None:
+            self.start()
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        pending = self._pending
+        while True:
+            with self._cond:
+                while not pending:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.window
+                while len(pending) < self.max_lines:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                count = min(len(pending), self.max_lines)
+                frame = [pending.popleft() for _ in range(count)]
+                queued_at = self._first_queued
+                # Lines left over from a full frame start the next one
+                self._first_queued = time.monotonic() if pending else None
+
+            try:
+                self._send(frame)
+                if self.on_frame is not None and queued_at is not None:
+                    self.on_frame(time.monotonic() - queued_at, len(frame))
+            except Exception as e:
+                print(f'Error broadcasting logs: {e}')
+
+    def _send(self, frame):
+        payload = self._payload(frame, False)
+
+        clients = list(self._clients.values())
+        skip_sids = []
+        groups = {}
+        for client in clients:
+            if self._client_depth(client.sid) > self.client_backlog:
+                client.skipped += len(frame)
+                self.lines_skipped += len(frame)
+                skip_sids.append(client.sid)
+            elif client.filter is not None or client.records:
+                key = (client.filter.key if client.filter is not None else None, client.records)
+                groups.setdefault(key, []).append(client)
+                skip_sids.append(client.sid)
+            elif client.skipped:
+                # Caught up again, tell it how much it missed
+                self.socketio.emit('message', dict(payload, skipped=client.skipped),
+                                   namespace=self.namespace, to=client.sid)
+                client.skipped = 0
+                skip_sids.append(client.sid)
+
+        if len(skip_sids) < len(clients) or not clients:
+            self.socketio.emit('message', payload, namespace=self.namespace,
+                               skip_sid=skip_sids or None)
+        for group in groups.values():
+            self._send_group(frame, group)
+        self.frames_sent += 1
+        self.lines_sent += len(frame)
+
+    def _send_group(self, frame, clients):
+        log_filter = clients[0].filter
+        matched = frame if log_filter is None else [entry for entry in frame if log_filter.match(entry)]
+        payload = self._payload(matched, clients[0].records, frame[-1].seq) if matched else None
+        to = []
+        for client in clients:
+            if client.skipped:
+                caught_up = payload if payload is not None else self._payload([], client.records, frame[-1].seq)
+                self.socketio.emit('message', dict(caught_up, skipped=client.skipped),
+                                   namespace=self.namespace, to=client.sid)
+                client.skipped = 0
+            elif payload is not None:
+                to.append(client.sid)
+        if to:
+            self.socketio.emit('message', payload, namespace=self.namespace, to=to)
+
+    @staticmethod
+    def _payload(entries, records, last_seq=None):
+        payload = {
+            'type': 'log_batch',
+            'firstSeq': entries[0].seq if entries else None,
+            'lastSeq': last_seq if last_seq is not None else entries[-1].seq
+        }
+        if records:
+            payload['records'] = [entry.to_record() for entry in entries]
+        else:
+            payload['lines'] = [entry.format() for entry in entries]
+        return payload
+
+    def _client_depth(self, sid):
+        """Packets waiting in a client's Engine.IO send queue"""
+        try:
+            server = self.socketio.server
+            eio_sid = server.manager.eio_sid_from_sid(sid, self.namespace)
+            socket = server.eio.sockets.get(eio_sid)
+            return socket.queue.qsize() if socket is not None else 0
+        except Exception:
+            return 0
+
+    def stats(self):
+        """Counters for the broadcaster"""
+        return {
+            'framesSent': self.frames_sent,
+            'linesSent': self.lines_sent,
+            'linesDropped': self.lines_dropped,
+            'linesSkipped': self.lines_skipped,
+            'queueDepth': len(self._pending),
+            'clients': len(self._clients),
+            'slowClients': sum(1 for c in self._clients.values() if c.skipped),
+            'filteredClients': sum(1 for c in self._clients.values() if c.filter is not None)
+        }
@@ -0,0 +1,188 @@
+import re
+
+LEVEL_NAMES = ('TRACE', 'DEBUG', 'INFO', 'WARN', 'ERROR', 'FATAL')
+LEVELS = {
+    b'TRACE': 0, b'DEBUG': 1, b'INFO': 2, b'WARN': 3, b'WARNING': 3,
+    b'ERROR': 4, b'SEVERE': 4, b'FATAL': 5
+}
+INFO, WARN, ERROR = 2, 3, 4
+STDERR_PREFIX = b'[STDERR] '
+# logs/latest.log style: [12:00:00] [Server thread/INFO]: message
+FILE_RE = re.compile(rb'\[(\d\d:\d\d:\d\d)\] \[([^\]]*)/([A-Z]+)\]: ')
+# Longest plugin or logger tag taken as a source
+MAX_SOURCE = 64
+# Distinct sources kept decoded; the set of plugins printing is small
+SOURCE_CACHE = 1024
+
+
+class LogRecord:
+    """Parsed fields of a console line; the message is raw[offset:], time stays bytes until rendered"""
+
+    __slots__ = ('time', 'level', 'thread', 'source', 'offset', 'stderr')
+
+    def __init__(self, time, level, thread, source, offset, stderr=False):
+        self.time = time
+        self.level = level
+        self.thread = thread
+        self.source = source
+        self.offset = offset
+        self.stderr = stderr
+
+    def to_dict(self, raw):
+        return {
+            'time': self.time.decode('ascii', errors='replace') if self.time is not None else None,
+            'level': LEVEL_NAMES[self.level],
+            'thread': self.thread,
+            'source': self.source,
+            'stderr': self.stderr,
+            'message': raw[self.offset:].decode('utf-8', errors='replace')
+        }
+
+
+class LogParser:
+    """Turns console lines into LogRecords
+
+    Paper's console format `[HH:MM:SS LEVEL]: [Plugin] message` is parsed
+    with fixed offsets and bytes.find; the latest.log format, with a thread,
+    goes through FILE_RE. Lines with neither prefix (stack traces, startup
+    banners) carry on the level, thread and source of the line before, so
+    a stack trace is filtered with the error that printed it. Use one parser
+    per stream.
+    """
+
+    def __init__(self):
+        self._last = None
+        self._sources = {}
+
+    def reset(self):
+        self._last = None
+
+    def parse(self, raw):
+        offset = 0
+        stderr = raw.startswith(STDERR_PREFIX)
+        if stderr:
+            offset = len(STDERR_PREFIX)
+
+        time = thread = None
+        level = None
+        start = offset
+        if raw[offset:offset + 1] == b'[':
+            if raw[offset + 9:offset + 10] == b' ':
+                # [12:00:00 INFO]: message
+                end = raw.find(b']: ', offset + 10, offset + 20)
+                if end != -1:
+                    level = LEVELS.get(raw[offset + 10:end])
+                    if level is not None:
+                        time = raw[offset + 1:offset + 9]
+                        start = end + 3
+            elif raw[offset + 9:offset + 12] == b'] [':
+                match = FILE_RE.match(raw, offset)
+                if match:
+                    level = LEVELS.get(match.group(3))
+                    if level is not None:
+                        time = match.group(1)
+                        thread = match.group(2).decode('utf-8', errors='replace')
+                        start = match.end()
+
+        if level is None:
+            last = self._last
+            if last is not None:
+                return LogRecord(last.time, last.level, last.thread, last.source, offset, stderr)
+            return LogRecord(None, WARN if stderr else INFO, None, None, offset, stderr)
+
+        source = None
+        if raw[start:start + 1] == b'[':
+            close = raw.find(b'] ', start + 1, start + MAX_SOURCE)
+            if close != -1:
+                tag = raw[start + 1:close]
+                source = self._sources.get(tag)
+                if source is None and b' ' not in tag:
+                    if len(self._sources) >= SOURCE_CACHE:
+                        self._sources.clear()
+                    source = self._sources[tag] = tag.decode('utf-8', errors='replace')
+                if source is not None:
+                    start = close + 2
+        record = self._last = LogRecord(time, level, thread, source, start, stderr)
+        return record
+
+
+def dashboard_record(message):
+    """Record for a line the dashboard itself logs"""
+    if message.startswith('ERROR'):
+        level = ERROR
+    elif message.startswith('WARN'):
+        level = WARN
+    else:
+        level = INFO
+    return LogRecord(None, level, None, 'dashboard', 0)
+
+
+def level_index(name):
+    """Rank of a level name, ValueError when unknown"""
+    rank = LEVELS.get(str(name).upper().encode())
+    if rank is None:
+        raise ValueError(f'Unknown level, use one of: {", ".join(LEVEL_NAMES)}')
+    return rank
+
+
+class LogFilter:
+    """Which records a subscriber wants: a minimum level, sources, threads and/or a substring"""
+
+    __slots__ = ('level', 'sources', 'threads', 'contains', 'key')
+
+    def __init__(self, level=None, sources=None, threads=None, contains=None):
+        self.level = level
+        self.sources = sources
+        self.threads = threads
+        self.contains = contains
+        self.key = (level, sources, threads, contains)
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Build from {'level', 'source', 'thread', 'contains'}; None when the spec matches everything"""
+        if not spec:
+            return None
+        if not isinstance(spec, dict):
+            raise ValueError('Filter must be an object')
+
+        def names(value):
+            if value is None or value == '':
+                return None
+            values = value if isinstance(value, (list, tuple)) else [value]
+            return frozenset(str(v).lower() for v in values)
+
+        level = level_index(spec['level']) if spec.get('level') else None
+        contains = spec.get('contains') or None
+        log_filter = cls(
+            level,
+            names(spec.get('source')),
+            names(spec.get('thread')),
+            str(contains).lower().encode() if contains else None
+        )
+        return log_filter if any(v is not None for v in log_filter.key) else None
+
+    def match(self, entry):
+        record = entry.record
+        if record is None:
+            if self.sources is not None or self.threads is not None:
+                return False
+            level = INFO
+        else:
+            level = record.level
+            if self.sources is not None and (record.source is None or record.source.lower() not in self.sources):
+                return False
+            if self.threads is not None and (record.thread is None or record.thread.lower() not in self.threads):
+                return False
+        if self.level is not None and level < self.level:
+            return False
+        if self.contains is not None and self.contains not in entry.raw.lower():
+            return False
+        return True
+
+    def to_dict(self):
+        return {
+            'level': LEVEL_NAMES[self.level] if self.level is not None else None,
+            'source': sorted(self.sources) if self.sources else None,
+            'thread': sorted(self.threads) if self.threads else None,
+            'contains': self.contains.decode('utf-8', errors='replace') if self.contains else None
+        }
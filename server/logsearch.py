@@ -0,0 +1,383 @@
+import gzip
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import datetime
+
+# Lines stored per indexed block
+BLOCK_LINES = 256
+# Indexed words a query term may stand for as part of them, a shorter term must be more specific
+MAX_EXPANSION = 256
+
+LEVELS = ('DEBUG', 'INFO', 'WARN', 'ERROR', 'FATAL')
+LEVEL_BITS = {name: 1 << i for i, name in enumerate(LEVELS)}
+
+# Console "[12:00:00 INFO]:" and log file "[12:00:00] [Server thread/INFO]:" prefixes
+LINE_PREFIX_RE = re.compile(
+    rb'^\[(\d\d:\d\d:\d\d)(?: (DEBUG|INFO|WARN|ERROR|FATAL))?\]'
+    rb'(?: \[[^\]]*/(DEBUG|INFO|WARN|ERROR|FATAL)\])?'
+)
+TOKEN_RE = re.compile(rb'[A-Za-z0-9_$.]{3,}')
+FILE_DAY_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})-\d+\.log(\.gz)?$')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE,
+    ino INTEGER,
+    size INTEGER,
+    mtime REAL,
+    indexed_bytes INTEGER,
+    lines INTEGER,
+    blocks INTEGER,
+    day TEXT,
+    first_time TEXT,
+    last_time TEXT,
+    levels INTEGER
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    file_id INTEGER,
+    block INTEGER,
+    first_line INTEGER,
+    levels INTEGER,
+    data BLOB,
+    PRIMARY KEY (file_id, block)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT,
+    file_id INTEGER,
+    block INTEGER,
+    PRIMARY KEY (token, file_id, block)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT PRIMARY KEY
+) WITHOUT ROWID;
+'''
+
+
+def tokenize(data):
+    """Lower-cased search tokens of a line (bytes)
+
+    Dotted names such as exception classes are indexed whole and by each
+    part, so `NullPointerException` finds `java.lang.NullPointerException`.
+    """
+    tokens = set()
+    for match in TOKEN_RE.findall(data.lower()):
+        match = match.strip(b'.')
+        if len(match) < 3:
+            continue
+        tokens.add(match)
+        if b'.' in match:
+            tokens.update(part for part in match.split(b'.') if len(part) >= 3)
+    return tokens
+
+
+def _open_lines(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+class LogIndexer:
+    """Background token index over SERVER_PATH/logs, including rotated .log.gz
+
+    Every file is cut into blocks of BLOCK_LINES lines. Blocks are stored
+    zlib-compressed in SQLite together with their level bitmask, and each
+    token maps to the blocks containing it. The last block of a growing
+    file is reopened and filled by the next scan. A search intersects
+    postings and only decompresses candidate blocks; a query term also
+    matches the indexed words containing it, found in the `tokens`
+    vocabulary, so part of a player name or a bare class name works.
+    """
+
+    def __init__(self, logs_dir, db_path, interval=60):
+        self.logs_dir = logs_dir
+        self.db_path = db_path
+        self.interval = interval
+        self._thread = None
+        self._wake = threading.Event()
+        self.last_scan = None
+        self.indexing = None
+
+    def _connect(self):
+        import sqlite3
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def setup(self):
+        """Create the database, done by start()"""
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+            # Indexes made before the vocabulary existed
+            if conn.execute('SELECT 1 FROM tokens LIMIT 1').fetchone() is None:
+                conn.execute('INSERT OR IGNORE INTO tokens SELECT DISTINCT token FROM postings')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.setup()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def rescan(self):
+        """Ask the indexer to scan now instead of waiting for the interval"""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.scan()
+            except Exception as e:
+                print(f'Error indexing logs: {e}')
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def scan(self):
+        """Index new, grown or replaced log files"""
+        if not os.path.isdir(self.logs_dir):
+            return
+        conn = self._connect()
+        try:
+            known = {row[0]: row for row in conn.execute(
+                'SELECT name, id, ino, size, mtime, indexed_bytes, lines, blocks FROM files')}
+            names = sorted(n for n in os.listdir(self.logs_dir) if n.endswith(('.log', '.log.gz')))
+            for name in names:
+                path = os.path.join(self.logs_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                row = known.get(name)
+                if row and row[2] == st.st_ino and row[3] == st.st_size and row[4] == st.st_mtime:
+                    continue
+                self.indexing = name
+                if row and not name.endswith('.gz') and row[2] == st.st_ino and row[5] <= st.st_size:
+                    self._index_file(conn, path, name, st, row)
+                else:
+                    if row:
+                        self._drop_file(conn, row[1])
+                    self._index_file(conn, path, name, st, None)
+
+            for name, row in known.items():
+                if name not in names:
+                    self._drop_file(conn, row[1])
+            conn.commit()
+        finally:
+            self.indexing = None
+            self.last_scan = time.time()
+            conn.close()
+
+    def _drop_file(self, conn, file_id):
+        conn.execute('DELETE FROM postings WHERE file_id = ?', (file_id,))
+        conn.execute('DELETE FROM blocks WHERE file_id = ?', (file_id,))
+        conn.execute('DELETE FROM files WHERE id = ?', (file_id,))
+        conn.commit()
+
+    def _index_file(self, conn, path, name, st, row):
+        day_match = FILE_DAY_RE.match(name)
+        day = day_match.group(1) if day_match else datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d')
+
+        if row:
+            file_id, offset, line_no, block_no = row[1], row[5], row[6], row[7]
+            first_time, last_time, levels = conn.execute(
+                'SELECT first_time, last_time, levels FROM files WHERE id = ?', (file_id,)).fetchone()
+        else:
+            file_id = conn.execute(
+                'INSERT INTO files (name, ino, size, mtime, indexed_bytes, lines, blocks, day, levels) '
+                'VALUES (?, ?, ?, ?, 0, 0, 0, ?, 0)', (name, st.st_ino, st.st_size, st.st_mtime, day)).lastrowid
+            offset, line_no, block_no = 0, 0, 0
+            first_time, last_time, levels = None, None, 0
+
+        block_rows = []
+        posting_rows = []
+        lines = []
+        block_levels = 0
+        tokens = set()
+        if block_no:
+            last = conn.execute('SELECT first_line, levels, data FROM blocks WHERE file_id = ? AND block = ?',
+                                (file_id, block_no - 1)).fetchone()
+            if last and line_no - last[0] < BLOCK_LINES:
+                # Fill the partial last block instead of starting a small one on every scan
+                block_no -= 1
+                block_levels = last[1]
+                lines = zlib.decompress(last[2]).split(b'\n')
+                for line in lines:
+                    tokens.update(tokenize(line))
+
+        def flush():
+            nonlocal block_no, block_levels, levels
+            data = zlib.compress(b'\n'.join(lines), 6)
+            block_rows.append((file_id, block_no, line_no - len(lines), block_levels, data))
+            posting_rows.extend((token.decode('ascii', 'ignore'), file_id, block_no) for token in tokens)
+            levels |= block_levels
+            block_no += 1
+            block_levels = 0
+            lines.clear()
+            tokens.clear()
+
+        with _open_lines(path) as f:
+            if offset:
+                f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n') and not name.endswith('.gz'):
+                    # Still being written, pick it up on the next scan
+                    break
+                offset += len(line)
+                line = line.rstrip(b'\r\n')
+                line_no += 1
+                prefix = LINE_PREFIX_RE.match(line)
+                if prefix:
+                    stamp = prefix.group(1).decode()
+                    first_time = first_time or stamp
+                    last_time = stamp
+                    level = prefix.group(2) or prefix.group(3)
+                    if level:
+                        block_levels |= LEVEL_BITS[level.decode()]
+                tokens.update(tokenize(line))
+                lines.append(line)
+                if len(lines) >= BLOCK_LINES:
+                    flush()
+                    if len(block_rows) >= 512:
+                        self._write(conn, block_rows, posting_rows)
+            if lines:
+                flush()
+
+        self._write(conn, block_rows, posting_rows)
+        conn.execute(
+            'UPDATE files SET ino = ?, size = ?, mtime = ?, indexed_bytes = ?, lines = ?, blocks = ?, '
+            'first_time = ?, last_time = ?, levels = ? WHERE id = ?',
+            (st.st_ino, st.st_size, st.st_mtime, offset, line_no, block_no,
+             first_time, last_time, levels, file_id))
+        conn.commit()
+
+    @staticmethod
+    def _write(conn, block_rows, posting_rows):
+        conn.executemany('INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?)', block_rows)
+        conn.executemany('INSERT OR IGNORE INTO postings VALUES (?, ?, ?)', posting_rows)
+        conn.executemany('INSERT OR IGNORE INTO tokens VALUES (?)', {(row[0],) for row in posting_rows})
+        block_rows.clear()
+        posting_rows.clear()
+
+    def files(self):
+        """Indexed files with their day, time range and levels"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT name, size, lines, day, first_time, last_time, levels FROM files ORDER BY id').fetchall()
+        finally:
+            conn.close()
+        return [{
+            'file': name,
+            'size': size,
+            'lines': lines,
+            'day': day,
+            'firstTime': first_time,
+            'lastTime': last_time,
+            'levels': [lvl for lvl in LEVELS if levels & LEVEL_BITS[lvl]]
+        } for name, size, lines, day, first_time, last_time, levels in rows]
+
+    def search(self, query, limit=100, cursor=None, level=None, since=None, until=None):
+        """Yield matching lines newest first, then a final {'nextCursor': ...}
+
+        `cursor` is the value of a previous page's nextCursor. Only blocks
+        that contain, for every query token, an indexed word containing it
+        are decompressed. ValueError when a token is part of more than
+        MAX_EXPANSION words.
+        """
+        terms = [t.lower() for t in query.split() if t]
+        tokens = sorted(set().union(*(tokenize(t.encode()) for t in terms))) if terms else []
+        if not tokens:
+            raise ValueError('Query must contain a term of at least 3 characters')
+        needles = [t.encode() for t in terms]
+        if level and level not in LEVEL_BITS:
+            raise ValueError(f'Unknown level: {level}')
+        level_mask = sum(LEVEL_BITS[l] for l in LEVELS[LEVELS.index(level):]) if level else 0
+
+        conn = self._connect()
+        try:
+            files = {}
+            for file_id, name, day, levels in conn.execute('SELECT id, name, day, levels FROM files'):
+                if since and day < since or until and day > until:
+                    continue
+                if level_mask and not levels & level_mask:
+                    continue
+                files[file_id] = name
+
+            groups = []
+            for token in tokens:
+                words = [row[0] for row in conn.execute(
+                    'SELECT token FROM tokens WHERE instr(token, ?) > 0 LIMIT ?',
+                    (token.decode(), MAX_EXPANSION + 1))]
+                if len(words) > MAX_EXPANSION:
+                    raise ValueError(f'"{token.decode()}" is part of too many words, make it longer')
+                if not words:
+                    yield {'nextCursor': None}
+                    return
+                marks = ','.join('?' * len(words))
+                count = conn.execute(f'SELECT COUNT(*) FROM postings WHERE token IN ({marks})', words).fetchone()[0]
+                groups.append((count, words, marks))
+
+            # Walk the rarest token's postings, probe the others by key
+            groups.sort(key=lambda group: group[0])
+            (_, driver, marks), others = groups[0], groups[1:]
+
+            if cursor:
+                c_file, c_block, c_line = (int(x) for x in cursor.split(':'))
+                rows = conn.execute(
+                    f'SELECT DISTINCT file_id, block FROM postings WHERE token IN ({marks}) '
+                    'AND (file_id, block) <= (?, ?) ORDER BY file_id DESC, block DESC', driver + [c_file, c_block])
+            else:
+                c_file = c_block = c_line = None
+                rows = conn.execute(
+                    f'SELECT DISTINCT file_id, block FROM postings WHERE token IN ({marks}) '
+                    'ORDER BY file_id DESC, block DESC', driver)
+
+            emitted = 0
+            for file_id, block in rows:
+                if file_id not in files:
+                    continue
+                if any(conn.execute(f'SELECT 1 FROM postings WHERE token IN ({other_marks}) AND file_id = ? '
+                                    'AND block = ? LIMIT 1', words + [file_id, block]).fetchone() is None
+                       for _, words, other_marks in others):
+                    continue
+                first_line, block_levels, data = conn.execute(
+                    'SELECT first_line, levels, data FROM blocks WHERE file_id = ? AND block = ?',
+                    (file_id, block)).fetchone()
+                if level_mask and not block_levels & level_mask:
+                    continue
+
+                lines = zlib.decompress(data).split(b'\n')
+                start = len(lines) - 1
+                if (file_id, block) == (c_file, c_block):
+                    start = c_line - 1
+                for i in range(start, -1, -1):
+                    line = lines[i]
+                    lower = line.lower()
+                    if not all(n in lower for n in needles):
+                        continue
+                    if level_mask:
+                        prefix = LINE_PREFIX_RE.match(line)
+                        found = prefix and (prefix.group(2) or prefix.group(3))
+                        if not found or not LEVEL_BITS[found.decode()] & level_mask:
+                            continue
+                    if emitted >= limit:
+                        yield {'nextCursor': f'{file_id}:{block}:{i + 1}'}
+                        return
+                    emitted += 1
+                    yield {
+                        'file': files[file_id],
+                        'line': first_line + i + 1,
+                        'text': line.decode('utf-8', errors='replace')
+                    }
+            yield {'nextCursor': None}
+        finally:
+            conn.close()
@@ -0,0 +1,91 @@
+import threading
+import time
+from datetime import datetime
+
+
+class LogEntry:
+    """A single console line, formatted lazily, with its parsed LogRecord if any"""
+
+    __slots__ = ('seq', 'raw', 'ts', 'record')
+
+    def __init__(self, seq, raw, ts, record=None):
+        self.seq = seq
+        self.raw = raw
+        self.ts = ts
+        self.record = record
+
+    @property
+    def text(self):
+        return self.raw.decode('utf-8', errors='replace')
+
+    def format(self):
+        """Render the line the way the dashboard console shows it"""
+        return f"[{datetime.fromtimestamp(self.ts).isoformat()}] {self.text}"
+
+    def to_record(self):
+        """The parsed fields, or the whole text as the message when unparsed"""
+        if self.record is None:
+            return {'seq': self.seq, 'ts': self.ts, 'level': 'INFO', 'message': self.text}
+        return dict(self.record.to_dict(self.raw), seq=self.seq, ts=self.ts)
+
+    def to_dict(self):
+        data = {'seq': self.seq, 'ts': self.ts, 'line': self.format()}
+        if self.record is not None:
+            data.update(self.record.to_dict(self.raw))
+        return data
+
+
+class LogRing:
+    """Fixed-capacity ring of log entries addressed by sequence number
+
+    Sequence numbers are monotonic and contiguous, so the slot of entry `seq`
+    is `seq % capacity` and range reads never copy the whole buffer.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._next_seq = 1
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self._next_seq - 1, self.capacity)
+
+    @property
+    def last_seq(self):
+        """Sequence number of the newest entry, 0 when empty"""
+        return self._next_seq - 1
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest entry still held"""
+        return max(1, self._next_seq - self.capacity)
+
+    def append(self, raw, ts=None, record=None):
+        """Store a line (bytes or str) and return its entry"""
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8', errors='replace')
+        with self._lock:
+            entry = LogEntry(self._next_seq, raw, time.time() if ts is None else ts, record)
+            self._slots[entry.seq % self.capacity] = entry
+            self._next_seq += 1
+        return entry
+
+    def since(self, seq, limit=None):
+        """Up to `limit` entries with a sequence number greater than `seq`, oldest first"""
+        with self._lock:
+            start = max(seq + 1, self.first_seq)
+            stop = self._next_seq
+            if limit is not None:
+                stop = min(stop, start + limit)
+            return self._range(start, stop)
+
+    def tail(self, count):
+        """The newest `count` entries, oldest first"""
+        with self._lock:
+            stop = self._next_seq
+            return self._range(max(stop - count, self.first_seq), stop)
+
+    def _range(self, start, stop):
+        slots, capacity = self._slots, self.capacity
+        return [slots[s % capacity] for s in range(start, stop)]
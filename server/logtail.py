@@ -0,0 +1,156 @@
+import mmap
+import os
+import threading
+
+# Bytes read per step when walking a file backwards
+BLOCK_SIZE = 64 * 1024
+# Files at least this large are tailed through mmap instead of seek/read
+MMAP_THRESHOLD = 32 * 1024 * 1024
+# Upper bound of bytes returned by one incremental read
+MAX_READ = 4 * 1024 * 1024
+# Removed before counting lines, so a line of only these counts as blank like str.strip() would
+BLANK = b' \t\r\x0b\x0c\x1c\x1d\x1e\x1f'
+
+
+def _count_text(data):
+    """Non-blank lines in `data`, which holds complete lines without the final newline"""
+    lines = data.translate(None, BLANK).split(b'\n')
+    return len(lines) - lines.count(b'')
+
+
+def _decode(lines):
+    out = []
+    for line in lines:
+        text = line.decode('utf-8', errors='replace').strip()
+        if text:
+            out.append(text)
+    return out
+
+
+class LogTail:
+    """Reads the end of growing log files without loading them whole
+
+    Line counts (non-blank lines, as the full read used to report) are
+    cached per path and keyed on the file's identity, so each call only
+    scans the bytes appended since the previous one.
+    """
+
+    def __init__(self, block_size=BLOCK_SIZE, mmap_threshold=MMAP_THRESHOLD):
+        self.block_size = block_size
+        self.mmap_threshold = mmap_threshold
+        self._index = {}  # path -> (identity, offset after the last complete line, non-blank lines before it)
+        self._lock = threading.Lock()
+
+    def tail(self, path, count):
+        """Last `count` non-empty lines, total non-empty line count and end offset"""
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            if count <= 0 or size == 0:
+                lines = []
+            elif size >= self.mmap_threshold:
+                lines = self._tail_mmap(f, size, count)
+            else:
+                lines = self._tail_blocks(f, size, count)
+            total = self._count_lines(path, f, st)
+        return lines, total, size
+
+    def read_after(self, path, offset, max_lines):
+        """Complete lines appended after byte `offset`, plus the next offset
+
+        If the file shrank below `offset` it was rotated, and the read falls
+        back to a tail with `reset` set.
+        """
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            total = self._count_lines(path, f, st)
+            if offset > size:
+                return self._tail_blocks(f, size, max_lines) if size else [], total, size, True
+
+            f.seek(offset)
+            data = f.read(min(size - offset, MAX_READ))
+
+        end = data.rfind(b'\n')
+        if end < 0:
+            return [], total, offset, False
+
+        raw = data[:end].split(b'\n')
+        if len(raw) > max_lines:
+            raw = raw[:max_lines]
+            consumed = sum(len(line) + 1 for line in raw)
+        else:
+            consumed = end + 1
+        return _decode(raw), total, offset + consumed, False
+
+    def _tail_blocks(self, f, size, count):
+        chunks = []
+        newlines = 0
+        pos = size
+        wanted = count
+        while pos > 0:
+            step = min(self.block_size, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            chunks.append(chunk)
+            newlines += chunk.count(b'\n')
+            if newlines > wanted:
+                lines = self._split_tail(b''.join(reversed(chunks)), pos > 0)
+                if len(lines) >= count:
+                    return lines[-count:]
+                # Blank lines ate into the budget, keep walking back
+                wanted = newlines + count - len(lines)
+        return self._split_tail(b''.join(reversed(chunks)), False)[-count:]
+
+    def _tail_mmap(self, f, size, count):
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lines = []
+            end = size
+            while end >= 0 and len(lines) < count:
+                newline = mm.rfind(b'\n', 0, end)
+                text = mm[newline + 1:end].decode('utf-8', errors='replace').strip()
+                if text:
+                    lines.append(text)
+                end = newline
+            lines.reverse()
+            return lines
+
+    @staticmethod
+    def _split_tail(data, partial_head):
+        lines = data.split(b'\n')
+        if partial_head:
+            lines = lines[1:]
+        return _decode(lines)
+
+    def _count_lines(self, path, f, st):
+        identity = (st.st_dev, st.st_ino)
+        size = st.st_size
+        with self._lock:
+            cached = self._index.get(path)
+        if cached and cached[0] == identity and cached[1] <= size:
+            start, total = cached[1], cached[2]
+        else:
+            start, total = 0, 0
+
+        tail = b''
+        if start < size:
+            f.seek(start)
+            remaining = size - start
+            while remaining > 0:
+                chunk = f.read(min(self.block_size * 16, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                data = tail + chunk if tail else chunk
+                end = data.rfind(b'\n')
+                if end < 0:
+                    tail = data
+                    continue
+                total += _count_text(data[:end])
+                start += end + 1
+                tail = data[end + 1:]
+            with self._lock:
+                self._index[path] = (identity, start, total)
+        # An unterminated last line counts, but is scanned again once it is complete
+        return total + (1 if tail.strip(BLANK) else 0)
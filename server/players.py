@@ -0,0 +1,216 @@
+import re
+import threading
+import time
+
+# Console lines look like "[12:00:00 INFO]: <message>" (Paper) or "[12:00:00] [Server thread/INFO]: <message>".
+# Only that prefix is stripped: /say output keeps its "[Name] " and cannot pass for a join or leave
+MESSAGE_RE = re.compile(r'^\[\d{1,2}:\d{2}:\d{2}(?: [A-Z]+\]:|\] \[[^\]]+/[A-Z]+\]:) (.*)$')
+UUID_RE = re.compile(r'^UUID of player (\w{1,16}) is ([0-9a-fA-F-]{32,36})')
+LOGIN_RE = re.compile(r'^(\w{1,16})\[/([^\]]+)\] logged in with entity id')
+JOIN_RE = re.compile(r'^(\w{1,16}) joined the game')
+LEAVE_RE = re.compile(r'^(\w{1,16}) left the game')
+CHAT_RE = re.compile(r'^(?:\[Not Secure\] )?<(\w{1,16})> (.*)$')
+LIST_RE = re.compile(r'There are (\d+) of a max(?: of)? (\d+) players online:?(.*)')
+DEATH_RE = re.compile(
+    r'^(\w{1,16}) (was |were |drowned|died|fell |hit the ground|burned|blew up|tried to swim|'
+    r'suffocated|starved|experienced kinetic|went up in flames|walked into|froze to death|'
+    r'withered away|discovered the floor|went off with a bang|didn\'t want to live|left the confines)'
+)
+
+
+class PlayerState:
+    __slots__ = ('name', 'uuid', 'online', 'address', 'session_start', 'last_seen',
+                 'sessions', 'playtime', 'deaths', 'last_death', 'messages')
+
+    def __init__(self, name):
+        self.name = name
+        self.uuid = None
+        self.online = False
+        self.address = None
+        self.session_start = None
+        self.last_seen = None
+        self.sessions = 0
+        self.playtime = 0.0
+        self.deaths = 0
+        self.last_death = None
+        self.messages = 0
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'uuid': self.uuid,
+            'status': 'online' if self.online else 'offline',
+            'sessionStart': self.session_start,
+            'lastSeen': self.last_seen,
+            'sessions': self.sessions,
+            'playtimeSeconds': round(self.playtime, 1),
+            'deaths': self.deaths,
+            'lastDeath': self.last_death,
+            'messages': self.messages
+        }
+
+
+class PlayerTracker:
+    """Player presence derived from join/leave/death/chat console lines
+
+    Players are indexed by lower-cased name and by UUID. Every change is
+    passed to `on_delta` as {'event': ..., 'player': {...}} so clients can
+    be pushed deltas instead of polling. The online list is cached between
+    changes, so reading it is constant time. `playtimeSeconds` covers
+    finished sessions; the current one runs from `sessionStart`. `version`
+    goes up with every change.
+    """
+
+    def __init__(self, on_delta=None, clock=time.time):
+        self.on_delta = on_delta
+        self.clock = clock
+        self.max_players = None
+        self.version = 0
+        self._by_name = {}
+        self._by_uuid = {}
+        self._online = {}
+        self._online_cache = []
+        self._lock = threading.Lock()
+
+    def _player(self, name):
+        key = name.lower()
+        player = self._by_name.get(key)
+        if player is None:
+            player = self._by_name[key] = PlayerState(name)
+        return player
+
+    def feed_line(self, text):
+        """Inspect a console line for player events"""
+        match = MESSAGE_RE.match(text)
+        message = match.group(1) if match else text
+        if not message:
+            return
+
+        # Cheap substring checks keep non-player lines off the regexes
+        if message[0] == '<' or message.startswith('[Not Secure] <'):
+            match = CHAT_RE.match(message)
+            if match:
+                self._chat(match.group(1), match.group(2))
+        elif ' joined the game' in message:
+            match = JOIN_RE.match(message)
+            if match:
+                self._join(match.group(1))
+        elif ' left the game' in message:
+            match = LEAVE_RE.match(message)
+            if match:
+                self._leave(match.group(1))
+        elif message.startswith('UUID of player '):
+            match = UUID_RE.match(message)
+            if match:
+                self._set_uuid(match.group(1), match.group(2))
+        elif '] logged in with entity id' in message:
+            match = LOGIN_RE.match(message)
+            if match:
+                with self._lock:
+                    self._player(match.group(1)).address = match.group(2)
+        elif message.startswith('There are '):
+            match = LIST_RE.match(message)
+            if match:
+                self.max_players = int(match.group(2))
+                self.version += 1
+                self.reconcile(name.strip() for name in match.group(3).split(',') if name.strip())
+        elif self._online:
+            match = DEATH_RE.match(message)
+            if match and match.group(1).lower() in self._online:
+                self._death(match.group(1), message)
+
+    def _set_uuid(self, name, uuid):
+        with self._lock:
+            player = self._player(name)
+            player.uuid = uuid
+            self._by_uuid[uuid] = player
+
+    def _join(self, name):
+        now = self.clock()
+        with self._lock:
+            player = self._player(name)
+            if player.online:
+                return
+            player.name = name
+            player.online = True
+            player.session_start = now
+            player.last_seen = now
+            player.sessions += 1
+            self._online[name.lower()] = player
+            self._refresh_online()
+            delta = player.to_dict()
+        self._emit('join', delta)
+
+    def _leave(self, name, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            player = self._online.pop(name.lower(), None)
+            if player is None:
+                return
+            if player.session_start:
+                player.playtime += now - player.session_start
+            player.online = False
+            player.last_seen = now
+            player.session_start = None
+            self._refresh_online()
+            delta = player.to_dict()
+        self._emit('leave', delta)
+
+    def _death(self, name, message):
+        now = self.clock()
+        with self._lock:
+            player = self._player(name)
+            player.deaths += 1
+            player.last_death = {'time': now, 'message': message}
+            player.last_seen = now
+            if player.online:
+                self._refresh_online()
+            delta = player.to_dict()
+        self._emit('death', delta, message=message)
+
+    def _chat(self, name, text):
+        now = self.clock()
+        with self._lock:
+            player = self._player(name)
+            player.messages += 1
+            player.last_seen = now
+            delta = player.to_dict()
+        self._emit('chat', delta, message=text)
+
+    def _refresh_online(self):
+        self._online_cache = [player.to_dict() for player in self._online.values()]
+
+    def _emit(self, event, player, **extra):
+        self.version += 1
+        if self.on_delta is not None:
+            self.on_delta(dict(extra, event=event, player=player))
+
+    def reconcile(self, names):
+        """Align the online set with an authoritative list of names"""
+        names = {name.lower(): name for name in names}
+        for key in list(self._online):
+            if key not in names:
+                self._leave(key)
+        for key, name in names.items():
+            if key not in self._online:
+                self._join(name)
+
+    def reset(self):
+        """Close every open session, e.g. when the server stops"""
+        now = self.clock()
+        for key in list(self._online):
+            self._leave(key, now)
+
+    def online(self):
+        """Online players, rebuilt only after a join or leave"""
+        return self._online_cache
+
+    def all_players(self):
+        with self._lock:
+            return [player.to_dict() for player in self._by_name.values()]
+
+    def get(self, key):
+        """Look a player up by UUID or name"""
+        with self._lock:
+            player = self._by_uuid.get(key) or self._by_name.get(key.lower())
+            return player.to_dict() if player else None
@@ -0,0 +1,252 @@
+import heapq
+import json
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+# NumPy, imported by _numpy() on the first build so it costs nothing at startup; None when not installed
+_UNLOADED = object()
+np = _UNLOADED
+
+# Leaderboard columns: (custom stats summed, categories summed over every key, scale)
+METRICS = {
+    'playtime': (('minecraft:play_time', 'minecraft:play_one_minute'), (), 1 / 20),
+    'blocksMined': ((), ('minecraft:mined',), 1),
+    'itemsCrafted': ((), ('minecraft:crafted',), 1),
+    'itemsUsed': ((), ('minecraft:used',), 1),
+    'mobKills': (('minecraft:mob_kills',), (), 1),
+    'playerKills': (('minecraft:player_kills',), (), 1),
+    'deaths': (('minecraft:deaths',), (), 1),
+    'jumps': (('minecraft:jump',), (), 1),
+    'damageDealt': (('minecraft:damage_dealt',), (), 1 / 10),
+    'distance': ((), (), 1 / 100),
+}
+# Every minecraft:custom "<how>_one_cm" stat counts towards distance
+DISTANCE_SUFFIX = '_one_cm'
+
+
+class PlayerStatsError(Exception):
+    pass
+
+
+def _numpy():
+    global np
+    if np is _UNLOADED:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+    return np
+
+
+def summarize(stats):
+    """Leaderboard values of one stats file: playtime in seconds, distance in meters"""
+    custom = stats.get('minecraft:custom', {})
+    summary = {}
+    for metric, (keys, categories, scale) in METRICS.items():
+        if metric == 'distance':
+            total = sum(value for key, value in custom.items() if key.endswith(DISTANCE_SUFFIX))
+        else:
+            total = sum(custom.get(key, 0) for key in keys)
+            total += sum(sum(stats.get(category, {}).values()) for category in categories)
+        summary[metric] = round(total * scale, 2) if scale != 1 else total
+    return summary
+
+
+def _read_stats(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    stats = data.get('stats', {}) if isinstance(data, dict) else {}
+    return stats, summarize(stats)
+
+
+class PlayerStatsIndex:
+    """Player statistics from `<level>/stats/<uuid>.json`, ready for leaderboards
+
+    Stats files are reread only when their size or mtime changed, on a
+    pool of `workers` threads, at most every `interval` seconds. After each
+    change the summaries are laid out as one column per metric (a NumPy
+    array when NumPy is installed), so a leaderboard is a partial sort of a
+    column instead of parsing thousands of files. Names come from
+    `usercache.json`; `playerdata/<uuid>.dat` only contributes its mtime,
+    as the last time the server saved that player.
+    """
+
+    def __init__(self, server_path, level=lambda: 'world', interval=30, workers=8):
+        self.server_path = server_path
+        self.level = level
+        self.interval = interval
+        self.workers = workers
+        self.loaded_at = None
+        self.load_ms = None
+        self._files = {}
+        self._names = {}
+        self._usercache_key = None
+        # uuid list, {metric: column}, {uuid: row}, replaced whole so readers need no lock
+        self._table = ([], {}, {})
+        self._lock = threading.Lock()
+
+    # Loading
+
+    def _paths(self):
+        world = os.path.join(self.server_path, self.level())
+        return os.path.join(world, 'stats'), os.path.join(world, 'playerdata')
+
+    def refresh(self, force=False):
+        """Reread changed stats files; returns how many were read"""
+        with self._lock:
+            if not force and self.loaded_at is not None and time.time() - self.loaded_at < self.interval:
+                return 0
+            started = time.perf_counter()
+            self._load_usercache()
+            stats_dir, playerdata_dir = self._paths()
+            listed = {}
+            try:
+                with os.scandir(stats_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith('.json') and entry.is_file():
+                            st = entry.stat()
+                            listed[entry.name[:-5]] = (entry.path, (st.st_size, st.st_mtime_ns))
+            except FileNotFoundError:
+                pass
+
+            todo = [(uuid, path, key) for uuid, (path, key) in listed.items()
+                    if force or self._files.get(uuid, {}).get('key') != key]
+            gone = [uuid for uuid in self._files if uuid not in listed]
+            for uuid in gone:
+                del self._files[uuid]
+            if todo:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(todo))) as pool:
+                    results = pool.map(lambda item: self._read(*item), todo)
+                    for (uuid, _, key), result in zip(todo, results):
+                        if result is not None:
+                            self._files[uuid] = dict(result, key=key)
+            saved = self._saved_times(playerdata_dir)
+            for uuid, entry in self._files.items():
+                entry['lastSaved'] = saved.get(uuid)
+            if todo or gone:
+                self._build()
+            self.loaded_at = time.time()
+            self.load_ms = round((time.perf_counter() - started) * 1000, 1)
+            return len(todo)
+
+    def _read(self, uuid, path, key):
+        try:
+            stats, summary = _read_stats(path)
+        except (OSError, ValueError) as e:
+            # Usually caught halfway through a save; read again next refresh
+            print(f'Error reading stats of {uuid}: {e}')
+            return None
+        return {'stats': stats, 'summary': summary}
+
+    def _saved_times(self, playerdata_dir):
+        saved = {}
+        try:
+            with os.scandir(playerdata_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.dat'):
+                        saved[entry.name[:-4]] = entry.stat().st_mtime
+        except FileNotFoundError:
+            pass
+        return saved
+
+    def _load_usercache(self):
+        path = os.path.join(self.server_path, 'usercache.json')
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        if self._usercache_key == (st.st_size, st.st_mtime_ns):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            self._names = {entry['uuid']: entry['name'] for entry in entries if 'uuid' in entry and 'name' in entry}
+            self._usercache_key = (st.st_size, st.st_mtime_ns)
+        except (OSError, ValueError, TypeError) as e:
+            print(f'Error reading usercache.json: {e}')
+
+    def _build(self):
+        np = _numpy()
+        uuids = sorted(self._files)
+        columns = {}
+        for metric in METRICS:
+            values = [self._files[uuid]['summary'][metric] for uuid in uuids]
+            columns[metric] = np.array(values, dtype=np.float64) if np is not None else array('d', values)
+        self._table = (uuids, columns, {uuid: row for row, uuid in enumerate(uuids)})
+
+    # Queries
+
+    def name(self, uuid):
+        return self._names.get(uuid)
+
+    def resolve(self, key):
+        """UUID of a player given by UUID or name"""
+        if key in self._files:
+            return key
+        lowered = key.lower()
+        for uuid, name in self._names.items():
+            if name.lower() == lowered:
+                return uuid
+        return None
+
+    def player(self, key):
+        self.refresh()
+        uuid = self.resolve(key)
+        entry = self._files.get(uuid)
+        if entry is None:
+            raise PlayerStatsError('No stats for that player')
+        return {
+            'uuid': uuid,
+            'name': self.name(uuid),
+            'lastSaved': entry['lastSaved'],
+            'summary': entry['summary'],
+            'ranks': self.ranks(uuid),
+            'stats': entry['stats']
+        }
+
+    def ranks(self, uuid):
+        """1-based rank of a player on every leaderboard"""
+        uuids, columns, rows = self._table
+        row = rows.get(uuid)
+        if row is None:
+            return {}
+        if _numpy() is not None:
+            return {metric: int((column > column[row]).sum()) + 1 for metric, column in columns.items()}
+        return {metric: sum(1 for value in column if value > column[row]) + 1 for metric, column in columns.items()}
+
+    def top(self, metric, limit=50):
+        """Players with the highest non-zero `metric`, best first"""
+        if metric not in METRICS:
+            raise PlayerStatsError(f'Unknown metric, expected one of: {", ".join(METRICS)}')
+        self.refresh()
+        uuids, columns, _ = self._table
+        column = columns.get(metric)
+        if column is None or not len(uuids) or limit <= 0:
+            return []
+        np = _numpy()
+        if np is not None:
+            if limit < len(uuids):
+                rows = np.argpartition(-column, limit - 1)[:limit]
+            else:
+                rows = np.arange(len(uuids))
+            rows = rows[np.argsort(-column[rows], kind='stable')].tolist()
+        else:
+            rows = heapq.nlargest(limit, range(len(uuids)), key=column.__getitem__)
+        return [{'rank': rank, 'uuid': uuids[row], 'name': self.name(uuids[row]), 'value': float(column[row])}
+                for rank, row in enumerate(rows, 1) if column[row] > 0]
+
+    def leaderboards(self, limit=10):
+        return {metric: self.top(metric, limit) for metric in METRICS}
+
+    def to_dict(self):
+        return {
+            'players': len(self._table[0]),
+            'metrics': list(METRICS),
+            'loadedAt': self.loaded_at,
+            'loadMs': self.load_ms,
+            'numpy': _numpy() is not None
+        }
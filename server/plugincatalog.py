@@ -0,0 +1,216 @@
+import json
+import os
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+DESCRIPTORS = ('paper-plugin.yml', 'plugin.yml')
+
+
+def _scalar(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+        return value[1:-1]
+    if value.startswith('[') and value.endswith(']'):
+        return [_scalar(item) for item in value[1:-1].split(',') if item.strip()]
+    return value
+
+
+def parse_yaml(text):
+    """Parse the YAML subset used by plugin descriptors
+
+    Handles nested maps, block and inline lists, quoted scalars and `|`/`>`
+    block scalars. Anything fancier is returned as plain strings.
+    """
+    lines = []
+    for raw in text.splitlines():
+        stripped = raw.strip()
+        if stripped and not stripped.startswith('#'):
+            lines.append((len(raw) - len(raw.lstrip()), stripped))
+
+    def parse_block(i, indent):
+        container = None
+        while i < len(lines):
+            line_indent, content = lines[i]
+            if line_indent < indent:
+                break
+            if content.startswith('- ') or content == '-':
+                container = [] if container is None else container
+                if not isinstance(container, list):
+                    break
+                container.append(_scalar(content[2:]))
+                i += 1
+                continue
+
+            key, sep, value = content.partition(':')
+            if not sep:
+                i += 1
+                continue
+            container = {} if container is None else container
+            if not isinstance(container, dict):
+                break
+            key = _scalar(key)
+            value = value.strip()
+            i += 1
+            if value in ('|', '>', '|-', '>-'):
+                parts = []
+                while i < len(lines) and lines[i][0] > line_indent:
+                    parts.append(lines[i][1])
+                    i += 1
+                container[key] = ('\n' if value.startswith('|') else ' ').join(parts)
+            elif value:
+                container[key] = _scalar(value)
+            elif i < len(lines) and (lines[i][0] > line_indent or lines[i][1].startswith('- ')):
+                container[key], i = parse_block(i, lines[i][0])
+            else:
+                container[key] = None
+        return container if container is not None else {}, i
+
+    result, _ = parse_block(0, 0)
+    return result if isinstance(result, dict) else {}
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    if isinstance(value, dict):
+        return list(value)
+    return [str(value)]
+
+
+def read_plugin_metadata(path):
+    """Read name, version, main class, dependencies and API version from a jar
+
+    Only the zip central directory and the descriptor entry are read.
+    """
+    with zipfile.ZipFile(path) as jar:
+        names = set(jar.namelist())
+        descriptor = next((name for name in DESCRIPTORS if name in names), None)
+        if descriptor is None:
+            return {'descriptor': None}
+        with jar.open(descriptor) as f:
+            data = parse_yaml(f.read().decode('utf-8', errors='replace'))
+
+    if descriptor == 'paper-plugin.yml':
+        deps = data.get('dependencies') or {}
+        server_deps = deps.get('server') if isinstance(deps, dict) else None
+        depend, softdepend = [], []
+        if isinstance(server_deps, dict):
+            for dep_name, options in server_deps.items():
+                required = not isinstance(options, dict) or str(options.get('required', 'true')).lower() == 'true'
+                (depend if required else softdepend).append(dep_name)
+    else:
+        depend = _as_list(data.get('depend'))
+        softdepend = _as_list(data.get('softdepend'))
+
+    authors = _as_list(data.get('authors')) or _as_list(data.get('author'))
+    return {
+        'descriptor': descriptor,
+        'pluginName': data.get('name'),
+        'version': data.get('version'),
+        'main': data.get('main'),
+        'apiVersion': data.get('api-version'),
+        'description': data.get('description'),
+        'authors': authors,
+        'depend': depend,
+        'softDepend': softdepend,
+        'loadBefore': _as_list(data.get('loadbefore')),
+    }
+
+
+class PluginCatalog:
+    """Plugin inventory with jar metadata cached on (path, size, mtime)
+
+    The cache is persisted as JSON so a cold start only parses jars that
+    changed since the last run. New or changed jars are parsed in parallel.
+    """
+
+    def __init__(self, plugins_dir, index_path, workers=8):
+        self.plugins_dir = plugins_dir
+        self.index_path = index_path
+        self.workers = workers
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f'{self.index_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def _parse(path):
+        try:
+            return read_plugin_metadata(path)
+        except (OSError, zipfile.BadZipFile, KeyError, EOFError, ValueError, zlib.error,
+                RuntimeError, NotImplementedError) as e:
+            # Encrypted (RuntimeError) or oddly compressed (NotImplementedError) jars too:
+            # one bad jar is listed as unreadable instead of failing the whole list
+            return {'descriptor': None, 'unreadable': True, 'error': str(e) or type(e).__name__}
+
+    def version(self):
+        """Changes whenever a jar is added, removed or replaced, without opening any"""
+        if not os.path.isdir(self.plugins_dir):
+            return None
+        jars = []
+        for entry in os.scandir(self.plugins_dir):
+            if entry.name.endswith('.jar') and entry.is_file():
+                st = entry.stat()
+                jars.append((entry.name, st.st_size, st.st_mtime_ns))
+        return tuple(sorted(jars))
+
+    def scan(self):
+        """Return the plugin list, parsing only jars that changed"""
+        if not os.path.isdir(self.plugins_dir):
+            return []
+
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            index = self._index
+
+            current = {}
+            stale = []
+            for entry in os.scandir(self.plugins_dir):
+                if not entry.name.endswith('.jar') or not entry.is_file():
+                    continue
+                st = entry.stat()
+                cached = index.get(entry.path)
+                if cached and cached['size'] == st.st_size and cached['mtime'] == st.st_mtime:
+                    current[entry.path] = cached
+                else:
+                    current[entry.path] = {'file': entry.name, 'size': st.st_size, 'mtime': st.st_mtime}
+                    stale.append(entry.path)
+
+            if stale:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(stale))) as pool:
+                    for path, meta in zip(stale, pool.map(self._parse, stale)):
+                        current[path]['meta'] = meta
+
+            if stale or len(current) != len(index):
+                self._index = current
+                self._save_index(current)
+
+        plugins = []
+        for path in sorted(current):
+            cached = current[path]
+            meta = cached.get('meta') or {}
+            plugins.append(dict(
+                meta,
+                name=meta.get('pluginName') or cached['file'][:-len('.jar')],
+                file=cached['file'],
+                size=cached['size'],
+                enabled=True
+            ))
+        return plugins
@@ -0,0 +1,231 @@
+import math
+import os
+import re
+import threading
+import time
+
+from timeseries import RollupSeries
+from tpsmonitor import RANGES
+
+FIELDS = (
+    'cpuPercent', 'rssMB', 'threads', 'fds', 'readKBps', 'writeKBps', 'majorFaults',
+    'ctxSwitchesPerSec', 'gcPauses', 'gcPauseMs', 'heapUsedMB', 'heapCommittedMB'
+)
+# Unified JVM logging (-Xlog:gc), e.g.
+# [12.345s][info][gc] GC(12) Pause Young (Normal) (G1 Evacuation Pause) 512M->128M(8192M) 12.345ms
+GC_RE = re.compile(
+    r'GC\((\d+)\) (Pause [A-Za-z ]+?(?: \([^)]*\))*) (\d+)([KMG])->(\d+)([KMG])\((\d+)([KMG])\) ([\d.]+)ms'
+)
+UNIT_MB = {'K': 1 / 1024, 'M': 1, 'G': 1024}
+PROC_FILES = ('stat', 'status', 'io')
+
+
+def _parse_status(text):
+    values = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(':')
+        if key in ('voluntary_ctxt_switches', 'nonvoluntary_ctxt_switches', 'VmHWM'):
+            values[key] = int(value.split()[0])
+    return values
+
+
+def _parse_io(text):
+    values = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(':')
+        if key in ('read_bytes', 'write_bytes'):
+            values[key] = int(value)
+    return values
+
+
+class ProcessSampler:
+    """Samples CPU, memory, threads, fds, I/O and GC of the server process
+
+    Every `interval` seconds the process returned by `get_pid()` is read
+    from /proc/<pid>/stat, status, io and fd. The files are kept open and
+    re-read with pread, so a sample is a handful of syscalls. GC pauses
+    come from -Xlog:gc lines passed to `feed_line`. Samples go into a
+    RollupSeries and `on_sample` receives each new latest value.
+    """
+
+    def __init__(self, get_pid, interval=2.0, raw_capacity=1800, on_sample=None,
+                 clock=time.time, proc_root='/proc'):
+        self.get_pid = get_pid
+        self.interval = interval
+        self.on_sample = on_sample
+        self.clock = clock
+        self.proc_root = proc_root
+        self.series = RollupSeries(FIELDS, raw_capacity=raw_capacity)
+        self.latest = None
+        self.supported = os.path.isdir(proc_root)
+        self.samples = 0
+        self.cost_seconds = 0.0
+        self._pid = None
+        self._fds = {}
+        self._prev = None
+        self._clk_tck = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self._page_mb = (os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096) / (1024 * 1024)
+        self._gc = {'count': 0, 'pauseMsTotal': 0.0, 'lastPauseMs': None, 'lastPause': None}
+        self._gc_window = [0, 0.0]
+        self._heap = (math.nan, math.nan)
+        self._history = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is not None or not self.supported:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f'Error sampling process metrics: {e}')
+
+    # /proc access
+
+    def _open(self, pid):
+        self._close()
+        base = os.path.join(self.proc_root, str(pid))
+        self._fds = {name: os.open(os.path.join(base, name), os.O_RDONLY) for name in PROC_FILES}
+        self._pid = pid
+        self._prev = None
+        self._heap = (math.nan, math.nan)
+        self._gc_window = [0, 0.0]
+
+    def _close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+        self._pid = None
+        self._prev = None
+
+    def _read(self, name):
+        return os.pread(self._fds[name], 8192, 0).decode('ascii', errors='replace')
+
+    def read(self, pid):
+        """Raw counters of `pid`, reusing the open /proc files"""
+        if pid != self._pid:
+            self._open(pid)
+        stat = self._read('stat')
+        # The command name may contain spaces, fields start after its ')'
+        fields = stat[stat.rfind(')') + 2:].split()
+        status = _parse_status(self._read('status'))
+        try:
+            io = _parse_io(self._read('io'))
+        except OSError:
+            io = {}
+        return {
+            'cpuTicks': int(fields[11]) + int(fields[12]),
+            'majorFaults': int(fields[9]),
+            'threads': int(fields[17]),
+            'rssMB': int(fields[21]) * self._page_mb,
+            'ctxSwitches': status.get('voluntary_ctxt_switches', 0) + status.get('nonvoluntary_ctxt_switches', 0),
+            'peakRssMB': status.get('VmHWM', 0) / 1024,
+            'readBytes': io.get('read_bytes', 0),
+            'writeBytes': io.get('write_bytes', 0),
+            'fds': len(os.listdir(os.path.join(self.proc_root, str(pid), 'fd'))),
+            'at': time.monotonic()
+        }
+
+    # Sampling
+
+    def tick(self):
+        """Take one sample of the current process, returns the latest value"""
+        started = time.perf_counter()
+        pid = self.get_pid()
+        if pid is None:
+            if self._pid is not None:
+                self._close()
+            return None
+        try:
+            now = self.read(pid)
+        except (OSError, IndexError, ValueError):
+            # The process exited between get_pid() and the reads
+            self._close()
+            return None
+
+        prev, self._prev = self._prev, now
+        if prev is None:
+            return None
+        elapsed = now['at'] - prev['at'] or 1e-9
+        (gc_pauses, gc_pause_ms), self._gc_window = self._gc_window, [0, 0.0]
+        values = (
+            (now['cpuTicks'] - prev['cpuTicks']) / self._clk_tck / elapsed * 100,
+            now['rssMB'],
+            now['threads'],
+            now['fds'],
+            (now['readBytes'] - prev['readBytes']) / 1024 / elapsed,
+            (now['writeBytes'] - prev['writeBytes']) / 1024 / elapsed,
+            now['majorFaults'] - prev['majorFaults'],
+            (now['ctxSwitches'] - prev['ctxSwitches']) / elapsed,
+            gc_pauses,
+            gc_pause_ms,
+            self._heap[0],
+            self._heap[1]
+        )
+        self.record(values, pid=pid, peak_rss=now['peakRssMB'])
+        self.samples += 1
+        self.cost_seconds += time.perf_counter() - started
+        if self.on_sample is not None:
+            self.on_sample(self.latest)
+        return self.latest
+
+    def feed_line(self, text):
+        """Inspect a console line for -Xlog:gc pause lines"""
+        if 'GC(' not in text or 'Pause' not in text:
+            return
+        match = GC_RE.search(text)
+        if not match:
+            return
+        _, cause, _, _, after, after_unit, committed, committed_unit, pause = match.groups()
+        pause = float(pause)
+        self._gc_window[0] += 1
+        self._gc_window[1] += pause
+        self._heap = (int(after) * UNIT_MB[after_unit], int(committed) * UNIT_MB[committed_unit])
+        gc = self._gc
+        gc['count'] += 1
+        gc['pauseMsTotal'] += pause
+        gc['lastPauseMs'] = pause
+        gc['lastPause'] = cause
+
+    def record(self, values, ts=None, pid=None, peak_rss=None):
+        """Store a sample and refresh the cached latest value"""
+        ts = self.clock() if ts is None else ts
+        self.series.append(ts, values)
+        self._history = {}
+        self.latest = dict(
+            ((field, None if math.isnan(value) else round(value, 2)) for field, value in zip(FIELDS, values)),
+            pid=pid,
+            peakRssMB=round(peak_rss, 2) if peak_rss is not None else None,
+            gc=dict(self._gc, pauseMsTotal=round(self._gc['pauseMsTotal'], 3)),
+            sampledAt=ts
+        )
+
+    def history(self, range_name):
+        """Samples within a named range (see RANGES), cached until the next sample"""
+        cached = self._history.get(range_name)
+        if cached is None:
+            seconds, resolution = RANGES[range_name]
+            cached = self._history[range_name] = {
+                'range': range_name,
+                'resolution': resolution,
+                'samples': self.series.history(resolution, self.clock() - seconds)
+            }
+        return cached
+
+    def stats(self):
+        """What sampling itself costs"""
+        per_sample = self.cost_seconds / self.samples if self.samples else 0
+        return {
+            'interval': self.interval,
+            'samples': self.samples,
+            'costPerSampleMs': round(per_sample * 1000, 3),
+            'overheadPercent': round(per_sample / self.interval * 100, 4) if self.interval else None
+        }
@@ -0,0 +1,220 @@
+import os
+import struct
+import sys
+import threading
+import time
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+_EVENT = struct.Struct('iIII')
+
+
+def parse_properties(text):
+    properties = {}
+    for line in text.split('\n'):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            parts = line.split('=', 1)
+            if len(parts) == 2:
+                properties[parts[0].strip()] = parts[1].strip()
+    return properties
+
+
+def _file_key(st):
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class PropertiesService:
+    """Cached server.properties with batched, atomic updates
+
+    Reads are served from memory while the file's (mtime, size, inode) is
+    unchanged. Concurrent update() calls are merged: whichever caller finds
+    no write in progress becomes the writer and applies every queued update
+    in one write-to-temp + fsync + rename, so a crash never leaves a
+    half-written file. The watcher compares the file against the version
+    last passed to `on_change`, not the cached one, so a read() that picked
+    up an outside edit first does not swallow its notification.
+    """
+
+    def __init__(self, path, on_change=None):
+        self.path = path
+        self.on_change = on_change
+        self._key = None
+        self._notified_key = None
+        self._properties = {}
+        self._lock = threading.Lock()
+        self._queue = []
+        self._writing = False
+        self._file_lock = threading.Lock()
+        self._watcher = None
+
+    def read(self):
+        """Parsed properties, re-read only when the file changed"""
+        st = os.stat(self.path)
+        key = _file_key(st)
+        if key != self._key:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                properties = parse_properties(f.read())
+            self._properties, self._key = properties, key
+        return dict(self._properties)
+
+    def version(self):
+        """Changes whenever the file does, without reading it"""
+        return _file_key(os.stat(self.path))
+
+    def update(self, updates):
+        """Apply updates, batched with any other updates queued meanwhile"""
+        waiter = [dict(updates), threading.Event(), None]
+        with self._lock:
+            self._queue.append(waiter)
+            leader = not self._writing
+            self._writing = True
+
+        if not leader:
+            waiter[1].wait()
+        else:
+            while True:
+                with self._lock:
+                    batch, self._queue = self._queue, []
+                    if not batch:
+                        self._writing = False
+                        break
+                merged = {}
+                for queued in batch:
+                    merged.update(queued[0])
+                try:
+                    with self._file_lock:
+                        self._write(merged)
+                    self._notify()
+                    error = None
+                except Exception as e:
+                    error = e
+                for queued in batch:
+                    queued[2] = error
+                    queued[1].set()
+
+        if waiter[2] is not None:
+            raise waiter[2]
+
+    def _write(self, updates):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = []
+
+        existing_keys = set()
+        updated_lines = []
+        for line in lines:
+            line_stripped = line.strip()
+            if line_stripped and not line_stripped.startswith('#'):
+                parts = line_stripped.split('=', 1)
+                if len(parts) == 2:
+                    key = parts[0].strip()
+                    existing_keys.add(key)
+                    if key in updates:
+                        updated_lines.append(f'{key}={updates[key]}\n')
+                        continue
+            updated_lines.append(line)
+        for key, value in updates.items():
+            if key not in existing_keys:
+                updated_lines.append(f'{key}={value}\n')
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp_path = f'{self.path}.tmp-{os.getpid()}'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(updated_lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        if sys.platform != 'win32':
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+        self._properties = parse_properties(''.join(updated_lines))
+        self._key = _file_key(os.stat(self.path))
+
+    def _notify(self):
+        self._notified_key = self._key
+        if self.on_change is not None:
+            try:
+                self.on_change(dict(self._properties))
+            except Exception as e:
+                print(f'Error in properties change handler: {e}')
+
+    def check(self):
+        """Reload if the file changed outside update(), notifying on change"""
+        try:
+            key = _file_key(os.stat(self.path))
+        except OSError:
+            return
+        with self._file_lock:
+            if key == self._notified_key:
+                return
+            self.read()
+        self._notify()
+
+    def watch(self, poll_interval=2.0):
+        """Start watching the file, with inotify on Linux and polling elsewhere"""
+        if self._watcher is not None:
+            return
+        if self._notified_key is None:
+            # Clients already have the file as it is now
+            try:
+                self._notified_key = _file_key(os.stat(self.path))
+            except OSError:
+                pass
+        fd = self._inotify_fd()
+        target = self._watch_inotify if fd is not None else self._watch_poll
+        args = (fd,) if fd is not None else (poll_interval,)
+        self._watcher = threading.Thread(target=target, args=args, daemon=True)
+        self._watcher.start()
+
+    def _inotify_fd(self):
+        if not sys.platform.startswith('linux'):
+            return None
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            # ctypes and find_library (which may run ldconfig) are paid for only when watching starts
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+            if fd < 0:
+                return None
+            mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+            if libc.inotify_add_watch(fd, directory.encode(), mask) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def _watch_inotify(self, fd):
+        name = os.path.basename(self.path).encode()
+        while True:
+            try:
+                data = os.read(fd, 64 * 1024)
+            except OSError:
+                return
+            offset = 0
+            relevant = False
+            while offset + _EVENT.size <= len(data):
+                _, _, _, length = _EVENT.unpack_from(data, offset)
+                event_name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+                relevant = relevant or event_name == name
+                offset += _EVENT.size + length
+            if relevant:
+                self.check()
+
+    def _watch_poll(self, interval):
+        while True:
+            time.sleep(interval)
+            self.check()
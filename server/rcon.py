@@ -0,0 +1,206 @@
+import itertools
+import select
+import socket
+import struct
+import threading
+import time
+
+SERVERDATA_RESPONSE_VALUE = 0
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_AUTH = 3
+# The server reads a request with one 1460 byte read and drops the connection
+# unless it holds exactly one whole packet: 4 length + 8 id/type + body + 2 nul bytes
+MAX_REQUEST = 1460
+MAX_COMMAND_BYTES = MAX_REQUEST - 14
+# Replies are split into packets of this many characters; a shorter one is the last
+MAX_REPLY_CHARS = 4096
+# How long a full-size reply packet may be followed by another one
+CONTINUATION_WAIT = 0.05
+
+
+class RconError(Exception):
+    """RCON connection, authentication or timeout failure
+
+    `sent` tells whether the command may have reached the server, in which
+    case it must not be retried on another route.
+    """
+
+    def __init__(self, message, sent=False):
+        super().__init__(message)
+        self.sent = sent
+
+
+def encode_packet(request_id, packet_type, body):
+    payload = struct.pack('<ii', request_id, packet_type) + body.encode('utf-8') + b'\x00\x00'
+    return struct.pack('<i', len(payload)) + payload
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise RconError('RCON connection closed')
+        buf += chunk
+    return bytes(buf)
+
+
+def read_packet(sock):
+    """Read one packet, returns (request_id, type, body)"""
+    (length,) = struct.unpack('<i', _recv_exact(sock, 4))
+    if length < 10 or length > 1024 * 1024:
+        raise RconError(f'Invalid RCON packet length {length}')
+    data = _recv_exact(sock, length)
+    request_id, packet_type = struct.unpack('<ii', data[:8])
+    return request_id, packet_type, data[8:-2].decode('utf-8', errors='replace')
+
+
+class RconConnection:
+    """One authenticated RCON socket running one command at a time
+
+    Paper (like vanilla) handles a connection's requests one after the
+    other and drops it when a read holds more than one packet, so each
+    command is sent as a single packet and its reply read before the next
+    one is sent. A reply longer than MAX_REPLY_CHARS comes as several
+    packets with the command's request id; it ends with a shorter packet,
+    or when a full-size one is not followed by another within
+    CONTINUATION_WAIT. Packets with any other id, left over from a
+    command that timed out, are skipped.
+    """
+
+    def __init__(self, host, port, password, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.closed = True
+        self._sock = None
+        self._ids = itertools.count(2)
+        self._lock = threading.Lock()
+
+    def connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            sock.sendall(encode_packet(1, SERVERDATA_AUTH, self.password))
+            while True:
+                request_id, packet_type, _ = read_packet(sock)
+                if packet_type == SERVERDATA_AUTH_RESPONSE:
+                    break
+            if request_id == -1:
+                raise RconError('RCON authentication failed')
+        except (OSError, RconError):
+            sock.close()
+            raise
+        self._sock = sock
+        self.closed = False
+
+    def stale(self):
+        """Whether the server closed the idle connection, e.g. because it restarted"""
+        if self.closed:
+            return True
+        # A busy connection is being read by its command, which notices a close itself
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+            if readable and not self._sock.recv(1, socket.MSG_PEEK):
+                self.close()
+        except (OSError, ValueError):
+            self.close()
+        finally:
+            self._lock.release()
+        return self.closed
+
+    def command(self, command, timeout=None):
+        """Run a command and return the server's response text"""
+        payload = command.encode('utf-8')
+        if len(payload) > MAX_COMMAND_BYTES:
+            raise RconError(f'RCON commands are limited to {MAX_COMMAND_BYTES} bytes')
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            if self.closed:
+                raise RconError('RCON connection is closed')
+            request_id = next(self._ids)
+            try:
+                self._sock.settimeout(max(0.001, deadline - time.monotonic()))
+                self._sock.sendall(encode_packet(request_id, SERVERDATA_EXECCOMMAND, command))
+            except OSError as e:
+                self.close()
+                raise RconError(f'Cannot send RCON command: {e}')
+            try:
+                return self._read_reply(request_id, deadline)
+            except socket.timeout:
+                # A late reply would be read as the next command's, start over instead
+                self.close()
+                raise RconError(f'RCON command timed out: {command}', sent=True)
+            except (OSError, RconError) as e:
+                self.close()
+                raise RconError(str(e), sent=True)
+
+    def _read_reply(self, request_id, deadline):
+        sock = self._sock
+        parts = []
+        while True:
+            sock.settimeout(max(0.001, deadline - time.monotonic()))
+            reply_id, _, body = read_packet(sock)
+            if reply_id != request_id:
+                continue
+            parts.append(body)
+            if len(body) < MAX_REPLY_CHARS:
+                break
+            readable, _, _ = select.select([sock], [], [], CONTINUATION_WAIT)
+            if not readable:
+                break
+        return ''.join(parts)
+
+    def close(self):
+        self.closed = True
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+
+
+class RconPool:
+    """Small pool of persistent RCON connections
+
+    Connections are opened lazily and reopened when they failed or the
+    server closed them. Commands are spread round-robin, so up to `size`
+    run at once.
+    """
+
+    def __init__(self, host, port, password, size=2, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self._slots = [None] * size
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        index = next(self._next) % len(self._slots)
+        with self._lock:
+            conn = self._slots[index]
+            if conn is None or conn.stale():
+                conn = RconConnection(self.host, self.port, self.password, self.timeout)
+                try:
+                    conn.connect()
+                except OSError as e:
+                    raise RconError(f'Cannot connect to RCON at {self.host}:{self.port}: {e}')
+                self._slots[index] = conn
+        return conn
+
+    def command(self, command, timeout=None):
+        """Run a command and return the server's response text"""
+        return self._acquire().command(command, timeout)
+
+    def close(self):
+        with self._lock:
+            for conn in self._slots:
+                if conn is not None:
+                    conn.close()
+            self._slots = [None] * len(self._slots)
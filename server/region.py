@@ -0,0 +1,277 @@
+import json
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from itertools import compress
+
+# NumPy, imported by _numpy() on the first scan so it costs nothing at startup; None when not installed
+_UNLOADED = object()
+np = _UNLOADED
+
+REGION_RE = re.compile(r'^r\.(-?\d+)\.(-?\d+)\.mca$')
+# 1024 big-endian location entries (3-byte sector offset, 1-byte sector count) then 1024 timestamps
+HEADER_SIZE = 8192
+SECTOR = 4096
+WEEK = 7 * 86400
+# Folder of each dimension inside a world folder; Paper keeps the nether and end in their own folders
+DIMENSIONS = (('overworld', 'region'), ('the_nether', os.path.join('DIM-1', 'region')),
+              ('the_end', os.path.join('DIM1', 'region')))
+# Below this many files to scan, a process pool costs more than it saves
+POOL_THRESHOLD = 256
+POOL_CHUNKSIZE = 256
+PRUNE_LIMIT = 100
+
+
+def _numpy():
+    global np
+    if np is _UNLOADED:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+    return np
+
+
+def _header(path, np):
+    """The 8 KiB header of a region file: a big-endian uint32 array with NumPy, bytes without"""
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), HEADER_SIZE, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Shorter than a header (empty or cut off)
+            return None
+        try:
+            if np is not None:
+                return np.frombuffer(mm, dtype='>u4', count=HEADER_SIZE // 4).astype(np.uint32)
+            return mm[:HEADER_SIZE]
+        finally:
+            mm.close()
+
+
+def scan_region(path):
+    """(chunks, used bytes, oldest, newest, {week: chunks}) from a region file's header alone"""
+    np = _numpy()
+    header = _header(path, np)
+    if header is None:
+        return 0, 0, None, None, {}
+    if np is not None:
+        locations, timestamps = header[:1024], header[1024:]
+        present = locations != 0
+        chunks = int(present.sum())
+        if not chunks:
+            return 0, 0, None, None, {}
+        used = int((locations[present] & 0xFF).sum()) * SECTOR
+        stamps = timestamps[present]
+        stamps = stamps[stamps != 0]
+        if not len(stamps):
+            return chunks, used, None, None, {}
+        weeks, counts = np.unique(stamps // WEEK, return_counts=True)
+        return (chunks, used, int(stamps.min()), int(stamps.max()),
+                {int(week): int(count) for week, count in zip(weeks, counts)})
+
+    # Kept to C-level builtins, a Python loop over 1024 entries would dominate the scan
+    words = array('I', header)
+    if sys.byteorder == 'little':
+        words.byteswap()
+    chunks = 1024 - words[:1024].count(0)
+    if not chunks:
+        return 0, 0, None, None, {}
+    # The last byte of each location entry is its sector count
+    used = sum(header[3:4096:4]) * SECTOR
+    # Timestamps of present chunks only, an absent chunk may keep a stale one
+    stamps = list(filter(None, compress(words[1024:], words[:1024])))
+    if not stamps:
+        return chunks, used, None, None, {}
+    oldest, newest = min(stamps), max(stamps)
+    if oldest // WEEK == newest // WEEK:
+        # Most regions are generated in one go and never saved again
+        return chunks, used, oldest, newest, {oldest // WEEK: len(stamps)}
+    return chunks, used, oldest, newest, dict(Counter(stamp // WEEK for stamp in stamps))
+
+
+def _scan_many(paths):
+    return [scan_region(path) for path in paths]
+
+
+class RegionAnalyzer:
+    """World size, chunk counts, activity and prune candidates from region file headers
+
+    Only the 8 KiB location and timestamp tables of each `region/*.mca` are
+    read, through mmap and NumPy when it is installed (a plain array
+    otherwise); no chunk is decompressed. Results are cached per file on
+    its size and mtime in `cache_path`, so a rescan only reads changed
+    regions. Large scans are spread over a process pool of `workers`.
+
+    A region is a prune candidate when its newest chunk is older than
+    `min_age_days` and all its chunks were last saved within
+    `revisit_window` seconds of each other, i.e. it was generated once and
+    never visited again.
+    """
+
+    def __init__(self, root, cache_path=None, workers=None, min_age_days=30, revisit_window=3600):
+        self.root = root
+        self.cache_path = cache_path
+        self.workers = workers
+        self.min_age_days = min_age_days
+        self.revisit_window = revisit_window
+        self.last_scan = None
+        self._cache = self._load_cache()
+        self._lock = threading.Lock()
+
+    # Scanning
+
+    def region_dirs(self, worlds):
+        for world in worlds:
+            for dimension, sub in DIMENSIONS:
+                path = os.path.join(self.root, world, sub)
+                if os.path.isdir(path):
+                    yield world, dimension, path
+
+    def _list(self, directory):
+        files = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                match = REGION_RE.match(entry.name)
+                if match and entry.is_file():
+                    st = entry.stat()
+                    files.append((entry.path, int(match.group(1)), int(match.group(2)), st.st_size, st.st_mtime_ns))
+        return files
+
+    def scan(self, worlds, refresh=False):
+        """Bring the cache up to date for every region of `worlds`"""
+        with self._lock:
+            started = time.perf_counter()
+            dimensions = []
+            todo = []
+            for world, dimension, directory in self.region_dirs(worlds):
+                files = self._list(directory)
+                dimensions.append((world, dimension, directory, files))
+                for path, _, _, size, mtime in files:
+                    cached = self._cache.get(path)
+                    if refresh or cached is None or cached[0] != size or cached[1] != mtime:
+                        todo.append((path, size, mtime))
+
+            listed = {path for _, _, _, files in dimensions for path, *_ in files}
+            directories = {directory for _, _, directory, _ in dimensions}
+            # Forget regions that were deleted
+            gone = [path for path in self._cache if path not in listed and os.path.dirname(path) in directories]
+            for path in gone:
+                del self._cache[path]
+            if todo:
+                paths = [path for path, _, _ in todo]
+                for (path, size, mtime), result in zip(todo, self._scan_paths(paths)):
+                    self._cache[path] = [size, mtime] + list(result)
+            if todo or gone:
+                self._save_cache()
+
+            self.last_scan = {
+                'scannedAt': time.time(),
+                'scanMs': round((time.perf_counter() - started) * 1000, 1),
+                'filesScanned': len(todo),
+                'filesCached': sum(len(files) for _, _, _, files in dimensions) - len(todo),
+                'numpy': _numpy() is not None
+            }
+            return dimensions
+
+    def _scan_paths(self, paths):
+        if len(paths) < POOL_THRESHOLD or self.workers == 1:
+            return _scan_many(paths)
+        from concurrent.futures import ProcessPoolExecutor
+        batches = [paths[i:i + POOL_CHUNKSIZE] for i in range(0, len(paths), POOL_CHUNKSIZE)]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return [result for batch in pool.map(_scan_many, batches) for result in batch]
+
+    # Stats
+
+    def stats(self, worlds, refresh=False, heatmap=False, now=None):
+        dimensions = self.scan(worlds, refresh)
+        now = now or time.time()
+        prune_before = now - self.min_age_days * 86400
+        prune = []
+        out = []
+        for world, dimension, directory, files in dimensions:
+            summary = {
+                'world': world,
+                'dimension': dimension,
+                'regions': len(files),
+                'chunks': 0,
+                'sizeBytes': 0,
+                'usedBytes': 0,
+                'oldest': None,
+                'newest': None,
+                'pruneRegions': 0,
+                'pruneBytes': 0
+            }
+            activity = {}
+            cells = [] if heatmap else None
+            for path, x, z, size, _ in files:
+                cached = self._cache.get(path)
+                if cached is None:
+                    continue
+                _, _, chunks, used, oldest, newest, weeks = cached
+                summary['chunks'] += chunks
+                summary['sizeBytes'] += size
+                summary['usedBytes'] += used
+                for week, count in weeks.items():
+                    activity[int(week)] = activity.get(int(week), 0) + count
+                if oldest is not None:
+                    if summary['oldest'] is None or oldest < summary['oldest']:
+                        summary['oldest'] = oldest
+                    if summary['newest'] is None or newest > summary['newest']:
+                        summary['newest'] = newest
+                    if newest < prune_before and newest - oldest <= self.revisit_window:
+                        summary['pruneRegions'] += 1
+                        summary['pruneBytes'] += size
+                        prune.append({'world': world, 'dimension': dimension, 'x': x, 'z': z,
+                                      'file': os.path.basename(path), 'chunks': chunks,
+                                      'sizeBytes': size, 'newest': newest})
+                if cells is not None:
+                    cells.append([x, z, chunks, newest])
+            # Chunks by the week they were last saved
+            summary['activity'] = [[week * WEEK, count] for week, count in sorted(activity.items())]
+            if cells is not None:
+                summary['heatmap'] = cells
+            out.append(summary)
+
+        prune.sort(key=lambda region: region['sizeBytes'], reverse=True)
+        return dict(self.last_scan, success=True, totals={
+            'regions': sum(d['regions'] for d in out),
+            'chunks': sum(d['chunks'] for d in out),
+            'sizeBytes': sum(d['sizeBytes'] for d in out),
+            'usedBytes': sum(d['usedBytes'] for d in out)
+        }, dimensions=out, prune={
+            'minAgeDays': self.min_age_days,
+            'revisitWindowSeconds': self.revisit_window,
+            'regions': len(prune),
+            'sizeBytes': sum(region['sizeBytes'] for region in prune),
+            'largest': prune[:PRUNE_LIMIT]
+        })
+
+    # Cache
+
+    def _load_cache(self):
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        if self.cache_path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f'{self.cache_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f, separators=(',', ':'))
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f'Error saving region cache: {e}')
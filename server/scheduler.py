@@ -0,0 +1,407 @@
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ACTIONS = ('restart', 'stop', 'start', 'command', 'broadcast', 'backup')
+SCHEDULE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+CRON_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+# minute, hour, day of month, month, day of week (0 and 7 are Sunday)
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+# Far enough to cover every leap day; further than this a cron expression never matches
+CRON_SEARCH_DAYS = 4 * 366
+MIN_INTERVAL = 1
+VERBS = {'restart': 'restarting', 'stop': 'stopping', 'start': 'starting', 'backup': 'backing up'}
+
+
+class ScheduleError(Exception):
+    pass
+
+
+class CronExpr:
+    """Five-field cron expression with *, lists, ranges and steps, in local time"""
+
+    def __init__(self, text):
+        self.text = text.strip()
+        fields = CRON_ALIASES.get(self.text, self.text).split()
+        if len(fields) != 5:
+            raise ScheduleError('Cron expression needs 5 fields: minute hour day month weekday')
+        sets = [self._parse(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = sets
+        # cron counts from Sunday, datetime.weekday() from Monday
+        self.weekdays = frozenset((day - 1) % 7 for day in weekdays)
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, _, step_text = part.partition('/')
+                if not step_text.isdigit() or int(step_text) == 0:
+                    raise ScheduleError(f'Bad cron step: {field}')
+                step = int(step_text)
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start_text, _, end_text = part.partition('-')
+                if not start_text.isdigit() or not end_text.isdigit():
+                    raise ScheduleError(f'Bad cron range: {field}')
+                start, end = int(start_text), int(end_text)
+            elif part.isdigit():
+                start = int(part)
+                end = high if step > 1 else start
+            else:
+                raise ScheduleError(f'Bad cron field: {field}')
+            if not low <= start <= end <= high:
+                raise ScheduleError(f'Cron field out of range {low}-{high}: {field}')
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, day):
+        in_month = day.day in self.days
+        in_week = day.weekday() in self.weekdays
+        # When both are restricted cron runs on either
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, timestamp):
+        """First matching minute strictly after `timestamp`, as a timestamp"""
+        moment = datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=CRON_SEARCH_DAYS)
+        while moment < limit:
+            if moment.month not in self.months:
+                year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ScheduleError(f'Cron expression never matches: {self.text}')
+
+
+def format_delay(seconds):
+    """60 -> '1m', 90 -> '1m 30s', 3600 -> '1h'"""
+    seconds = int(round(seconds))
+    parts = []
+    for unit, size in (('h', 3600), ('m', 60), ('s', 1)):
+        if seconds >= size:
+            parts.append(f'{seconds // size}{unit}')
+            seconds %= size
+    return ' '.join(parts) or '0s'
+
+
+class Schedule:
+    """A trigger (cron or every N seconds) and the action it runs"""
+
+    __slots__ = ('id', 'name', 'enabled', 'cron', 'every', 'action', 'commands', 'message', 'countdown',
+                 'created', 'next_run', 'last_run', 'last_result', 'runs', 'generation')
+
+    def __init__(self, schedule_id, created):
+        self.id = schedule_id
+        self.name = schedule_id
+        self.enabled = True
+        self.cron = None
+        self.every = None
+        self.action = 'command'
+        self.commands = []
+        self.message = None
+        self.countdown = []
+        self.created = created
+        self.next_run = None
+        self.last_run = None
+        self.last_result = None
+        self.runs = 0
+        self.generation = 0
+
+    def apply(self, data):
+        """Validate and copy fields from an API or saved dict, ScheduleError when invalid"""
+        if 'name' in data:
+            self.name = str(data['name'] or self.id)[:64]
+        if 'enabled' in data:
+            self.enabled = bool(data['enabled'])
+        if 'cron' in data or 'every' in data:
+            cron, every = data.get('cron'), data.get('every')
+            if bool(cron) == bool(every):
+                raise ScheduleError('Give either cron or every')
+            if cron:
+                self.cron, self.every = CronExpr(str(cron)), None
+            else:
+                try:
+                    every = float(every)
+                except (TypeError, ValueError):
+                    raise ScheduleError('every must be a number of seconds')
+                if every < MIN_INTERVAL:
+                    raise ScheduleError(f'every must be at least {MIN_INTERVAL} second')
+                self.cron, self.every = None, every
+        if 'action' in data:
+            if data['action'] not in ACTIONS:
+                raise ScheduleError(f'Unknown action, use one of: {", ".join(ACTIONS)}')
+            self.action = data['action']
+        if 'commands' in data:
+            commands = data['commands'] or []
+            if isinstance(commands, str):
+                commands = [commands]
+            commands = [str(command).strip() for command in commands]
+            if not all(commands) or any('\n' in command or '\r' in command for command in commands):
+                raise ScheduleError('Commands must be single non-empty lines')
+            self.commands = commands
+        if 'message' in data:
+            self.message = str(data['message']).strip() if data['message'] else None
+        if 'countdown' in data:
+            try:
+                countdown = sorted({int(seconds) for seconds in data['countdown'] or []}, reverse=True)
+            except (TypeError, ValueError):
+                raise ScheduleError('countdown must be a list of seconds')
+            if any(seconds <= 0 for seconds in countdown):
+                raise ScheduleError('countdown values must be positive')
+            self.countdown = countdown
+        if self.cron is None and self.every is None:
+            raise ScheduleError('A cron or every trigger is required')
+        if self.action == 'command' and not self.commands:
+            raise ScheduleError('The command action needs commands')
+        if self.action == 'broadcast' and not self.message:
+            raise ScheduleError('The broadcast action needs a message')
+
+    def next_after(self, timestamp):
+        if self.cron is not None:
+            return self.cron.next_after(timestamp)
+        # Interval runs stay in phase with when the schedule was created
+        periods = int((timestamp - self.created) // self.every) + 1
+        return self.created + periods * self.every
+
+    def warning(self, seconds):
+        if self.action == 'broadcast':
+            return f'{self.message} in {format_delay(seconds)}'
+        verb = VERBS.get(self.action, f'running {self.name}')
+        return f'Server {verb} in {format_delay(seconds)}'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'enabled': self.enabled,
+            'cron': self.cron.text if self.cron is not None else None,
+            'every': self.every,
+            'action': self.action,
+            'commands': self.commands,
+            'message': self.message,
+            'countdown': self.countdown,
+            'created': self.created,
+            'nextRun': self.next_run if self.enabled else None,
+            'lastRun': self.last_run,
+            'lastResult': self.last_result,
+            'runs': self.runs
+        }
+
+
+class Scheduler:
+    """Runs schedules from a heap of due times on a single thread
+
+    Each enabled schedule has its next run, and one countdown warning per
+    `countdown` offset before it, in the heap. Editing or removing a
+    schedule bumps its generation so its old heap entries are skipped when
+    popped. `execute(schedule)` runs the action and returns a result dict;
+    `announce(schedule, text)` delivers a countdown warning. Both are
+    called on the scheduler thread, one schedule at a time.
+
+    `clock` returns wall time (cron is in local time). Without `start()`
+    nothing runs by itself: move a fake clock and call `tick()` to run
+    whatever is due. Runs missed while the dashboard was down are skipped.
+    """
+
+    def __init__(self, execute, announce=None, path=None, on_run=None, clock=time.time):
+        self.execute = execute
+        self.announce = announce or (lambda schedule, text: None)
+        self.path = path
+        self.on_run = on_run
+        self.clock = clock
+        self.schedules = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pushed = False
+        self._thread = None
+
+    # Schedules
+
+    def add(self, data):
+        schedule_id = data.get('id') or uuid.uuid4().hex[:8]
+        if not SCHEDULE_ID_RE.match(str(schedule_id)):
+            raise ScheduleError('Schedule id must be 1-32 letters, digits, "-" or "_"')
+        schedule = Schedule(schedule_id, data.get('created') or self.clock())
+        schedule.apply(data)
+        with self._cond:
+            if schedule_id in self.schedules:
+                raise ScheduleError(f'Schedule already exists: {schedule_id}')
+            self._plan(schedule, self.clock())
+            self.schedules[schedule_id] = schedule
+        return schedule
+
+    def update(self, schedule_id, data):
+        """Change a schedule, KeyError when it does not exist"""
+        with self._cond:
+            schedule = self.schedules[schedule_id]
+            previous = schedule.to_dict()
+            try:
+                schedule.apply(data)
+                self._plan(schedule, self.clock())
+            except ScheduleError:
+                schedule.apply(previous)
+                self._plan(schedule, self.clock())
+                raise
+        return schedule
+
+    def remove(self, schedule_id):
+        with self._cond:
+            schedule = self.schedules.pop(schedule_id)
+            schedule.generation += 1
+
+    def run_now(self, schedule_id):
+        """Run a schedule on the scheduler thread without its countdown"""
+        with self._cond:
+            schedule = self.schedules[schedule_id]
+            self._push(self.clock(), schedule, 0, manual=True)
+
+    def list(self):
+        with self._cond:
+            schedules = sorted(self.schedules.values(), key=lambda s: (s.next_run is None, s.next_run or 0))
+            return [schedule.to_dict() for schedule in schedules]
+
+    def get(self, schedule_id):
+        schedule = self.schedules.get(schedule_id)
+        return schedule.to_dict() if schedule is not None else None
+
+    # Timer heap
+
+    def _push(self, due, schedule, offset, manual=False):
+        heapq.heappush(self._heap, (due, next(self._seq), schedule, schedule.generation, offset, manual))
+        self._pushed = True
+        self._cond.notify()
+
+    def _plan(self, schedule, now):
+        schedule.generation += 1
+        if not schedule.enabled:
+            schedule.next_run = None
+            return
+        schedule.next_run = schedule.next_after(now)
+        for seconds in schedule.countdown:
+            if schedule.next_run - seconds > now:
+                self._push(schedule.next_run - seconds, schedule, seconds)
+        self._push(schedule.next_run, schedule, 0)
+
+    def tick(self):
+        """Run everything due; seconds until the next entry, None when there is none"""
+        while True:
+            with self._cond:
+                now = self.clock()
+                while self._heap and self._heap[0][3] != self._heap[0][2].generation:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    return None
+                if self._heap[0][0] > now:
+                    return self._heap[0][0] - now
+                due, _, schedule, _, offset, manual = heapq.heappop(self._heap)
+                if offset == 0 and not manual:
+                    # Plan the next run before this one, which may take a while
+                    self._plan(schedule, max(now, due))
+            if offset:
+                self._announce(schedule, offset)
+            else:
+                self._run(schedule)
+
+    def _announce(self, schedule, seconds):
+        try:
+            self.announce(schedule, schedule.warning(seconds))
+        except Exception as e:
+            print(f'Error announcing schedule {schedule.id}: {e}')
+
+    def _run(self, schedule):
+        started = self.clock()
+        try:
+            result = self.execute(schedule)
+        except Exception as e:
+            result = {'success': False, 'message': str(e)}
+        schedule.runs += 1
+        schedule.last_run = started
+        schedule.last_result = {'success': bool(result.get('success')), 'message': result.get('message')}
+        self.save()
+        if self.on_run is not None:
+            try:
+                self.on_run(schedule.to_dict())
+            except Exception as e:
+                print(f'Error in schedule run handler: {e}')
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                delay = self.tick()
+            except Exception as e:
+                print(f'Error in scheduler: {e}')
+                delay = 1
+            with self._cond:
+                # Woken early by _push, which may have added a sooner entry since tick() looked
+                if not self._pushed:
+                    self._cond.wait(delay)
+                self._pushed = False
+
+    # Persistence
+
+    def load(self):
+        """Add the schedules saved at path"""
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for item in saved:
+            try:
+                schedule = self.add(item)
+            except ScheduleError as e:
+                print(f'Skipping saved schedule {item.get("id")}: {e}')
+                continue
+            schedule.last_run = item.get('lastRun')
+            schedule.last_result = item.get('lastResult')
+            schedule.runs = item.get('runs', 0)
+
+    def save(self):
+        """Persist every schedule to path"""
+        if self.path is None:
+            return
+        with self._cond:
+            saved = [schedule.to_dict() for schedule in self.schedules.values()]
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(saved, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f'Error saving schedules: {e}')
@@ -0,0 +1,262 @@
+import json
+import os
+import re
+import time
+from collections import deque
+
+# [12:00:01 INFO]: Done (12.345s)! For help, type "help"
+DONE_RE = re.compile(rb'Done \((\d+(?:\.\d+)?)s\)! For help')
+VERSION_RE = re.compile(rb'Starting minecraft server version (\S+)')
+ENABLING_RE = re.compile(rb'\] Enabling (\S+) v(\S+)')
+# Lines that end the plugin enabling just before them
+PHASE_MARKS = (b'Preparing level "', b'Preparing start region', b'Running delayed init tasks')
+LEVEL_MARK, _, DELAYED_INIT_MARK = PHASE_MARKS
+# Console commands that stop the server on purpose
+STOP_COMMANDS = ('stop', 'restart', 'end')
+# Tail of the boot log read back into history on startup
+BOOT_TAIL_BYTES = 512 * 1024
+
+
+class BootTimer:
+    """Times the startup phases of one boot from its console lines
+
+    `feed(line)` returns True on Paper's `Done (Xs)! For help` line. Phases
+    are measured from the process spawn: `jvm` until the first line,
+    `bootstrap` until the first plugin is enabled or the world starts
+    loading, `worldLoad` from `Preparing level` until the next plugin,
+    delayed init tasks or Done, and `pluginEnable` summed over plugins. A plugin's enable time
+    runs from its `Enabling` line to the next plugin or phase line.
+    """
+
+    def __init__(self, started, clock=time.monotonic):
+        self.started = started
+        self.clock = clock
+        self.wall_started = time.time() - (clock() - started)
+        self.first_line = None
+        self.level = None
+        self.world_loaded = None
+        self.bootstrapped = None
+        self.done = None
+        self.reported = None
+        self.version = None
+        self.plugins = []
+        self._enabling = None
+
+    def feed(self, line):
+        now = self.clock()
+        if self.first_line is None:
+            self.first_line = now
+        if b'Enabling ' in line:
+            match = ENABLING_RE.search(line)
+            if match:
+                self._end_plugin(now)
+                self._end_world(now)
+                self._enabling = (match.group(1).decode('utf-8', errors='replace'),
+                                  match.group(2).decode('utf-8', errors='replace'), now)
+                return False
+        if b'Done (' in line:
+            match = DONE_RE.search(line)
+            if match:
+                self._end_plugin(now)
+                self._end_world(now)
+                self.done = now
+                self.reported = float(match.group(1))
+                return True
+        if any(mark in line for mark in PHASE_MARKS):
+            self._end_plugin(now)
+            if self.level is None and LEVEL_MARK in line:
+                self.level = now
+            elif DELAYED_INIT_MARK in line:
+                self._end_world(now)
+        elif self.version is None and b'Starting minecraft server' in line:
+            match = VERSION_RE.search(line)
+            if match:
+                self.version = match.group(1).decode('utf-8', errors='replace')
+        return False
+
+    def _end_plugin(self, now):
+        if self._enabling is not None:
+            name, version, started = self._enabling
+            self.plugins.append({'name': name, 'version': version, 'enableMs': _ms(now - started)})
+            self._enabling = None
+        elif self.bootstrapped is None and self.level is None:
+            self.bootstrapped = now
+
+    def _end_world(self, now):
+        if self.level is not None and self.world_loaded is None:
+            self.world_loaded = now
+
+    def to_dict(self):
+        first_line = self.first_line or self.done
+        return {
+            'ts': self.wall_started,
+            'version': self.version,
+            'totalMs': _ms(self.done - self.started) if self.done else None,
+            'reportedMs': _ms(self.reported) if self.reported is not None else None,
+            'phases': {
+                'jvm': _ms(first_line - self.started) if first_line else None,
+                'bootstrap': _ms((self.bootstrapped or self.done) - first_line) if first_line else None,
+                'worldLoad': _ms(self.world_loaded - self.level) if self.level and self.world_loaded else None,
+                'pluginEnable': round(sum(plugin['enableMs'] for plugin in self.plugins), 1)
+            },
+            'plugins': sorted(self.plugins, key=lambda plugin: plugin['enableMs'], reverse=True)
+        }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+class RestartPolicy:
+    """Exponential backoff for unexpected exits, giving up on a crash loop
+
+    `crashed()` returns the delay before restarting, or None when
+    `loop_count` crashes fell within `loop_window` seconds. The backoff
+    doubles from `base` up to `maximum` and starts over once a boot has
+    stayed up for `healthy` seconds. A manual start clears a crash loop.
+    """
+
+    def __init__(self, base=5, maximum=300, loop_count=5, loop_window=600, healthy=300, clock=time.monotonic):
+        self.base = base
+        self.maximum = maximum
+        self.loop_count = loop_count
+        self.loop_window = loop_window
+        self.healthy = healthy
+        self.clock = clock
+        self.state = 'idle'
+        self.attempts = 0
+        self.crashes_total = 0
+        self.generation = 0
+        self.restart_at = None
+        self.ready_at = None
+        self.last_exit_code = None
+        self._crashes = deque()
+
+    def crashed(self, exit_code):
+        now = self.clock()
+        self.crashes_total += 1
+        self.last_exit_code = exit_code
+        if self.ready_at is not None and now - self.ready_at >= self.healthy:
+            self.attempts = 0
+        self.ready_at = None
+        self._crashes.append(now)
+        while self._crashes and now - self._crashes[0] > self.loop_window:
+            self._crashes.popleft()
+        self.generation += 1
+        if len(self._crashes) >= self.loop_count:
+            self.state = 'crash-loop'
+            self.restart_at = None
+            return None
+        delay = min(self.base * 2 ** self.attempts, self.maximum)
+        self.attempts += 1
+        self.state = 'backoff'
+        self.restart_at = now + delay
+        return delay
+
+    def started(self, automatic=False):
+        """Any start cancels a pending restart; a manual one also forgives past crashes"""
+        if not automatic and self.state == 'crash-loop':
+            self._crashes.clear()
+            self.attempts = 0
+        self.state = 'idle'
+        self.restart_at = None
+        self.generation += 1
+
+    def cancel(self):
+        """Drop a pending restart, True when there was one"""
+        if self.state != 'backoff':
+            return False
+        self.started()
+        return True
+
+    def ready(self):
+        self.ready_at = self.clock()
+
+    def to_dict(self):
+        return {
+            'state': self.state,
+            'attempts': self.attempts,
+            'recentCrashes': len(self._crashes),
+            'crashesTotal': self.crashes_total,
+            'lastExitCode': self.last_exit_code,
+            'restartIn': round(max(0, self.restart_at - self.clock()), 1) if self.restart_at is not None else None
+        }
+
+
+class BootLog:
+    """Boot timings per instance, appended as JSON lines to `path`"""
+
+    def __init__(self, path=None, history=50):
+        self.path = path
+        self.history_size = history
+        self._boots = {}
+        self._file = None
+        self._load()
+
+    def record(self, instance_id, boot):
+        boot = dict(boot, instance=instance_id)
+        self._append(boot)
+        if self.path is None:
+            return
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(boot) + '\n')
+            self._file.flush()
+        except OSError as e:
+            print(f'Error writing boot log: {e}')
+
+    def _append(self, boot):
+        boots = self._boots.get(boot.get('instance'))
+        if boots is None:
+            boots = self._boots[boot.get('instance')] = deque(maxlen=self.history_size)
+        boots.append(boot)
+
+    def _load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(max(0, os.path.getsize(self.path) - BOOT_TAIL_BYTES))
+                lines = f.read().splitlines()
+        except OSError as e:
+            print(f'Error reading boot log: {e}')
+            return
+        for line in lines:
+            try:
+                self._append(json.loads(line))
+            except ValueError:
+                # The first line may be cut by the seek
+                continue
+
+    def history(self, instance_id, limit=20):
+        """Most recent boots of an instance, newest first"""
+        return list(self._boots.get(instance_id, ()))[::-1][:limit]
+
+    def compare(self, instance_id):
+        """What changed between the last two boots: total time and plugins by enable-time delta"""
+        boots = self._boots.get(instance_id)
+        if not boots or len(boots) < 2:
+            return None
+        previous, latest = boots[-2], boots[-1]
+        before = {plugin['name']: plugin for plugin in previous.get('plugins', ())}
+        plugins = []
+        for plugin in latest.get('plugins', ()):
+            old = before.get(plugin['name'])
+            plugins.append({
+                'name': plugin['name'],
+                'version': plugin['version'],
+                'previousVersion': old['version'] if old else None,
+                'enableMs': plugin['enableMs'],
+                'deltaMs': round(plugin['enableMs'] - (old['enableMs'] if old else 0), 1)
+            })
+        plugins.sort(key=lambda plugin: plugin['deltaMs'], reverse=True)
+        total = latest.get('totalMs'), previous.get('totalMs')
+        return {
+            'totalMs': total[0],
+            'previousTotalMs': total[1],
+            'deltaMs': round(total[0] - total[1], 1) if None not in total else None,
+            'versionChanged': latest.get('version') != previous.get('version'),
+            'plugins': plugins
+        }
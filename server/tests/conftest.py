@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Tests import the server modules the way app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
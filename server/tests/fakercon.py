@@ -0,0 +1,85 @@
+"""A local RCON server that reads requests the way Paper's RconClient does
+
+Each request is taken from a single recv of at most 1460 bytes and must be
+exactly one packet, otherwise the connection is dropped, as Paper does.
+Replies are split into 4096 character packets. `handler(command)` returns
+the reply text.
+"""
+import socket
+import struct
+import threading
+
+from rcon import MAX_REPLY_CHARS, MAX_REQUEST, SERVERDATA_AUTH, SERVERDATA_AUTH_RESPONSE, encode_packet
+
+
+class FakeRcon:
+    def __init__(self, password='secret', handler=None):
+        self.password = password
+        self.handler = handler or (lambda command: f'ran {command}')
+        self.commands = []
+        self.connections = 0
+        self.dropped = 0
+        self._clients = []
+        self._listener = socket.create_server(('127.0.0.1', 0))
+        self.port = self._listener.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            self._clients.append(sock)
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock):
+        authed = False
+        try:
+            while True:
+                data = sock.recv(MAX_REQUEST)
+                if len(data) < 4:
+                    break
+                (length,) = struct.unpack('<i', data[:4])
+                if length != len(data) - 4:
+                    self.dropped += 1
+                    break
+                request_id, packet_type = struct.unpack('<ii', data[4:12])
+                body = data[12:-2].decode('utf-8')
+                if packet_type == SERVERDATA_AUTH:
+                    authed = body == self.password
+                    sock.sendall(encode_packet(request_id if authed else -1, SERVERDATA_AUTH_RESPONSE, ''))
+                elif authed and packet_type == 2:
+                    self.commands.append(body)
+                    reply = self.handler(body)
+                    while True:
+                        sock.sendall(encode_packet(request_id, 0, reply[:MAX_REPLY_CHARS]))
+                        reply = reply[MAX_REPLY_CHARS:]
+                        if not reply:
+                            break
+                else:
+                    break
+        except OSError:
+            pass
+        finally:
+            sock.close()
+
+    def drop_clients(self):
+        """Close every open connection, as a server restart would"""
+        for sock in self._clients:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        self._clients = []
+
+    def close(self):
+        # shutdown() wakes the blocked accept(), close() alone would leave the port listening
+        try:
+            self._listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._listener.close()
+        self.drop_clients()
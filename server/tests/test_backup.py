@@ -0,0 +1,132 @@
+import os
+
+import pytest
+
+import backup
+from backup import BackupEngine, BackupError
+
+
+@pytest.fixture
+def world(tmp_path, monkeypatch):
+    # Small chunks so a few KiB of test data spans several of them
+    monkeypatch.setattr(backup, 'REGION_CHUNK', 1024)
+    monkeypatch.setattr(backup, 'FILE_CHUNK', 1024)
+    root = tmp_path / 'server'
+    files = {
+        'world/level.dat': b'level' * 100,
+        'world/region/r.0.0.mca': bytes(range(256)) * 16,
+        'world/region/r.0.1.mca': b'\x01' * 3000,
+        'world/data/raids.dat': b'raids',
+    }
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    engine = BackupEngine(str(root), str(tmp_path / 'store'), workers=1)
+    engine.root_path = root
+    return engine
+
+
+def snapshot(root):
+    """rel path -> (bytes, mtime_ns) of every file under root"""
+    found = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, root).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                found[rel] = (f.read(), os.stat(path).st_mtime_ns)
+    return found
+
+
+def chunk_files(engine):
+    return {name for _, _, names in os.walk(engine.chunks_dir) for name in names}
+
+
+def test_second_backup_reuses_unchanged_files(world):
+    first = world.backup('one', ['world'])
+    assert first['stats']['files'] == 4 and first['stats']['reusedFiles'] == 0
+    stored = chunk_files(world)
+
+    # One 1 KiB chunk of one region file changes
+    region = world.root_path / 'world/region/r.0.0.mca'
+    data = bytearray(region.read_bytes())
+    data[1500] ^= 0xff
+    region.write_bytes(bytes(data))
+    os.utime(region, ns=(1, 1))
+
+    second = world.backup('two', ['world'])
+    assert second['stats']['reusedFiles'] == 3
+    assert second['stats']['newChunks'] == 1
+    assert len(chunk_files(world) - stored) == 1
+
+
+def test_restore_brings_back_files_and_mtimes(world):
+    root = world.root_path
+    os.utime(root / 'world/level.dat', ns=(10 ** 18, 10 ** 18))
+    world.backup('one', ['world'])
+    before = snapshot(root)
+
+    (root / 'world/level.dat').write_bytes(b'changed')
+    (root / 'world/region/r.0.1.mca').unlink()
+    (root / 'world/region/r.9.9.mca').write_bytes(b'new region')
+    (root / 'world/DIM-1/region').mkdir(parents=True)
+    (root / 'world/DIM-1/region/r.0.0.mca').write_bytes(b'new dimension')
+    (root / 'world/session.lock').write_bytes(b'lock')
+
+    world.restore('one')
+    after = snapshot(root)
+    assert after.pop('world/session.lock')[0] == b'lock'
+    assert after == before
+    # Folders created after the backup are gone with their files
+    assert not (root / 'world/DIM-1').exists()
+    assert (root / 'world/region').is_dir()
+
+
+def test_delete_keeps_chunks_another_backup_uses(world):
+    world.backup('one', ['world'])
+    (world.root_path / 'world/data/extra.dat').write_bytes(b'only in two' * 200)
+    world.backup('two', ['world'])
+    both = chunk_files(world)
+
+    assert world.delete('one')['removedChunks'] == 0
+    assert chunk_files(world) == both
+    world.restore('two')
+
+    removed = world.delete('two')['removedChunks']
+    assert removed == len(both)
+    assert chunk_files(world) == set()
+    assert world.list() == []
+
+
+def test_list_reads_only_summaries(world, monkeypatch):
+    world.backup('one', ['world'])
+    monkeypatch.setattr(world, 'get', lambda backup_id: pytest.fail('full manifest read'))
+    backups = world.list()
+    assert [b['id'] for b in backups] == ['one']
+    assert backups[0]['fileCount'] == 4 and 'files' not in backups[0]
+
+
+def test_old_manifest_gets_a_summary(world):
+    world.backup('one', ['world'])
+    os.remove(world._summary_path('one'))
+    assert world.list()[0]['fileCount'] == 4
+    assert os.path.exists(world._summary_path('one'))
+
+
+def test_delete_waits_for_a_running_backup(world):
+    world.backup('one', ['world'])
+    world.current = 'two'
+    with pytest.raises(BackupError, match='in progress'):
+        world.delete('one')
+    world.current = None
+    world.delete('one')
+    with pytest.raises(BackupError, match='not found'):
+        world.delete('one')
+
+
+@pytest.mark.parametrize('backup_id', ['../x', '..', 'a/b', '.hidden', ''])
+def test_bad_backup_ids_are_rejected(world, backup_id):
+    for call in (world.get, world.delete, world.restore, world.start_restore):
+        with pytest.raises(BackupError):
+            call(backup_id)
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+from commands import CommandDispatcher, CommandError, CommandJob
+from rcon import RconError
+
+
+class FakeInstance:
+    status = 'running'
+
+    def __init__(self):
+        self.writes = []
+        self.written = threading.Event()
+        self.gate = None
+
+    def send_many(self, commands, quiet=False):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.writes.extend(commands)
+        self.written.set()
+        return {'success': True, 'message': 'Command executed'}
+
+    def note_commands(self, commands):
+        pass
+
+    def log(self, message):
+        pass
+
+
+class FakePool:
+    """Fails `fail` with RconError(sent=sent), runs everything else"""
+
+    def __init__(self, fail, sent):
+        self.fail = fail
+        self.sent = sent
+        self.commands = []
+
+    def command(self, command, timeout=None):
+        if command == self.fail:
+            raise RconError('RCON command timed out', sent=self.sent)
+        self.commands.append(command)
+        return f'ran {command}'
+
+
+def job(*commands):
+    return CommandJob(list(commands), 'test', quiet=True, capture=False, audit=True)
+
+
+def test_rcon_failure_fails_the_sent_job_and_falls_back_for_the_rest():
+    instance = FakeInstance()
+    pool = FakePool('boom', sent=True)
+    dispatcher = CommandDispatcher(lambda: instance, get_rcon=lambda: pool)
+    first, failed, unsent = job('say a'), job('save-all', 'boom'), job('say c')
+    dispatcher._execute([first, failed, unsent])
+
+    assert first.result['transport'] == 'rcon' and first.result['success']
+    assert failed.result['success'] is False
+    assert failed.result['output'] == ['ran save-all']
+    assert unsent.result['transport'] == 'stdin' and unsent.result['success']
+    assert instance.writes == ['say c']
+    assert pool.commands == ['say a', 'save-all']
+
+
+def test_job_rcon_never_sent_falls_back_whole():
+    instance = FakeInstance()
+    dispatcher = CommandDispatcher(lambda: instance, get_rcon=lambda: FakePool('boom', sent=False))
+    refused = job('boom', 'say b')
+    dispatcher._execute([refused])
+
+    assert refused.result['transport'] == 'stdin' and refused.result['success']
+    assert instance.writes == ['boom', 'say b']
+
+
+def test_unfinished_job_is_pending_not_successful():
+    instance = FakeInstance()
+    instance.gate = threading.Event()
+    dispatcher = CommandDispatcher(lambda: instance)
+    queued = dispatcher.submit('list', capture=False)
+
+    result = queued.wait(0.05)
+    assert result['success'] is False and result['pending'] is True
+    instance.gate.set()
+    result = queued.wait(5)
+    assert result['success'] is True and 'pending' not in result
+
+
+def test_capture_collects_lines_within_the_window():
+    instance = FakeInstance()
+    dispatcher = CommandDispatcher(lambda: instance, capture_window=0.1)
+    listed = dispatcher.submit('list')
+    assert instance.written.wait(5)
+    dispatcher.feed_line('[12:00:00 INFO]: There are 0 of a max of 20 players online')
+
+    result = listed.wait(5)
+    assert result['output'] == ['[12:00:00 INFO]: There are 0 of a max of 20 players online']
+    assert result['response'] == 'There are 0 of a max of 20 players online'
+    dispatcher.feed_line('[12:00:01 INFO]: late line')
+    assert listed.result['output'] == ['[12:00:00 INFO]: There are 0 of a max of 20 players online']
+
+
+def test_next_write_ends_the_capture_without_waiting_for_it():
+    instance = FakeInstance()
+    dispatcher = CommandDispatcher(lambda: instance, capture_window=30)
+    listed = dispatcher.submit('list')
+    assert instance.written.wait(5)
+    dispatcher.feed_line('[12:00:00 INFO]: There are 0 of a max of 20 players online')
+
+    started = time.monotonic()
+    said = dispatcher.submit('say hi', capture=False)
+    assert said.done.wait(5) and listed.done.wait(5)
+    assert time.monotonic() - started < 5
+    assert len(listed.result['output']) == 1
+    assert instance.writes == ['list', 'say hi']
+
+
+def test_close_runs_queued_jobs_then_stops_the_writer(tmp_path):
+    instance = FakeInstance()
+    instance.gate = threading.Event()
+    dispatcher = CommandDispatcher(lambda: instance, audit_path=str(tmp_path / 'commands.log'))
+    first = dispatcher.submit('say one', capture=False)
+    second = dispatcher.submit('say two', capture=False)
+    thread = dispatcher._thread
+    instance.gate.set()
+    dispatcher.close()
+
+    assert first.done.is_set() and second.done.is_set()
+    assert not thread.is_alive()
+    assert dispatcher._audit_file.closed
+    with pytest.raises(CommandError, match='closed'):
+        dispatcher.submit('say three')
+    assert len((tmp_path / 'commands.log').read_text().splitlines()) == 2
@@ -0,0 +1,144 @@
+import gzip
+import importlib
+import json
+import os
+
+import pytest
+
+from httpcache import VersionedJSON, etag_for, etag_matches, pick_encoding
+
+
+class Document:
+    """build() for VersionedJSON, counting how often it runs"""
+
+    def __init__(self, size=10):
+        self.size = size
+        self.calls = 0
+
+    def __call__(self, etag):
+        self.calls += 1
+        return {'version': etag, 'data': 'x' * self.size}
+
+
+def test_matching_if_none_match_is_304_without_a_build():
+    cache = VersionedJSON(min_size=1024)
+    build = Document()
+    status, body, headers = cache.respond(1, build)
+    assert status == 200 and json.loads(body)['version'] == headers['ETag']
+
+    status, body, again = cache.respond(1, build, if_none_match=headers['ETag'])
+    assert (status, body) == (304, b'')
+    assert again['ETag'] == headers['ETag']
+    assert build.calls == cache.builds == 1 and cache.hits == 1
+
+    # A new version is built again
+    status, _, changed = cache.respond(2, build, if_none_match=headers['ETag'])
+    assert status == 200 and changed['ETag'] != headers['ETag']
+    assert build.calls == 2
+
+
+@pytest.mark.parametrize('header', [
+    'W/"{}"', '"{}"', '"other", W/"{}"', 'W/"other",W/"{}" ', '*',
+])
+def test_weak_and_listed_tags_match(header):
+    etag = etag_for('v1')
+    assert etag.startswith('W/"')
+    assert etag_matches(header.format(etag[3:-1]), etag)
+
+
+def test_other_tags_do_not_match():
+    assert not etag_matches('W/"other", "another"', etag_for('v1'))
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('gzip', 'gzip'),
+    ('gzip, deflate', 'gzip'),
+    ('gzip;q=0', 'identity'),
+    ('gzip;q=0, *;q=1', 'identity'),
+    ('*', 'gzip'),
+    ('identity', 'identity'),
+    ('', 'identity'),
+    (None, 'identity'),
+])
+def test_pick_encoding(accept, expected, monkeypatch):
+    monkeypatch.setattr('httpcache.brotli', None)
+    assert pick_encoding(accept) == expected
+
+
+def test_small_bodies_are_not_compressed(monkeypatch):
+    monkeypatch.setattr('httpcache.brotli', None)
+    cache = VersionedJSON(min_size=1024)
+    status, body, headers = cache.respond(1, Document(10), accept_encoding='gzip')
+    assert 'Content-Encoding' not in headers
+    assert json.loads(body)['data'] == 'x' * 10
+
+    large = Document(4096)
+    status, body, headers = cache.respond(2, large, accept_encoding='gzip')
+    assert headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(body))['data'] == 'x' * 4096
+    # The identity body of the same version comes from the same build
+    _, body, headers = cache.respond(2, large, accept_encoding='gzip;q=0')
+    assert 'Content-Encoding' not in headers and len(body) > 4096
+    assert large.calls == 1
+
+
+# /api/snapshot
+
+
+@pytest.fixture(scope='module')
+def dashboard(tmp_path_factory):
+    pytest.importorskip('flask_socketio')
+    root = tmp_path_factory.mktemp('server')
+    (root / 'plugins').mkdir()
+    (root / 'server.properties').write_text('motd=A Minecraft Server\n')
+    # app reads its configuration once, when imported
+    saved = dict(os.environ)
+    os.environ.update(SERVER_PATH=str(root), DATA_PATH=str(root / 'data'))
+    try:
+        dashboard = importlib.import_module('app')
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+    dashboard.root = root
+    return dashboard
+
+
+def test_snapshot_revalidation_skips_the_build(dashboard):
+    client = dashboard.app.test_client()
+    first = client.get('/api/snapshot?logs=0')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    builds = dashboard.snapshot_cache.builds
+
+    again = client.get('/api/snapshot?logs=0', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b''
+    assert again.headers['ETag'] == etag
+    assert dashboard.snapshot_cache.builds == builds
+
+
+def test_every_part_of_the_snapshot_changes_its_version(dashboard, monkeypatch):
+    seen = [dashboard.snapshot_version(100)]
+
+    def changed():
+        version = dashboard.snapshot_version(100)
+        assert version not in seen
+        seen.append(version)
+
+    monkeypatch.setattr(dashboard.default_instance, 'status', 'running')
+    changed()
+    (dashboard.root / 'server.properties').write_text('motd=Another Minecraft Server\n')
+    changed()
+    (dashboard.root / 'plugins' / 'Foo.jar').write_bytes(b'PK')
+    changed()
+    dashboard.player_tracker.feed_line('[12:00:00 INFO]: Notch joined the game')
+    changed()
+    monkeypatch.setattr(dashboard.tps_sampler, 'latest', {'sampledAt': 1234.5, 'tps1m': 20.0})
+    changed()
+    dashboard.add_log('A dashboard message')
+    changed()
+
+    # Without console lines a new line leaves the version alone
+    quiet = dashboard.snapshot_version(0)
+    dashboard.add_log('Another dashboard message')
+    assert dashboard.snapshot_version(0) == quiet
+    assert etag_for(dashboard.snapshot_version(100)) != etag_for(seen[-1])
@@ -0,0 +1,135 @@
+import pytest
+
+from incidents import LAG_ID, IncidentDetector
+from logparse import LogParser
+from logstore import LogRing
+
+
+class Console:
+    """Feeds console lines through a ring and a parser into a detector with a fake clock and timers"""
+
+    def __init__(self, **kwargs):
+        self.now = 1000.0
+        self.timers = []
+        self.forwarded = []
+        self.ring = LogRing(10000)
+        self.parser = LogParser()
+        self.detector = IncidentDetector(
+            self.forwarded.extend,
+            call_later=lambda delay, callback: self.timers.append(callback),
+            clock=lambda: self.now,
+            **kwargs
+        )
+
+    def feed(self, *lines):
+        entries = []
+        for line in lines:
+            raw = line.encode()
+            entries.append(self.ring.append(raw, record=self.parser.parse(raw)))
+        self.detector.feed(entries)
+
+    def fire_timers(self):
+        timers, self.timers = self.timers, []
+        for callback in timers:
+            callback()
+
+    def exceptions(self):
+        return [incident for incident in self.detector.list(100) if incident['kind'] == 'exception']
+
+
+def trace(top='com.example.Foo.onMove', exception='java.lang.IllegalStateException', deep='com.example.Deep.run'):
+    """A 40 line trace: context line, exception, 37 frames and a '... more' line"""
+    frames = [top] + [f'com.example.Frame{i}.call' for i in range(1, 35)] + [deep, 'java.lang.Thread.run']
+    return (['[12:00:00 ERROR]: Could not pass event PlayerMoveEvent to Foo v1.0',
+             f'{exception}: bad state']
+            + [f'\tat {frame}(Foo.java:{i})' for i, frame in enumerate(frames, 1)]
+            + ['\t... 12 more'])
+
+
+def test_repeated_trace_is_one_incident():
+    console = Console(collapse=60)
+    lines = trace()
+    assert len(lines) == 40
+    for now in (1000.0, 1010.0, 1020.0):
+        console.now = now
+        console.feed(*lines, '[12:00:01 INFO]: Notch joined the game')
+
+    incidents = console.exceptions()
+    assert len(incidents) == 1
+    incident = incidents[0]
+    assert incident['count'] == 3
+    assert incident['firstSeen'] == 1000.0 and incident['lastSeen'] == 1020.0
+    assert incident['type'] == 'java.lang.IllegalStateException'
+    assert incident['message'] == 'bad state'
+    assert incident['frames'] == ['com.example.Foo.onMove'] + [f'com.example.Frame{i}.call' for i in range(1, 5)]
+    assert incident['context'] == 'Could not pass event PlayerMoveEvent to Foo v1.0'
+    assert incident['firstSeq'] == 1 and incident['lastSeq'] == 120 + 2
+    # Only the first trace reaches the stream, the repeats are counted
+    assert len(console.forwarded) == 40 + 3
+    assert incident['suppressedLines'] == 80
+    assert console.detector.exceptions == 3
+
+
+def test_repeat_after_the_collapse_window_is_shown_again():
+    console = Console(collapse=60)
+    console.feed(*trace(), '[12:00:01 INFO]: next')
+    console.now += 61
+    console.feed(*trace(), '[12:00:02 INFO]: next')
+    assert len(console.forwarded) == 2 * 41
+    assert console.exceptions()[0]['count'] == 2
+
+
+def test_top_frames_decide_the_fingerprint():
+    console = Console()
+    console.feed(*trace(), '[12:00:01 INFO]: next')
+    # A different frame below the top five is the same incident
+    console.feed(*trace(deep='com.example.Other.run'), '[12:00:01 INFO]: next')
+    assert len(console.exceptions()) == 1
+    # A different top frame or exception type is not
+    console.feed(*trace(top='com.example.Bar.onMove'), '[12:00:01 INFO]: next')
+    console.feed(*trace(exception='java.lang.NullPointerException'), '[12:00:01 INFO]: next')
+    assert sorted(incident['count'] for incident in console.exceptions()) == [1, 1, 2]
+
+
+def test_lru_evicts_the_least_recently_seen():
+    console = Console(capacity=2)
+    for top in ('a.A.one', 'b.B.two'):
+        console.feed(*trace(top=top), '[12:00:01 INFO]: next')
+    # Seeing the first again makes the second the oldest
+    console.feed(*trace(top='a.A.one'), '[12:00:01 INFO]: next')
+    console.feed(*trace(top='c.C.three'), '[12:00:01 INFO]: next')
+    assert sorted(incident['frames'][0] for incident in console.exceptions()) == ['a.A.one', 'c.C.three']
+    assert len(console.detector.incidents) == 2
+
+
+def test_short_trace_is_released_by_the_hold_timer():
+    console = Console()
+    console.feed('[12:00:00 ERROR]: Task failed', 'java.lang.RuntimeException: oops', '\tat x.Y.z(Y.java:1)')
+    assert console.forwarded == []
+    console.fire_timers()
+    assert len(console.forwarded) == 3
+    assert console.exceptions()[0]['frames'] == ['x.Y.z']
+
+
+def test_lag_warnings():
+    console = Console()
+    for ms in (2500, 6000, 1500):
+        console.now += 5
+        console.feed(f"[12:00:00 WARN]: Can't keep up! Is the server overloaded? Running {ms}ms or {ms // 50} ticks behind")
+    lag = console.detector.get(LAG_ID)
+    assert lag['count'] == 3
+    assert lag['msBehindTotal'] == 10000 and lag['maxMsBehind'] == 6000
+    assert lag['firstSeen'] == 1005.0 and lag['lastSeen'] == 1015.0
+    # Lag lines are never held back
+    assert len(console.forwarded) == 3
+
+
+@pytest.mark.parametrize('line', [
+    '[12:00:00 INFO]: <Notch> java.lang.Exception: not a trace',
+    '[12:00:00 INFO]: Notch lost connection: Disconnected',
+])
+def test_plain_lines_pass_straight_through(line):
+    console = Console()
+    console.feed(line)
+    assert len(console.forwarded) == 1
+    assert console.exceptions() == []
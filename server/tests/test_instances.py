@@ -0,0 +1,59 @@
+import time
+
+from instances import InstanceManager
+from supervisor import RestartPolicy
+
+
+class ExitedProcess:
+    pid = 4242
+    returncode = 1
+
+
+def manager_with(guard):
+    messages = []
+    manager = InstanceManager(
+        lambda: 'java',
+        on_entries=lambda instance, entries: messages.extend(entry.format() for entry in entries),
+        restart_policy=lambda: RestartPolicy(base=0.01),
+        start_guard=guard
+    )
+    manager.messages = messages
+    return manager
+
+
+def exit_while_running(instance):
+    process = ExitedProcess()
+    instance.status = 'running'
+    instance.process = process
+    instance._exited(process)
+
+
+def test_guard_refuses_a_start():
+    manager = manager_with(lambda instance: 'A backup is being restored')
+    instance = manager.add('lobby', '/nonexistent', 'paper.jar')
+    assert instance.start() == {'success': False, 'message': 'A backup is being restored'}
+    assert instance.status == 'stopped'
+
+
+def test_guard_cancels_an_automatic_restart():
+    manager = manager_with(lambda instance: 'A backup is being restored')
+    instance = manager.add('lobby', '/nonexistent', 'paper.jar')
+    exit_while_running(instance)
+    assert instance.policy.state == 'backoff'
+
+    deadline = time.monotonic() + 5
+    while instance.policy.state == 'backoff' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert instance.policy.state == 'idle'
+    assert instance.status == 'stopped'
+    assert any('Automatic restart cancelled: A backup is being restored' in line for line in manager.messages)
+
+
+def test_guard_refuses_the_start_of_a_restart():
+    manager = manager_with(lambda instance: 'A backup is being restored')
+    instance = manager.add('lobby', '/nonexistent', 'paper.jar')
+    instance._restart = True
+    exit_while_running(instance)
+    assert instance.status == 'stopped'
+    assert instance.policy.state == 'idle'
+    assert any('Not restarting: A backup is being restored' in line for line in manager.messages)
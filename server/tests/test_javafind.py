@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+import javafind
+from javafind import JavaFinder
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason='fake Java binaries are shell scripts')
+
+
+@pytest.fixture
+def jvms(tmp_path, monkeypatch):
+    """Fake Java installs under tmp_path, with PATH, JAVA_HOME and the JVM directories emptied"""
+    monkeypatch.setattr(javafind, 'JVM_DIRS', [str(tmp_path / 'jvm' / '*')])
+    monkeypatch.setattr(javafind, 'EXTRA_BINARIES', [])
+    monkeypatch.setenv('PATH', '')
+    monkeypatch.delenv('JAVA_HOME', raising=False)
+
+    def install(name, version, working=True):
+        bin_dir = tmp_path / 'jvm' / name / 'bin'
+        bin_dir.mkdir(parents=True)
+        java = bin_dir / 'java'
+        if working:
+            java.write_text(f'#!/bin/sh\necho \'openjdk version "{version}"\' >&2\necho \'OpenJDK Runtime Environment (build {version})\' >&2\n')
+        else:
+            java.write_text('#!/bin/sh\nexit 1\n')
+        java.chmod(0o755)
+        return str(bin_dir)
+    return install
+
+
+def alternatives(tmp_path, monkeypatch, target_bin):
+    """A /usr/bin/java style symlink on PATH, as update-alternatives makes"""
+    link_dir = tmp_path / 'usr-bin'
+    link_dir.mkdir()
+    os.symlink(os.path.join(target_bin, 'java'), link_dir / 'java')
+    monkeypatch.setenv('PATH', str(link_dir))
+    return str(link_dir / 'java')
+
+
+def test_path_java_wins_over_java_home_and_newest(jvms, tmp_path, monkeypatch):
+    jdk17 = jvms('jdk-17', '17.0.9')
+    jvms('jdk-21', '21.0.2')
+    monkeypatch.setenv('JAVA_HOME', str(tmp_path / 'jvm' / 'jdk-21'))
+    link = alternatives(tmp_path, monkeypatch, jdk17)
+    assert JavaFinder('java').find() == link
+
+
+def test_java_home_then_newest_without_path_java(jvms, tmp_path, monkeypatch):
+    jvms('jdk-17', '17.0.9')
+    jdk21 = jvms('jdk-21', '21.0.2')
+    jdk11 = jvms('jdk-11', '11.0.21')
+    assert JavaFinder('java').find() == os.path.join(jdk21, 'java')
+    monkeypatch.setenv('JAVA_HOME', os.path.dirname(jdk11))
+    assert JavaFinder('java').find() == os.path.join(jdk11, 'java')
+
+
+def test_broken_path_java_is_skipped(jvms, tmp_path, monkeypatch):
+    broken = jvms('broken', None, working=False)
+    jdk21 = jvms('jdk-21', '21.0.2')
+    alternatives(tmp_path, monkeypatch, broken)
+    assert JavaFinder('java').find() == os.path.join(jdk21, 'java')
+
+
+def test_absolute_preferred_is_used_as_is(jvms):
+    jdk17 = jvms('jdk-17', '17.0.9')
+    jvms('jdk-21', '21.0.2')
+    preferred = os.path.join(jdk17, 'java')
+    assert JavaFinder(preferred).find() == preferred
+
+
+@pytest.mark.parametrize('version, major', [('1.8.0_51', 8), ('21.0.2', 21), ('17-ea', 17), ('x', None)])
+def test_major_version(version, major):
+    assert javafind.major_version(version) == major
@@ -0,0 +1,122 @@
+import gzip
+import os
+
+import pytest
+
+import logsearch
+from logsearch import LogIndexer
+from logtail import LogTail
+
+
+@pytest.fixture
+def logs(tmp_path, monkeypatch):
+    monkeypatch.setattr(logsearch, 'BLOCK_LINES', 4)
+    logs_dir = tmp_path / 'logs'
+    logs_dir.mkdir()
+    indexer = LogIndexer(str(logs_dir), str(tmp_path / 'data' / 'logs.db'))
+    indexer.setup()
+    indexer.logs_dir_path = logs_dir
+    return indexer
+
+
+def search(indexer, query, **kwargs):
+    items = list(indexer.search(query, **kwargs))
+    return [item for item in items[:-1]], items[-1]['nextCursor']
+
+
+def block_count(indexer, name):
+    conn = indexer._connect()
+    try:
+        return conn.execute('SELECT blocks FROM files WHERE name = ?', (name,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_rotated_gz_is_indexed(logs):
+    with gzip.open(logs.logs_dir_path / '2026-04-01-1.log.gz', 'wb') as f:
+        f.write(b'[12:00:00] [Server thread/INFO]: Notch joined the game\n'
+                b'[12:00:05] [Server thread/ERROR]: java.lang.NullPointerException: boom\n')
+    logs.scan()
+    found, _ = search(logs, 'NullPointerException')
+    assert [(item['file'], item['line']) for item in found] == [('2026-04-01-1.log.gz', 2)]
+    found, _ = search(logs, 'notch', level='ERROR')
+    assert found == []
+    assert logs.files()[0]['day'] == '2026-04-01'
+
+
+def test_paging_with_the_cursor(logs):
+    lines = [f'[12:00:{i:02d}] [Server thread/INFO]: {"tick" if i % 3 else "save"} number{i}\n' for i in range(30)]
+    (logs.logs_dir_path / 'latest.log').write_text(''.join(lines))
+    logs.scan()
+
+    everything, cursor = search(logs, 'save', limit=1000)
+    assert cursor is None
+    assert [item['line'] for item in everything] == list(range(28, 0, -3))
+
+    paged, cursor = [], None
+    while True:
+        page, cursor = search(logs, 'save', limit=3, cursor=cursor)
+        paged.extend(page)
+        if cursor is None:
+            break
+        assert len(page) == 3
+    assert paged == everything
+
+
+def test_appended_lines_fill_the_open_block(logs):
+    path = logs.logs_dir_path / 'latest.log'
+    path.write_text('[12:00:00 INFO]: first line\n')
+    logs.scan()
+    for i in range(1, 10):
+        with open(path, 'a') as f:
+            f.write(f'[12:00:{i:02d} INFO]: appended line{i}\n')
+        # The scan notices a change by size and mtime
+        os.utime(path, ns=(i * 10 ** 9, i * 10 ** 9))
+        logs.scan()
+
+    assert block_count(logs, 'latest.log') == 3
+    found, _ = search(logs, 'appended')
+    assert [item['line'] for item in found] == list(range(10, 1, -1))
+    assert found[0]['text'] == '[12:00:09 INFO]: appended line9'
+    # The unterminated line waits for the next scan
+    with open(path, 'a') as f:
+        f.write('[12:00:10 INFO]: half')
+    os.utime(path, ns=(100 * 10 ** 9, 100 * 10 ** 9))
+    logs.scan()
+    assert search(logs, 'half')[0] == []
+
+
+def test_part_of_a_word_matches(logs):
+    (logs.logs_dir_path / 'latest.log').write_text(
+        '[12:00:00 INFO]: Notch_1234 joined the game\n'
+        '[12:00:01 ERROR]: java.util.ConcurrentModificationException\n')
+    logs.scan()
+    assert [item['line'] for item in search(logs, 'notch_12')[0]] == [1]
+    assert [item['line'] for item in search(logs, 'Modification')[0]] == [2]
+    assert search(logs, 'zzzz')[0] == []
+
+
+def test_too_common_a_fragment_is_rejected(logs, monkeypatch):
+    monkeypatch.setattr(logsearch, 'MAX_EXPANSION', 2)
+    (logs.logs_dir_path / 'latest.log').write_text('[12:00:00 INFO]: abc1 abc2 abc3\n')
+    logs.scan()
+    with pytest.raises(ValueError, match='too many words'):
+        search(logs, 'abc')
+    assert len(search(logs, 'abc1')[0]) == 1
+
+
+def test_tail_count_restarts_on_a_replaced_file(tmp_path):
+    tail = LogTail()
+    path = tmp_path / 'latest.log'
+    path.write_text('a\nb\n\nc\n')
+    assert tail.tail(str(path), 2)[:2] == (['b', 'c'], 3)
+
+    # Rotated: a new file, larger than the cached offset, with different content
+    replacement = tmp_path / 'new.log'
+    replacement.write_text('x\n' * 2 + '\n' * 5 + 'y\nz\n')
+    os.replace(replacement, path)
+    assert tail.tail(str(path), 1)[:2] == (['z'], 4)
+
+    with open(path, 'a') as f:
+        f.write('  \nw\nunterminated')
+    assert tail.tail(str(path), 1)[:2] == (['unterminated'], 6)
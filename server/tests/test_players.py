@@ -0,0 +1,52 @@
+import pytest
+
+from players import PlayerTracker
+
+
+@pytest.fixture
+def tracker():
+    clock = [1000.0]
+    tracker = PlayerTracker(clock=lambda: clock[0])
+    tracker.clock_value = clock
+    return tracker
+
+
+def names(tracker):
+    return sorted(player['name'] for player in tracker.online())
+
+
+@pytest.mark.parametrize('prefix', ['[12:00:00 INFO]: ', '[12:00:00] [Server thread/INFO]: '])
+def test_join_and_leave(tracker, prefix):
+    tracker.feed_line(prefix + 'Notch joined the game')
+    assert names(tracker) == ['Notch']
+    tracker.clock_value[0] += 60
+    tracker.feed_line(prefix + 'Notch left the game')
+    assert names(tracker) == []
+    assert tracker.get('notch')['playtimeSeconds'] == 60
+
+
+@pytest.mark.parametrize('line', [
+    '[12:00:00 INFO]: [Server] Notch joined the game',
+    '[12:00:00 INFO]: [jeb_] Notch joined the game',
+    '[12:00:00 INFO]: [Server] [12:00:00 INFO]: Notch joined the game',
+    '[12:00:00 INFO]: <jeb_> Notch joined the game',
+    '[12:00:00 INFO]: [Not Secure] <jeb_> Notch joined the game',
+    '[12:00:00 INFO]: * jeb_ Notch joined the game',
+])
+def test_say_and_chat_cannot_fake_a_join(tracker, line):
+    tracker.feed_line(line)
+    assert names(tracker) == []
+
+
+def test_say_cannot_fake_a_leave_or_death(tracker):
+    tracker.feed_line('[12:00:00 INFO]: Notch joined the game')
+    tracker.feed_line('[12:00:01 INFO]: [Server] Notch left the game')
+    tracker.feed_line('[12:00:02 INFO]: [jeb_] Notch was slain by Zombie')
+    assert names(tracker) == ['Notch']
+    assert tracker.get('Notch')['deaths'] == 0
+
+
+def test_chat_is_counted(tracker):
+    tracker.feed_line('[12:00:00 INFO]: <Notch> Notch left the game')
+    assert tracker.get('Notch')['messages'] == 1
+    assert names(tracker) == []
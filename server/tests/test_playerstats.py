@@ -0,0 +1,93 @@
+import json
+import os
+
+import pytest
+
+import playerstats
+from playerstats import PlayerStatsError, PlayerStatsIndex
+
+ALICE = '11111111-1111-1111-1111-111111111111'
+BOB = '22222222-2222-2222-2222-222222222222'
+CAROL = '33333333-3333-3333-3333-333333333333'
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def index(request, tmp_path, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+        monkeypatch.setattr(playerstats, 'np', playerstats._UNLOADED)
+    else:
+        monkeypatch.setattr(playerstats, 'np', None)
+    (tmp_path / 'world' / 'stats').mkdir(parents=True)
+    (tmp_path / 'usercache.json').write_text(json.dumps([
+        {'uuid': ALICE, 'name': 'Alice'}, {'uuid': BOB, 'name': 'Bob'}, {'uuid': CAROL, 'name': 'Carol'}]))
+    index = PlayerStatsIndex(str(tmp_path), interval=0, workers=2)
+    index.stats_dir = tmp_path / 'world' / 'stats'
+    return index
+
+
+def write_stats(index, uuid, deaths=0, mined=0, mtime=1):
+    path = index.stats_dir / f'{uuid}.json'
+    path.write_text(json.dumps({'stats': {
+        'minecraft:custom': {'minecraft:deaths': deaths, 'minecraft:walk_one_cm': 250},
+        'minecraft:mined': {'minecraft:stone': mined},
+    }}))
+    os.utime(path, ns=(mtime * 10 ** 9, mtime * 10 ** 9))
+
+
+def test_refresh_rereads_only_changed_files(index, monkeypatch):
+    write_stats(index, ALICE, deaths=1)
+    write_stats(index, BOB, deaths=2)
+    assert index.refresh() == 2
+
+    reads = []
+    read = index._read
+    monkeypatch.setattr(index, '_read', lambda uuid, path, key: reads.append(uuid) or read(uuid, path, key))
+    assert index.refresh() == 0
+    write_stats(index, BOB, deaths=5, mtime=2)
+    assert index.refresh() == 1
+    assert reads == [BOB]
+    assert index.player(BOB)['summary']['deaths'] == 5
+
+    os.remove(index.stats_dir / f'{ALICE}.json')
+    assert index.refresh() == 0
+    assert index.to_dict()['players'] == 1
+    with pytest.raises(PlayerStatsError):
+        index.player(ALICE)
+
+
+def test_top_is_ordered_and_skips_zeros(index):
+    write_stats(index, ALICE, mined=10)
+    write_stats(index, BOB, mined=30)
+    write_stats(index, CAROL)
+    top = index.top('blocksMined')
+    assert [(entry['rank'], entry['name'], entry['value']) for entry in top] == [(1, 'Bob', 30.0), (2, 'Alice', 10.0)]
+    assert [entry['name'] for entry in index.top('blocksMined', limit=1)] == ['Bob']
+    assert index.top('blocksMined', limit=0) == []
+    assert [entry['value'] for entry in index.top('distance')] == [2.5, 2.5, 2.5]
+    with pytest.raises(PlayerStatsError, match='Unknown metric'):
+        index.top('nope')
+
+
+def test_ranks(index):
+    write_stats(index, ALICE, deaths=3, mined=10)
+    write_stats(index, BOB, deaths=3, mined=30)
+    write_stats(index, CAROL, deaths=1)
+    index.refresh()
+    assert index.ranks(CAROL)['deaths'] == 3
+    assert index.ranks(ALICE)['deaths'] == index.ranks(BOB)['deaths'] == 1
+    assert index.ranks(ALICE)['blocksMined'] == 2
+    assert index.ranks('missing') == {}
+    assert index.to_dict()['numpy'] == (playerstats.np is not None)
+
+
+def test_resolve_by_name_through_usercache(index):
+    write_stats(index, ALICE, deaths=1)
+    index.refresh()
+    assert index.resolve(ALICE) == ALICE
+    assert index.resolve('aLiCe') == ALICE
+    # Known from usercache.json but without a stats file yet
+    assert index.resolve('Carol') == CAROL
+    assert index.resolve('Nobody') is None
+    player = index.player('Alice')
+    assert (player['uuid'], player['name']) == (ALICE, 'Alice')
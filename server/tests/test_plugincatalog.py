@@ -0,0 +1,43 @@
+import os
+import zipfile
+
+from plugincatalog import PluginCatalog
+
+DESCRIPTOR = 'name: Good\nversion: 1.2.0\nmain: dev.good.Good\ndepend: [Vault]\n'
+
+
+def write_jar(path, descriptor=DESCRIPTOR, flag_bits=0, compress_type=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(path, 'w') as jar:
+        info = zipfile.ZipInfo('plugin.yml')
+        info.compress_type = zipfile.ZIP_DEFLATED
+        jar.writestr(info, descriptor)
+    if flag_bits or compress_type != zipfile.ZIP_DEFLATED:
+        # Patch the central directory entry the way an encrypting or exotic zip tool would
+        with open(path, 'r+b') as f:
+            data = bytearray(f.read())
+            central = data.rfind(b'PK\x01\x02')
+            data[central + 8] |= flag_bits
+            data[central + 10:central + 12] = compress_type.to_bytes(2, 'little')
+            f.seek(0)
+            f.write(data)
+
+
+def test_bad_jars_are_listed_as_unreadable(tmp_path):
+    plugins = os.path.join(tmp_path, 'plugins')
+    os.makedirs(plugins)
+    write_jar(os.path.join(plugins, 'Good.jar'))
+    write_jar(os.path.join(plugins, 'Encrypted.jar'), flag_bits=0x1)
+    write_jar(os.path.join(plugins, 'Exotic.jar'), compress_type=99)
+    with open(os.path.join(plugins, 'Broken.jar'), 'wb') as f:
+        f.write(b'not a zip')
+
+    catalog = PluginCatalog(plugins, os.path.join(tmp_path, 'plugins.json'))
+    listed = {plugin['file']: plugin for plugin in catalog.scan()}
+    assert listed['Good.jar']['version'] == '1.2.0'
+    assert listed['Good.jar']['depend'] == ['Vault']
+    assert not listed['Good.jar'].get('unreadable')
+    for name in ('Encrypted.jar', 'Exotic.jar', 'Broken.jar'):
+        assert listed[name]['unreadable'], name
+        assert listed[name]['error']
+    # Cached: a second scan parses nothing and returns the same list
+    assert {plugin['file'] for plugin in catalog.scan()} == set(listed)
@@ -0,0 +1,38 @@
+import os
+
+from properties import PropertiesService
+
+
+def write(path, text):
+    # A distinct size as well as mtime, so coarse mtime clocks still see the change
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def test_outside_edit_read_before_check_is_still_notified(tmp_path):
+    path = os.path.join(tmp_path, 'server.properties')
+    write(path, 'motd=a\n')
+    seen = []
+    service = PropertiesService(path, on_change=lambda properties: seen.append(properties['motd']))
+    service.read()
+    service.check()
+    assert seen == ['a']
+
+    write(path, 'motd=bb\n')
+    # A GET arrives before the watcher looks at the file
+    assert service.read()['motd'] == 'bb'
+    service.check()
+    service.check()
+    assert seen == ['a', 'bb']
+
+
+def test_update_notifies_once(tmp_path):
+    path = os.path.join(tmp_path, 'server.properties')
+    write(path, 'motd=a\n')
+    seen = []
+    service = PropertiesService(path, on_change=lambda properties: seen.append(properties['motd']))
+    service.update({'motd': 'c'})
+    service.check()
+    assert seen == ['c']
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == 'motd=c\n'
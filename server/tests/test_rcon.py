@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+from fakercon import FakeRcon
+from rcon import MAX_COMMAND_BYTES, MAX_REPLY_CHARS, RconError, RconPool
+
+
+@pytest.fixture
+def server():
+    fake = FakeRcon()
+    yield fake
+    fake.close()
+
+
+def pool_for(server, password='secret', size=2):
+    return RconPool('127.0.0.1', server.port, password, size=size, timeout=2)
+
+
+def test_command_reply(server):
+    pool = pool_for(server)
+    assert pool.command('list') == 'ran list'
+    assert pool.command('tps') == 'ran tps'
+    assert server.commands == ['list', 'tps']
+    assert server.dropped == 0
+    pool.close()
+
+
+@pytest.mark.parametrize('size', [MAX_REPLY_CHARS - 1, MAX_REPLY_CHARS, MAX_REPLY_CHARS * 2 + 17,
+                                  MAX_REPLY_CHARS * 3])
+def test_multi_packet_reply(server, size):
+    server.handler = lambda command: ''.join(chr(ord('a') + i % 26) for i in range(size))
+    pool = pool_for(server, size=1)
+    assert pool.command('plugins') == server.handler('plugins')
+    # The next command on the same connection gets its own reply
+    server.handler = lambda command: 'short'
+    assert pool.command('list') == 'short'
+    assert server.connections == 1
+    pool.close()
+
+
+def test_multibyte_reply(server):
+    reply = 'é' * (MAX_REPLY_CHARS + 10)
+    server.handler = lambda command: reply
+    pool = pool_for(server)
+    assert pool.command('say') == reply
+    pool.close()
+
+
+def test_concurrent_commands_are_never_coalesced(server):
+    pool = pool_for(server, size=2)
+    results = {}
+
+    def run(n):
+        results[n] = pool.command(f'cmd {n}')
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {n: f'ran cmd {n}' for n in range(40)}
+    assert server.dropped == 0
+    assert server.connections == 2
+    pool.close()
+
+
+def test_auth_failure(server):
+    pool = pool_for(server, password='wrong')
+    with pytest.raises(RconError, match='authentication failed'):
+        pool.command('list')
+    assert server.commands == []
+
+
+def test_connection_refused():
+    fake = FakeRcon()
+    port = fake.port
+    fake.close()
+    pool = RconPool('127.0.0.1', port, 'secret', timeout=1)
+    with pytest.raises(RconError, match='Cannot connect'):
+        pool.command('list')
+
+
+def test_reconnects_after_server_restart(server):
+    pool = pool_for(server, size=1)
+    assert pool.command('list') == 'ran list'
+    server.drop_clients()
+    # The closed connection is noticed before sending, so the command runs once on a new one
+    assert pool.command('tps') == 'ran tps'
+    assert server.commands == ['list', 'tps']
+    assert server.connections == 2
+    pool.close()
+
+
+def test_timeout_closes_the_connection(server):
+    release = threading.Event()
+
+    def slow(command):
+        if command == 'slow':
+            release.wait(5)
+        return f'ran {command}'
+
+    server.handler = slow
+    pool = pool_for(server, size=1)
+    with pytest.raises(RconError, match='timed out') as error:
+        pool.command('slow', timeout=0.2)
+    assert error.value.sent
+    release.set()
+    # The late reply to `slow` is never taken for this one
+    assert pool.command('list') == 'ran list'
+    assert server.connections == 2
+    pool.close()
+
+
+def test_long_command_rejected(server):
+    pool = pool_for(server)
+    with pytest.raises(RconError, match='limited') as error:
+        pool.command('say ' + 'x' * MAX_COMMAND_BYTES)
+    assert not error.value.sent
+    assert server.commands == []
@@ -0,0 +1,102 @@
+import os
+import struct
+
+import pytest
+
+import region
+from region import SECTOR, WEEK, RegionAnalyzer, scan_region
+
+DAY = 86400
+NOW = 3000 * WEEK
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+        monkeypatch.setattr(region, 'np', region._UNLOADED)
+    else:
+        monkeypatch.setattr(region, 'np', None)
+    return request.param
+
+
+def write_region(path, chunks, stale=()):
+    """chunks: {index: (sector count, timestamp)}; stale: indexes with a timestamp but no location"""
+    locations = [0] * 1024
+    stamps = [0] * 1024
+    for offset, (index, (sectors, stamp)) in enumerate(sorted(chunks.items()), 2):
+        locations[index] = offset << 8 | sectors
+        stamps[index] = stamp
+    for index in stale:
+        stamps[index] = NOW
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(struct.pack('>1024I', *locations) + struct.pack('>1024I', *stamps))
+        f.write(b'\0' * SECTOR * (len(chunks) + 1))
+
+
+def test_header_parsing(tmp_path, backend):
+    path = str(tmp_path / 'r.0.0.mca')
+    write_region(path, {
+        0: (1, 100 * WEEK + 10),
+        5: (2, 100 * WEEK + 500),
+        1023: (3, 101 * WEEK + 1),
+        7: (1, 0),
+    }, stale=(9, 10))
+    chunks, used, oldest, newest, weeks = scan_region(path)
+    assert chunks == 4
+    assert used == 7 * SECTOR
+    assert (oldest, newest) == (100 * WEEK + 10, 101 * WEEK + 1)
+    assert weeks == {100: 2, 101: 1}
+
+
+def test_short_and_empty_files_are_skipped(tmp_path, backend):
+    empty = tmp_path / 'r.0.0.mca'
+    empty.write_bytes(b'')
+    short = tmp_path / 'r.0.1.mca'
+    short.write_bytes(b'\1' * 4096)
+    blank = tmp_path / 'r.0.2.mca'
+    blank.write_bytes(b'\0' * 8192)
+    for path in (empty, short, blank):
+        assert scan_region(str(path)) == (0, 0, None, None, {})
+
+
+def test_prune_candidates(tmp_path, backend):
+    base = tmp_path / 'world' / 'region'
+    old = NOW - 60 * DAY
+    # Generated once two months ago and never saved again
+    write_region(str(base / 'r.1.0.mca'), {i: (1, old + i) for i in range(10)})
+    write_region(str(base / 'r.2.0.mca'), {i: (1, old + i) for i in range(40)})
+    # Old, but revisited a day after it was generated
+    write_region(str(base / 'r.3.0.mca'), {0: (1, old), 1: (1, old + DAY)})
+    # Generated last week
+    write_region(str(base / 'r.4.0.mca'), {0: (1, NOW - 7 * DAY)})
+    # Cut off, counted as a region without chunks
+    (base / 'r.5.0.mca').write_bytes(b'\1' * 100)
+
+    stats = RegionAnalyzer(str(tmp_path), workers=1).stats(['world'], now=NOW)
+    overworld = stats['dimensions'][0]
+    assert overworld['dimension'] == 'overworld'
+    assert overworld['regions'] == 5
+    assert overworld['chunks'] == 10 + 40 + 2 + 1
+    assert overworld['usedBytes'] == 53 * SECTOR
+    assert stats['numpy'] == (backend == 'numpy')
+    assert [(r['x'], r['chunks']) for r in stats['prune']['largest']] == [(2, 40), (1, 10)]
+    assert overworld['pruneRegions'] == 2
+    assert sum(count for _, count in overworld['activity']) == 53
+
+
+def test_rescan_reads_only_changed_regions(tmp_path):
+    base = tmp_path / 'world' / 'region'
+    write_region(str(base / 'r.0.0.mca'), {0: (1, NOW)})
+    write_region(str(base / 'r.0.1.mca'), {0: (1, NOW)})
+    analyzer = RegionAnalyzer(str(tmp_path), cache_path=str(tmp_path / 'regions.json'), workers=1)
+    assert analyzer.stats(['world'], now=NOW)['filesScanned'] == 2
+
+    write_region(str(base / 'r.0.1.mca'), {0: (1, NOW), 1: (1, NOW)})
+    os.utime(base / 'r.0.1.mca', ns=(1, 1))
+    os.remove(base / 'r.0.0.mca')
+    reloaded = RegionAnalyzer(str(tmp_path), cache_path=str(tmp_path / 'regions.json'), workers=1)
+    stats = reloaded.stats(['world'], now=NOW)
+    assert (stats['filesScanned'], stats['filesCached']) == (1, 0)
+    assert stats['totals']['chunks'] == 2
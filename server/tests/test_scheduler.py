@@ -0,0 +1,158 @@
+from datetime import datetime
+
+import pytest
+
+from scheduler import CronExpr, ScheduleError, Scheduler
+
+
+class Harness:
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.runs = []
+        self.announcements = []
+        self.scheduler = Scheduler(self.execute, self.announce, clock=lambda: self.now)
+
+    def execute(self, schedule):
+        self.runs.append((schedule.id, self.now))
+        return {'success': True, 'message': 'ok'}
+
+    def announce(self, schedule, text):
+        self.announcements.append((self.now, text))
+
+    def advance(self, to):
+        self.now = to
+        return self.scheduler.tick()
+
+
+@pytest.fixture
+def harness():
+    return Harness()
+
+
+def at(*args):
+    return datetime(*args).timestamp()
+
+
+def next_runs(text, start, count):
+    cron, moment, runs = CronExpr(text), start, []
+    for _ in range(count):
+        moment = cron.next_after(moment)
+        runs.append(datetime.fromtimestamp(moment))
+    return runs
+
+
+def test_interval_stays_in_phase_with_creation(harness):
+    harness.now = 1130.0
+    schedule = harness.scheduler.add({'id': 'tick', 'every': 60, 'created': 1000, 'action': 'command',
+                                      'commands': ['say hi']})
+    assert schedule.next_run == 1180
+
+    # A late run does not shift the following ones
+    assert harness.advance(1195.0) is not None
+    assert harness.runs == [('tick', 1195.0)]
+    assert schedule.next_run == 1240
+    assert harness.advance(1239.0) == pytest.approx(1.0)
+    assert harness.runs == [('tick', 1195.0)]
+
+
+def test_missed_runs_are_skipped(harness):
+    harness.scheduler.add({'id': 'tick', 'every': 60, 'action': 'command', 'commands': ['say hi']})
+    harness.advance(1000.0 + 60 * 10 + 5)
+    assert harness.runs == [('tick', 1605.0)]
+    assert harness.scheduler.schedules['tick'].next_run == 1660
+
+
+def test_countdown_announcements(harness):
+    harness.scheduler.add({'id': 'nightly', 'every': 600, 'action': 'restart', 'countdown': [10, 300, 60]})
+    for when in (1300.0, 1540.0, 1590.0):
+        harness.advance(when)
+    assert harness.announcements == [
+        (1300.0, 'Server restarting in 5m'),
+        (1540.0, 'Server restarting in 1m'),
+        (1590.0, 'Server restarting in 10s'),
+    ]
+    assert harness.runs == []
+    harness.advance(1600.0)
+    assert harness.runs == [('nightly', 1600.0)]
+
+    # The next cycle gets its own warnings
+    harness.advance(1900.0)
+    assert harness.announcements[-1] == (1900.0, 'Server restarting in 5m')
+
+
+def test_countdown_longer_than_the_wait_is_not_announced(harness):
+    harness.now = 1550.0
+    harness.scheduler.add({'id': 'soon', 'every': 600, 'created': 1000, 'action': 'broadcast',
+                           'message': 'Vote now', 'countdown': [300, 10]})
+    harness.advance(1590.0)
+    assert harness.announcements == [(1590.0, 'Vote now in 10s')]
+
+
+@pytest.mark.parametrize('text, expected', [
+    # 2026-04-13 is a Monday: both fields restricted, either one matches
+    ('0 12 13 * 5', [datetime(2026, 4, 10, 12), datetime(2026, 4, 13, 12), datetime(2026, 4, 17, 12)]),
+    # Only one restricted, that one decides
+    ('0 12 * * 5', [datetime(2026, 4, 10, 12), datetime(2026, 4, 17, 12), datetime(2026, 4, 24, 12)]),
+    ('0 12 13 * *', [datetime(2026, 4, 13, 12), datetime(2026, 5, 13, 12), datetime(2026, 6, 13, 12)]),
+    # 7 is Sunday as well
+    ('30 6 * * 7', [datetime(2026, 4, 5, 6, 30), datetime(2026, 4, 12, 6, 30), datetime(2026, 4, 19, 6, 30)]),
+])
+def test_cron_day_of_month_and_weekday(text, expected):
+    assert next_runs(text, at(2026, 4, 4), 3) == expected
+
+
+def test_cron_leap_day_is_found():
+    assert next_runs('0 0 29 2 *', at(2026, 4, 4), 1) == [datetime(2028, 2, 29)]
+
+
+def test_cron_that_never_matches_is_rejected(harness):
+    with pytest.raises(ScheduleError, match='never matches'):
+        CronExpr('0 0 31 2 *').next_after(at(2026, 4, 4))
+    with pytest.raises(ScheduleError):
+        harness.scheduler.add({'id': 'never', 'cron': '0 0 31 2 *', 'action': 'backup'})
+    assert harness.scheduler.schedules == {}
+
+
+@pytest.mark.parametrize('text', ['* * *', '60 * * * *', '*/0 * * * *', '5-1 * * * *', 'a * * * *'])
+def test_bad_cron_is_rejected(text):
+    with pytest.raises(ScheduleError):
+        CronExpr(text)
+
+
+@pytest.mark.parametrize('change', [
+    {'name': 'renamed', 'every': 30, 'action': 'explode'},
+    {'name': 'renamed', 'cron': '0 0 31 2 *'},
+    {'name': 'renamed', 'action': 'broadcast', 'message': None},
+    {'countdown': [30], 'every': 0},
+])
+def test_failed_update_rolls_back(harness, change):
+    harness.scheduler.add({'id': 'tick', 'name': 'Tick', 'every': 60, 'action': 'command',
+                           'commands': ['say hi'], 'countdown': [10]})
+    before = harness.scheduler.get('tick')
+    with pytest.raises(ScheduleError):
+        harness.scheduler.update('tick', change)
+    assert harness.scheduler.get('tick') == before
+
+    # Still planned as before, countdown included
+    harness.advance(1050.0)
+    harness.advance(1060.0)
+    assert harness.announcements == [(1050.0, 'Server running Tick in 10s')]
+    assert harness.runs == [('tick', 1060.0)]
+
+
+def test_update_replans_and_drops_old_entries(harness):
+    harness.scheduler.add({'id': 'tick', 'every': 60, 'action': 'command', 'commands': ['say hi']})
+    harness.scheduler.update('tick', {'every': 100})
+    harness.advance(1060.0)
+    assert harness.runs == []
+    harness.advance(1100.0)
+    assert harness.runs == [('tick', 1100.0)]
+
+
+def test_removed_and_disabled_schedules_do_not_run(harness):
+    harness.scheduler.add({'id': 'gone', 'every': 60, 'action': 'command', 'commands': ['say hi']})
+    harness.scheduler.add({'id': 'off', 'every': 60, 'action': 'command', 'commands': ['say hi']})
+    harness.scheduler.remove('gone')
+    harness.scheduler.update('off', {'enabled': False})
+    assert harness.advance(5000.0) is None
+    assert harness.runs == []
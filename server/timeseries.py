@@ -0,0 +1,100 @@
+import math
+import threading
+from array import array
+
+
+class SeriesRing:
+    """Fixed-capacity ring of timestamped samples backed by `array('d')`
+
+    Each field gets its own flat array, so a sample costs a few float
+    stores and no per-sample objects.
+    """
+
+    def __init__(self, fields, capacity):
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self._ts = array('d', bytes(8 * capacity))
+        self._values = [array('d', bytes(8 * capacity)) for _ in self.fields]
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def append(self, ts, values):
+        i = self._count % self.capacity
+        self._ts[i] = ts
+        for column, value in zip(self._values, values):
+            column[i] = value
+        self._count += 1
+
+    def last(self):
+        """(ts, values) of the newest sample, or None"""
+        if not self._count:
+            return None
+        i = (self._count - 1) % self.capacity
+        return self._ts[i], tuple(column[i] for column in self._values)
+
+    def since(self, ts):
+        """Samples newer than `ts` as a dict of parallel lists, oldest first"""
+        size = len(self)
+        start = self._count - size
+        out = {'t': []}
+        out.update((field, []) for field in self.fields)
+        for n in range(start, self._count):
+            i = n % self.capacity
+            if self._ts[i] <= ts:
+                continue
+            out['t'].append(self._ts[i])
+            for field, column in zip(self.fields, self._values):
+                value = column[i]
+                out[field].append(None if math.isnan(value) else round(value, 3))
+        return out
+
+
+class RollupSeries:
+    """Raw samples plus per-minute and per-hour averages
+
+    Averages are folded in as samples arrive, so reads never aggregate.
+    NaN values are ignored by the averages.
+    """
+
+    RESOLUTIONS = (('1m', 60, 24 * 60), ('1h', 3600, 30 * 24))
+
+    def __init__(self, fields, raw_capacity=3600):
+        self.fields = tuple(fields)
+        self.raw = SeriesRing(fields, raw_capacity)
+        self.rollups = {}
+        self._buckets = {}
+        for name, step, capacity in self.RESOLUTIONS:
+            self.rollups[name] = SeriesRing(fields, capacity)
+            self._buckets[name] = [None, [0.0] * len(self.fields), [0] * len(self.fields)]
+        self._lock = threading.Lock()
+
+    def append(self, ts, values):
+        with self._lock:
+            self.raw.append(ts, values)
+            for name, step, _ in self.RESOLUTIONS:
+                bucket = self._buckets[name]
+                start = ts - ts % step
+                if bucket[0] is not None and bucket[0] != start:
+                    self._close(name, bucket)
+                if bucket[0] != start:
+                    bucket[0] = start
+                    bucket[1] = [0.0] * len(self.fields)
+                    bucket[2] = [0] * len(self.fields)
+                sums, counts = bucket[1], bucket[2]
+                for i, value in enumerate(values):
+                    if not math.isnan(value):
+                        sums[i] += value
+                        counts[i] += 1
+
+    def _close(self, name, bucket):
+        start, sums, counts = bucket
+        averages = [s / c if c else math.nan for s, c in zip(sums, counts)]
+        self.rollups[name].append(start, averages)
+
+    def history(self, resolution, since):
+        """Samples newer than `since` at 'raw', '1m' or '1h' resolution"""
+        with self._lock:
+            ring = self.raw if resolution == 'raw' else self.rollups[resolution]
+            return ring.since(since)
@@ -0,0 +1,126 @@
+import math
+import re
+import threading
+import time
+
+from timeseries import RollupSeries
+
+# Strips ANSI escapes and legacy section-sign colour codes from command replies
+COLOR_RE = re.compile(r'\x1b\[[0-9;]*m|§.')
+TPS_RE = re.compile(r'TPS from last 1m, 5m, 15m:\s*\*?([\d.]+),\s*\*?([\d.]+),\s*\*?([\d.]+)')
+MSPT_HEADER = 'Server tick times'
+MSPT_RE = re.compile(r'([\d.]+)/([\d.]+)/([\d.]+),')
+
+FIELDS = ('tps1m', 'tps5m', 'tps15m', 'mspt', 'msptMin', 'msptMax')
+
+# ?range= value -> (seconds, resolution)
+RANGES = {
+    '5m': (300, 'raw'),
+    '15m': (900, 'raw'),
+    '1h': (3600, 'raw'),
+    '6h': (6 * 3600, '1m'),
+    '24h': (24 * 3600, '1m'),
+    '7d': (7 * 24 * 3600, '1h'),
+    '30d': (30 * 24 * 3600, '1h'),
+}
+
+
+class TPSSampler:
+    """Samples TPS/MSPT by issuing `mspt` and `tps` and parsing the replies
+
+    `send_command` is called with each command every `interval` seconds
+    while `is_running()` is true and returns the reply text, or None when
+    it cannot get one (no RCON). Only then is the command written to the
+    console with `send_stdin`, at most every `stdin_interval` seconds (0
+    never), since its reply is printed to every console and latest.log.
+    Replies arrive through `feed_line`, which is cheap for the vast
+    majority of console lines that are not replies and also picks up a
+    `tps` typed by hand. Samples go into a RollupSeries and the latest
+    value is kept ready to serve.
+    """
+
+    def __init__(self, send_command, is_running, interval=5.0, raw_capacity=720, clock=time.time,
+                 send_stdin=None, stdin_interval=60.0):
+        self.send_command = send_command
+        self.is_running = is_running
+        self.interval = interval
+        self.send_stdin = send_stdin
+        self.stdin_interval = stdin_interval
+        self.clock = clock
+        self._next_stdin = 0
+        self.series = RollupSeries(FIELDS, raw_capacity=raw_capacity)
+        self.latest = None
+        self._mspt = (math.nan, math.nan, math.nan)
+        self._mspt_pending = False
+        self._history = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.is_running():
+                continue
+            try:
+                self.tick()
+            except Exception as e:
+                print(f'Error sampling TPS: {e}')
+
+    def tick(self):
+        """Request one sample, over the console only when stdin_interval has passed"""
+        now = self.clock()
+        stdin_due = self.send_stdin is not None and self.stdin_interval > 0 and now >= self._next_stdin
+        for command in ('mspt', 'tps'):
+            reply = self.send_command(command)
+            if reply is not None:
+                for line in reply.splitlines():
+                    self.feed_line(line)
+            elif stdin_due:
+                self.send_stdin(command)
+                self._next_stdin = now + self.stdin_interval
+
+    def feed_line(self, text):
+        """Inspect a console line for tps/mspt replies"""
+        if self._mspt_pending:
+            match = MSPT_RE.search(COLOR_RE.sub('', text))
+            if match:
+                self._mspt_pending = False
+                self._mspt = tuple(float(v) for v in match.groups())
+                return
+        if MSPT_HEADER in text:
+            self._mspt_pending = True
+        elif 'TPS from last' in text:
+            match = TPS_RE.search(COLOR_RE.sub('', text))
+            if match:
+                self.record(tuple(float(v) for v in match.groups()) + self._mspt)
+
+    def record(self, values, ts=None):
+        """Store a sample and refresh the cached latest value"""
+        ts = self.clock() if ts is None else ts
+        self.series.append(ts, values)
+        self._mspt = (math.nan, math.nan, math.nan)
+        self._history = {}
+        self.latest = dict(
+            ((field, None if math.isnan(value) else value) for field, value in zip(FIELDS, values)),
+            sampledAt=ts
+        )
+
+    def history(self, range_name):
+        """Samples within a named range (see RANGES), cached until the next sample"""
+        cached = self._history.get(range_name)
+        if cached is None:
+            seconds, resolution = RANGES[range_name]
+            cached = self._history[range_name] = {
+                'range': range_name,
+                'resolution': resolution,
+                'samples': self.series.history(resolution, self.clock() - seconds)
+            }
+        return cached